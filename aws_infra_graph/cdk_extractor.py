@@ -0,0 +1,324 @@
+# Core Library
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, List, Tuple, Iterator, Optional
+from pathlib import Path
+from dataclasses import field, dataclass
+from concurrent.futures import ProcessPoolExecutor
+
+# First party
+from aws_infra_graph.model import StackInfo, StackExport, StackResource, StackParameter
+from aws_infra_graph.utils import build_tag_search_patterns, parse_external_dependency
+from aws_infra_graph.symbols import Symbols
+from aws_infra_graph.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "manifest.json"
+STACK_ARTIFACT = "aws:cloudformation:stack"
+NESTED_ASSEMBLY_ARTIFACT = "cdk:cloud-assembly"
+STACK_TAGS_METADATA = "aws:cdk:stack-tags"
+# below this many templates the process pool costs more than it saves
+PARALLEL_TEMPLATE_THRESHOLD = 8
+
+_SUB_VARIABLE = re.compile(r"\$\{([^}!][^}]*)\}")
+
+Tags = List[Dict[str, str]]
+
+
+@dataclass
+class StackArtifact:
+    stack_name: str
+    template_path: Path
+    tags: Tags
+    parameters: Dict[str, str]
+
+
+@dataclass
+class TemplateSummary:
+    """The parts of a template needed for the models, cheap to send between processes"""
+
+    # logical id, type, physical name if set in the template
+    resources: List[Tuple[str, str, Optional[str]]] = field(default_factory=list)
+    # name, default value, description
+    parameters: List[Tuple[str, Optional[str], Optional[str]]] = field(
+        default_factory=list
+    )
+    exports: List[Tuple[str, str]] = field(default_factory=list)  # name, value
+    imports: List[str] = field(default_factory=list)  # imported export names
+    resource_tags: Tags = field(default_factory=list)
+
+
+class CdkDataExtractor:
+    """
+    Reads stacks and exports from a synthesized CDK cloud assembly (cdk.out)
+    instead of AWS. Imports are resolved from the Fn::ImportValue usages of
+    all templates, so the graphs are available before anything is deployed.
+    Physical ids are only known for resources with an explicit name.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        service_tags: List[str],
+        component_tags: List[str],
+        stack_prefix: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ):
+        self.path = Path(path)
+        self.stack_prefix = stack_prefix
+        self.max_workers = max_workers
+        self.symbols = Symbols.for_stack_prefix(stack_prefix or "")
+        self.service_tag_search_patterns = build_tag_search_patterns(service_tags)
+        self.component_tag_search_patterns = build_tag_search_patterns(component_tags)
+        self._loaded: Optional[Tuple[List[StackInfo], List[StackExport]]] = None
+
+    def gather_stacks(self) -> List[StackInfo]:
+        return self._load()[0]
+
+    def gather_and_filter_exports(self, stacks: List[StackInfo]) -> List[StackExport]:
+        return self._load()[1]
+
+    def _load(self) -> Tuple[List[StackInfo], List[StackExport]]:
+        if self._loaded is None:
+            with instrumentation.timed("cdk.load"):
+                artifacts = [
+                    artifact
+                    for artifact in read_stack_artifacts(self.path)
+                    if not self.stack_prefix
+                    or artifact.stack_name.startswith(self.stack_prefix)
+                ]
+                summaries = self._summarize_templates(artifacts)
+                self._loaded = self._build_models(artifacts, summaries)
+            logger.info(
+                f"Loaded {len(self._loaded[0])} stacks and {len(self._loaded[1])} exports from {self.path}"
+            )
+        return self._loaded
+
+    def _summarize_templates(
+        self, artifacts: List[StackArtifact]
+    ) -> List[TemplateSummary]:
+        paths = [artifact.template_path for artifact in artifacts]
+        if len(paths) < PARALLEL_TEMPLATE_THRESHOLD:
+            return [summarize_template(path) for path in paths]
+        max_workers = self.max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers) as executor:
+            return list(
+                executor.map(
+                    summarize_template,
+                    paths,
+                    chunksize=max(1, len(paths) // (max_workers * 4)),
+                )
+            )
+
+    def _build_models(
+        self, artifacts: List[StackArtifact], summaries: List[TemplateSummary]
+    ) -> Tuple[List[StackInfo], List[StackExport]]:
+        stack_infos = [
+            self._stack_info(artifact, summary)
+            for artifact, summary in zip(artifacts, summaries)
+        ]
+        service_of_stack = {
+            stack.stack_name: stack.service_name for stack in stack_infos
+        }
+        importing_stacks: Dict[str, List[str]] = {}
+        for stack, summary in zip(stack_infos, summaries):
+            for export_name in dict.fromkeys(summary.imports):
+                importing_stacks.setdefault(export_name, []).append(stack.stack_name)
+
+        # like CloudFormation's list_imports, exports nobody imports are dropped
+        exports = [
+            StackExport(
+                export_name=export_name,
+                export_value=export_value,
+                exporting_stack_name=stack.stack_name,
+                importing_stacks=importing_stacks[export_name],
+                export_service=stack.service_name,
+                importing_services=[
+                    service
+                    for importing_stack in importing_stacks[export_name]
+                    if (service := service_of_stack[importing_stack]) is not None
+                ],
+            )
+            for stack, summary in zip(stack_infos, summaries)
+            for export_name, export_value in summary.exports
+            if export_name in importing_stacks
+        ]
+        return stack_infos, exports
+
+    def _stack_info(
+        self, artifact: StackArtifact, summary: TemplateSummary
+    ) -> StackInfo:
+        tags = artifact.tags or summary.resource_tags
+        service_name = _search_tags(self.service_tag_search_patterns, tags)
+        component_name = _search_tags(self.component_tag_search_patterns, tags)
+        return StackInfo(
+            stack_name=self.symbols.stacks.intern(artifact.stack_name),
+            service_name=self.symbols.services.intern(service_name)
+            if service_name
+            else None,
+            component_name=self.symbols.components.intern(component_name)
+            if component_name
+            else None,
+            resources=[
+                StackResource(
+                    logical_id=logical_id,
+                    resource_type=self.symbols.resource_types.intern(resource_type),
+                    physical_id=physical_id,
+                )
+                for logical_id, resource_type, physical_id in summary.resources
+            ],
+            parameters=[
+                StackParameter(
+                    name=name,
+                    value=artifact.parameters.get(name, default or ""),
+                    description=description,
+                    external_dependency=parse_external_dependency(description),
+                )
+                for name, default, description in summary.parameters
+            ],
+        )
+
+
+def read_stack_artifacts(assembly_folder: Path) -> Iterator[StackArtifact]:
+    """The stack artifacts of a cloud assembly, including nested assemblies"""
+    with open(assembly_folder / MANIFEST_FILE_NAME) as read_file:
+        manifest = json.load(read_file)
+    for artifact_id, artifact in manifest.get("artifacts", {}).items():
+        properties = artifact.get("properties", {})
+        if artifact.get("type") == NESTED_ASSEMBLY_ARTIFACT:
+            yield from read_stack_artifacts(
+                assembly_folder / properties["directoryName"]
+            )
+        elif artifact.get("type") == STACK_ARTIFACT:
+            yield StackArtifact(
+                stack_name=properties.get("stackName", artifact_id),
+                template_path=assembly_folder / properties["templateFile"],
+                tags=_artifact_tags(artifact),
+                parameters=properties.get("parameters", {}),
+            )
+
+
+def _artifact_tags(artifact: Dict[str, Any]) -> Tags:
+    tags = artifact.get("properties", {}).get("tags")
+    if tags:
+        return [{"Key": key, "Value": value} for key, value in tags.items()]
+    # older CDK versions only list the stack tags in the metadata
+    for entries in artifact.get("metadata", {}).values():
+        for entry in entries:
+            if entry.get("type") == STACK_TAGS_METADATA:
+                return [
+                    {
+                        "Key": tag.get("Key", tag.get("key")),
+                        "Value": tag.get("Value", tag.get("value")),
+                    }
+                    for tag in entry.get("data", [])
+                ]
+    return []
+
+
+def _search_tags(patterns, tags: Tags) -> Optional[str]:
+    return next(
+        (
+            result
+            for pattern in patterns
+            if (result := pattern.search(tags)) is not None
+        ),
+        None,
+    )
+
+
+def summarize_template(path: Path) -> TemplateSummary:
+    """Parse a template, runs in the worker processes"""
+    with open(path) as read_file:
+        template = json.load(read_file)
+    resources = template.get("Resources", {})
+    parameters = template.get("Parameters", {})
+    names = {
+        name: str(parameter["Default"])
+        for name, parameter in parameters.items()
+        if "Default" in parameter
+    }
+    summary = TemplateSummary()
+    for logical_id, resource in resources.items():
+        resource_type = resource.get("Type", "")
+        properties = resource.get("Properties", {})
+        name_property = properties.get(f"{resource_type.split('::')[-1]}Name")
+        physical_id = render(name_property, names) if name_property else None
+        if physical_id is not None:
+            names[logical_id] = physical_id
+        summary.resources.append((logical_id, resource_type, physical_id))
+        if not summary.resource_tags and isinstance(properties.get("Tags"), list):
+            summary.resource_tags = properties["Tags"]
+
+    summary.parameters = [
+        (name, names.get(name), parameter.get("Description"))
+        for name, parameter in parameters.items()
+    ]
+    summary.exports = [
+        (render(output["Export"]["Name"], names), render(output["Value"], names))
+        for output in template.get("Outputs", {}).values()
+        if "Export" in output
+    ]
+    summary.imports = [
+        render(imported_name, names) for imported_name in _import_values(template)
+    ]
+    return summary
+
+
+def _import_values(value: Any) -> Iterator[Any]:
+    """The export name expressions of all Fn::ImportValue below value"""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if key == "Fn::ImportValue":
+                yield child
+            else:
+                yield from _import_values(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from _import_values(child)
+
+
+def render(value: Any, names: Dict[str, str]) -> str:
+    """
+    Resolve the intrinsic functions of a template value as far as possible
+    without a deployment. Unknown references stay as ${Name} placeholders.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, bool)):
+        return str(value)
+    if isinstance(value, list):
+        return ",".join(render(element, names) for element in value)
+    if not isinstance(value, dict) or len(value) != 1:
+        return json.dumps(value, sort_keys=True)
+
+    function, argument = next(iter(value.items()))
+    if function == "Ref":
+        return names.get(argument, f"${{{argument}}}")
+    if function == "Fn::GetAtt":
+        attribute = ".".join(argument) if isinstance(argument, list) else str(argument)
+        return f"${{{attribute}}}"
+    if function == "Fn::Join":
+        separator, elements = argument
+        return separator.join(render(element, names) for element in elements)
+    if function == "Fn::Sub":
+        if isinstance(argument, list):
+            text, variables = argument
+            names = {
+                **names,
+                **{
+                    name: render(variable, names)
+                    for name, variable in variables.items()
+                },
+            }
+        else:
+            text = argument
+        return _SUB_VARIABLE.sub(
+            lambda match: names.get(match.group(1), match.group(0)), text
+        )
+    if function == "Fn::ImportValue":
+        return f"${{ImportValue:{render(argument, names)}}}"
+    return json.dumps(value, sort_keys=True)
@@ -0,0 +1,168 @@
+# Core Library
+import random
+from typing import Dict, List, Iterable
+from collections import deque
+
+# First party
+from aws_infra_graph.model import CentralityScores
+from aws_infra_graph.graph_algorithms import Edge, Node, strongly_connected_components
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-8
+PAGERANK_MAX_ITERATIONS = 100
+# exact betweenness needs a search from every node, above this many nodes the
+# searches start from a random sample and the result is scaled up
+BETWEENNESS_SAMPLES = 64
+
+# int.bit_count needs Python 3.10
+_bit_count = getattr(int, "bit_count", lambda mask: bin(mask).count("1"))
+
+
+def compute_centrality(
+    nodes: Iterable[Node],
+    edges: Iterable[Edge],
+    betweenness_samples: int = BETWEENNESS_SAMPLES,
+    seed: int = 0,
+) -> Dict[Node, CentralityScores]:
+    """
+    Importance of every node of a dependency graph whose edges point from the
+    exporting to the importing side:
+
+    - pagerank: how much of the graph depends on the node, directly or
+      through its dependents (PageRank on the reversed edges)
+    - fan_out: number of nodes depending on it transitively
+    - betweenness: share of the shortest dependency paths passing through it
+
+    Nodes are numbered and the edges kept as integer adjacency lists, so the
+    loops touch lists of ints only.
+    """
+    edges = set(edges)
+    names = sorted(set(nodes).union(*edges), key=str)
+    position = {name: number for number, name in enumerate(names)}
+    successors: List[List[int]] = [[] for _ in names]
+    for from_node, to_node in edges:
+        if from_node != to_node:
+            successors[position[from_node]].append(position[to_node])
+
+    pagerank = _pagerank(_reversed(successors))
+    fan_out = _transitive_fan_out(successors)
+    betweenness = _betweenness(successors, betweenness_samples, seed)
+    return {
+        name: CentralityScores(
+            pagerank=round(pagerank[number], 6),
+            fan_out=fan_out[number],
+            betweenness=round(betweenness[number], 6),
+        )
+        for number, name in enumerate(names)
+    }
+
+
+def _reversed(successors: List[List[int]]) -> List[List[int]]:
+    predecessors: List[List[int]] = [[] for _ in successors]
+    for node, targets in enumerate(successors):
+        for target in targets:
+            predecessors[target].append(node)
+    return predecessors
+
+
+def _pagerank(successors: List[List[int]]) -> List[float]:
+    """Power iteration, the rank of nodes without successors is spread evenly"""
+    count = len(successors)
+    if count == 0:
+        return []
+    rank = [1.0 / count] * count
+    dangling = [node for node, targets in enumerate(successors) if not targets]
+    linked = [
+        (node, targets, PAGERANK_DAMPING / len(targets))
+        for node, targets in enumerate(successors)
+        if targets
+    ]
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        dangling_rank = sum(rank[node] for node in dangling)
+        base = (1 - PAGERANK_DAMPING + PAGERANK_DAMPING * dangling_rank) / count
+        next_rank = [base] * count
+        for node, targets, share in linked:
+            contribution = rank[node] * share
+            for target in targets:
+                next_rank[target] += contribution
+        change = sum(abs(new - old) for new, old in zip(next_rank, rank))
+        rank = next_rank
+        if change < PAGERANK_TOLERANCE:
+            break
+    return rank
+
+
+def _transitive_fan_out(successors: List[List[int]]) -> List[int]:
+    """
+    Reachable nodes per node as bit sets over the condensation: components
+    come sinks first, so the sets of all successors are known when a
+    component is reached and one OR per edge suffices
+    """
+    components = strongly_connected_components(
+        range(len(successors)), dict(enumerate(successors))
+    )
+    component_of = [0] * len(successors)
+    members_mask: List[int] = []
+    for number, component in enumerate(components):
+        mask = 0
+        for node in component:
+            component_of[node] = number
+            mask |= 1 << node
+        members_mask.append(mask)
+
+    reachable: List[int] = []
+    fan_out = [0] * len(successors)
+    for number, component in enumerate(components):
+        mask = members_mask[number]
+        for node in component:
+            for target in successors[node]:
+                target_component = component_of[target]
+                if target_component != number:
+                    mask |= reachable[target_component]
+        reachable.append(mask)
+        # the node itself is in its own component and not counted
+        count = _bit_count(mask) - 1
+        for node in component:
+            fan_out[node] = count
+    return fan_out
+
+
+def _betweenness(successors: List[List[int]], samples: int, seed: int) -> List[float]:
+    """Brandes' algorithm from all or from a sample of the source nodes"""
+    count = len(successors)
+    centrality = [0.0] * count
+    if count < 3:
+        return centrality
+    sources: Iterable[int] = range(count)
+    if count > samples:
+        sources = random.Random(seed).sample(range(count), samples)
+    sampled = min(count, samples)
+    for source in sources:
+        order: List[int] = []
+        predecessors: List[List[int]] = [[] for _ in range(count)]
+        paths = [0] * count
+        paths[source] = 1
+        distance = [-1] * count
+        distance[source] = 0
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for target in successors[node]:
+                if distance[target] < 0:
+                    distance[target] = distance[node] + 1
+                    queue.append(target)
+                if distance[target] == distance[node] + 1:
+                    paths[target] += paths[node]
+                    predecessors[target].append(node)
+        dependency = [0.0] * count
+        for node in reversed(order):
+            for predecessor in predecessors[node]:
+                dependency[predecessor] += (
+                    paths[predecessor] / paths[node] * (1 + dependency[node])
+                )
+            if node != source:
+                centrality[node] += dependency[node]
+    # scale the sample up and normalize by the number of ordered pairs
+    scale = count / sampled / ((count - 1) * (count - 2))
+    return [value * scale for value in centrality]
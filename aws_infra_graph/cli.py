@@ -1,34 +1,30 @@
 #! /usr/bin/env python
 
 # Core Library
-import os
 import logging
+import contextlib
+from typing import TYPE_CHECKING, Tuple, Optional
 
 # Third party
 import click
-import coloredlogs
 from colorama import Fore
 
 # First party
-from aws_infra_graph.config import init_config
-from aws_infra_graph.graph_exporter import InfraGraphExporter
+from aws_infra_graph.logging_config import configure_logging
 
-logger = logging.getLogger(__name__)
-logging.basicConfig(
-    format="[%(levelname)s] %(message)s", level=os.getenv("LOG_LEVEL", "INFO")
-)
-coloredlogs.install(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    fmt="[%(levelname)s] %(message)s",
-    logger=logger,
-)
+if TYPE_CHECKING:
+    # First party
+    from aws_infra_graph.ownership import OwnershipIndex
+
+# Subcommand dependencies (boto3, graphviz, pydantic, pyhocon, ...) are imported
+# inside the commands so `--help` and `init` stay fast.
 
-IMPORTANT_STACK_DEPENDENCY_TRESHOLD = 4
+logger = logging.getLogger(__name__)
 
 
 @click.group("infra-graph")
 def main():
-    pass
+    configure_logging()
 
 
 @main.command("export", help="Gather data about the infra and visualize them")
@@ -67,6 +63,33 @@ def main():
     type=bool,
     help="Should the results of the stack graph be clustered by service?",
 )
+@click.option(
+    "--cluster-strategy",
+    "cluster_strategy",
+    type=click.Choice(["service", "community", "hybrid"]),
+    default="service",
+    show_default=True,
+    help="Cluster stacks by service tag, by detected dependency communities or by "
+    "service tag with communities for untagged stacks. Other than service implies -c",
+)
+@click.option(
+    "--cluster-levels",
+    "cluster_levels",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Nest communities of communities up to this depth for very large graphs",
+)
+@click.option(
+    "--simplify",
+    "simplify",
+    is_flag=True,
+    default=False,
+    required=False,
+    type=bool,
+    help="Leave out stack graph edges implied by longer paths and bundle parallel "
+    "edges between clusters to speed up rendering",
+)
 @click.option(
     "-o",
     "--output-folder",
@@ -75,21 +98,455 @@ def main():
     default="output",
     help="To which folder to export the generated files",
 )
+@click.option(
+    "--prometheus-metrics",
+    "prometheus_metrics",
+    is_flag=True,
+    default=False,
+    required=False,
+    type=bool,
+    help="Additionally write the run timings in Prometheus text format",
+)
+@click.option(
+    "-s",
+    "--shard-by-service",
+    "shard_by_service",
+    is_flag=True,
+    default=False,
+    required=False,
+    type=bool,
+    help="Write the stack graph and JSON export per service into shards/ with a manifest",
+)
+@click.option(
+    "--shard-workers",
+    "shard_workers",
+    type=int,
+    required=False,
+    help="Number of shards written in parallel. Defaults to the number of CPUs",
+)
+@click.option(
+    "-f",
+    "--focus",
+    "focus_service",
+    required=False,
+    help="Only render the neighbourhood of this service in the stack and service graph",
+)
+@click.option(
+    "-d",
+    "--depth",
+    "focus_depth",
+    type=int,
+    required=False,
+    help="How many dependency hops around the focus service to render. Unlimited by default",
+)
+@click.option(
+    "--direction",
+    "focus_direction",
+    type=click.Choice(["upstream", "downstream", "both"]),
+    default="both",
+    show_default=True,
+    help="Follow the dependencies of the focus service, its dependents or both",
+)
+@click.option(
+    "--report",
+    "detailed_report",
+    is_flag=True,
+    default=False,
+    required=False,
+    type=bool,
+    help="Write all stack, resource and export details to report.txt in the output folder",
+)
+@click.option(
+    "--profile",
+    "profile_modes",
+    type=click.Choice(["cprofile", "sampling", "memory"]),
+    multiple=True,
+    required=False,
+    help="Profile the run and store the results in the output folder. Can be repeated",
+)
+@click.option(
+    "--renderer",
+    "renderer",
+    type=click.Choice(["graphviz", "html"]),
+    default="graphviz",
+    show_default=True,
+    help="Render PNGs with Graphviz or write graph JSON with an interactive HTML viewer",
+)
+@click.option(
+    "--render-cache/--no-render-cache",
+    "render_cache",
+    default=True,
+    show_default=True,
+    help="Reuse the PNG of an identical graph from an earlier run instead of running dot",
+)
+@click.option(
+    "--snapshot-db",
+    "snapshot_db",
+    type=click.Path(dir_okay=False),
+    required=False,
+    help="SQLite snapshot store used as cache. --refresh appends a new snapshot to it",
+)
+@click.option(
+    "--from-snapshot",
+    "from_snapshot",
+    type=click.Path(exists=True),
+    required=False,
+    help="Build the graphs offline from an export.json, an output folder or a snapshot store",
+)
+@click.option(
+    "--from-cdk-out",
+    "from_cdk_out",
+    type=click.Path(exists=True, file_okay=False),
+    required=False,
+    help="Build the graphs before deployment from a synthesized CDK cloud assembly (cdk.out)",
+)
+@click.option(
+    "-a",
+    "--all-projects",
+    "all_projects",
+    is_flag=True,
+    default=False,
+    required=False,
+    type=bool,
+    help="Export every configured project from a single scan, plus a cross-project service graph",
+)
 def export(
     env: str,
     project_name: str,
     refresh: bool,
     cluster_stack_graph: bool,
+    cluster_strategy: str,
+    cluster_levels: int,
+    simplify: bool,
     output_folder: str,
+    prometheus_metrics: bool,
+    shard_by_service: bool,
+    shard_workers: Optional[int],
+    focus_service: Optional[str],
+    focus_depth: Optional[int],
+    focus_direction: str,
+    detailed_report: bool,
+    profile_modes: Tuple[str, ...],
+    renderer: str,
+    render_cache: bool,
+    snapshot_db: Optional[str],
+    from_snapshot: Optional[str],
+    from_cdk_out: Optional[str],
+    all_projects: bool,
 ):
+    # First party
+    from aws_infra_graph.config import load_config
+    from aws_infra_graph.projects import AllProjectsExporter
+    from aws_infra_graph.profiling import profiled
+    from aws_infra_graph.render_cache import RenderCache
+    from aws_infra_graph.cdk_extractor import CdkDataExtractor
+    from aws_infra_graph.graph_exporter import (
+        FocusOptions,
+        ClusterOptions,
+        InfraGraphExporter,
+    )
+    from aws_infra_graph.snapshot_store import SnapshotStore
+    from aws_infra_graph.offline_extractor import OfflineDataExtractor
+
+    if all_projects and (project_name or snapshot_db):
+        raise click.UsageError(
+            "--all-projects can not be combined with --project-name or --snapshot-db"
+        )
+    if from_snapshot and from_cdk_out:
+        raise click.UsageError("Use either --from-snapshot or --from-cdk-out")
+
     logger.info(f"{Fore.BLUE}Starting infra export for {env}.")
-    exporter = InfraGraphExporter(
-        env=env, project_name=project_name, output_folder=output_folder
+    config_path = "./config.hocon"
+    data_extractor = None
+    if from_snapshot or from_cdk_out:
+        config = load_config(config_path)
+        # snapshots and cloud assemblies may hold the stacks of several projects
+        stack_prefix = None
+        if not all_projects:
+            stack_prefix = f"{project_name or config.default_project}-{env}"
+    if from_snapshot:
+        data_extractor = OfflineDataExtractor(from_snapshot, stack_prefix)
+    elif from_cdk_out:
+        data_extractor = CdkDataExtractor(
+            from_cdk_out, config.service_tags, config.component_tags, stack_prefix
+        )
+    cache = RenderCache() if render_cache else None
+    focus = (
+        FocusOptions(focus_service, focus_depth, focus_direction)
+        if focus_service
+        else None
     )
-    exporter.export(refresh, cluster_stack_graph)
+    snapshot_context = (
+        SnapshotStore(snapshot_db) if snapshot_db else contextlib.nullcontext()
+    )
+    with snapshot_context as snapshot_store:
+        if all_projects:
+            exporter = AllProjectsExporter(
+                env=env,
+                output_folder=output_folder,
+                config_path=config_path,
+                data_extractor=data_extractor,
+                render_cache=cache,
+            )
+        else:
+            exporter = InfraGraphExporter(
+                env=env,
+                project_name=project_name,
+                output_folder=output_folder,
+                config_path=config_path,
+                data_extractor=data_extractor,
+                snapshot_store=snapshot_store,
+                render_cache=cache,
+            )
+        with profiled(profile_modes, output_folder):
+            exporter.export(
+                refresh,
+                cluster_stack_graph or cluster_strategy != "service",
+                prometheus_metrics,
+                detailed_report,
+                shard_by_service,
+                shard_workers,
+                focus,
+                renderer,
+                ClusterOptions(cluster_strategy, cluster_levels),
+                simplify,
+            )
+
+
+@main.command(
+    "stats", help="Resource statistics of the cached snapshot, without extraction"
+)
+@click.option(
+    "-b",
+    "--by",
+    "dimension",
+    type=click.Choice(["type", "service", "component", "stack"]),
+    default="service",
+    show_default=True,
+    help="Group the resources by this dimension",
+)
+@click.option(
+    "-n",
+    "--top",
+    "limit",
+    type=int,
+    default=10,
+    show_default=True,
+    help="Number of groups to show",
+)
+@click.option(
+    "--from-snapshot",
+    "from_snapshot",
+    type=click.Path(exists=True),
+    required=False,
+    help="Use an export.json, an output folder or a snapshot store instead of the disc cache",
+)
+@click.option(
+    "--json",
+    "as_json",
+    is_flag=True,
+    default=False,
+    type=bool,
+    help="Print all statistics as JSON",
+)
+def stats(dimension: str, limit: int, from_snapshot: Optional[str], as_json: bool):
+    # Core Library
+    import sys
+    import json
+
+    # First party
+    from aws_infra_graph.utils import read_cached
+    from aws_infra_graph.statistics import compute_resource_statistics
+    from aws_infra_graph.offline_extractor import OfflineDataExtractor
+
+    if from_snapshot:
+        stack_infos = OfflineDataExtractor(from_snapshot).gather_stacks()
+    else:
+        stack_infos = read_cached("gather_stacks.cache")
+        if stack_infos is None:
+            logger.error(
+                "No cached snapshot found. Run `export` first or pass --from-snapshot"
+            )
+            sys.exit(1)
+
+    statistics = compute_resource_statistics(stack_infos)
+    if as_json:
+        click.echo(
+            json.dumps(
+                {
+                    "totals": dict(statistics.totals.most_common()),
+                    **statistics.to_dict(),
+                },
+                indent=2,
+            )
+        )
+    elif dimension == "type":
+        for resource_type, count in statistics.top_types(limit):
+            click.echo(f"{count:>8}  {resource_type}")
+    else:
+        for group, count in statistics.top_groups(dimension, limit):
+            top_types = ", ".join(
+                f"{resource_type} {type_count}"
+                for resource_type, type_count in statistics.top_types(
+                    3, dimension, group
+                )
+            )
+            click.echo(f"{count:>8}  {group}  ({top_types})")
+
+
+@main.command("history", help="Show when a service imported exports of another service")
+@click.option(
+    "--snapshot-db",
+    "snapshot_db",
+    type=click.Path(dir_okay=False, exists=True),
+    required=False,
+    help="SQLite snapshot store to query. Defaults to ~/.cache/aws-infra-graph/snapshots.sqlite",
+)
+@click.argument("exporting_service")
+@click.argument("importing_service")
+def history(snapshot_db: Optional[str], exporting_service: str, importing_service: str):
+    # First party
+    from aws_infra_graph.snapshot_store import DEFAULT_SNAPSHOT_DB, SnapshotStore
+
+    with SnapshotStore(snapshot_db or DEFAULT_SNAPSHOT_DB) as store:
+        periods = store.service_dependency_history(exporting_service, importing_service)
+    if not periods:
+        logger.info(
+            f"{importing_service} never imported from {exporting_service} in any snapshot"
+        )
+    for period in periods:
+        logger.info(
+            f"{period.stack_prefix}: {importing_service} imported from "
+            f"{exporting_service} from {period.first_seen} until {period.last_seen}"
+        )
+
+
+def _saved_ownership_index(from_snapshot: Optional[str]) -> Optional["OwnershipIndex"]:
+    """
+    The ownership index saved by the export next to export.json or the disc
+    cache, None if there is none or the stacks changed since
+    """
+    # Core Library
+    from pathlib import Path
+
+    # First party
+    from aws_infra_graph import utils
+    from aws_infra_graph.sharding import SHARDS_FOLDER, MANIFEST_FILE_NAME
+    from aws_infra_graph.ownership import (
+        INDEX_FILE_NAME,
+        INDEX_CACHE_FILE_NAME,
+        OwnershipIndex,
+    )
+    from aws_infra_graph.offline_extractor import EXPORT_FILE_NAME
+
+    if not from_snapshot:
+        return OwnershipIndex.load(
+            utils.SYSTEM_CACHE_ROOT / INDEX_CACHE_FILE_NAME,
+            utils.SYSTEM_CACHE_ROOT / "gather_stacks.cache",
+        )
+    path = Path(from_snapshot)
+    if path.is_dir():
+        source = path / EXPORT_FILE_NAME
+        if not source.exists():
+            source = path / SHARDS_FOLDER / MANIFEST_FILE_NAME
+        return OwnershipIndex.load(path / INDEX_FILE_NAME, source)
+    if path.name == EXPORT_FILE_NAME:
+        return OwnershipIndex.load(path.parent / INDEX_FILE_NAME, path)
+    # snapshot stores keep their own index
+    return None
+
+
+@main.command("whois", help="Find the stack and service owning a physical id or ARN")
+@click.option(
+    "--snapshot-db",
+    "snapshot_db",
+    type=click.Path(dir_okay=False, exists=True),
+    required=False,
+    help="Look up the latest snapshots of this SQLite snapshot store",
+)
+@click.option(
+    "--from-snapshot",
+    "from_snapshot",
+    type=click.Path(exists=True),
+    required=False,
+    help="Use an export.json, an output folder or a snapshot store instead of the disc cache",
+)
+@click.option(
+    "-n",
+    "--limit",
+    "limit",
+    type=int,
+    default=20,
+    show_default=True,
+    help="Maximum number of owners to show",
+)
+@click.option(
+    "--json",
+    "as_json",
+    is_flag=True,
+    default=False,
+    type=bool,
+    help="Print the owners as JSON",
+)
+@click.argument("query")
+def whois(
+    snapshot_db: Optional[str],
+    from_snapshot: Optional[str],
+    limit: int,
+    as_json: bool,
+    query: str,
+):
+    # Core Library
+    import sys
+    import json
+    import dataclasses
+
+    # First party
+    from aws_infra_graph.utils import read_cached
+    from aws_infra_graph.ownership import OwnershipIndex
+    from aws_infra_graph.snapshot_store import SnapshotStore
+    from aws_infra_graph.offline_extractor import OfflineDataExtractor
+
+    if snapshot_db:
+        with SnapshotStore(snapshot_db) as store:
+            matches = store.whois(query, limit)
+    else:
+        index = _saved_ownership_index(from_snapshot)
+        if index is None:
+            if from_snapshot:
+                stack_infos = OfflineDataExtractor(from_snapshot).gather_stacks()
+            else:
+                stack_infos = read_cached("gather_stacks.cache")
+                if stack_infos is None:
+                    logger.error(
+                        "No cached snapshot found. Run `export` first or pass "
+                        "--from-snapshot or --snapshot-db"
+                    )
+                    sys.exit(1)
+            index = OwnershipIndex.from_stack_infos(stack_infos)
+        matches = index.lookup(query, limit)
+
+    if as_json:
+        click.echo(
+            json.dumps([dataclasses.asdict(match) for match in matches], indent=2)
+        )
+    else:
+        for match in matches:
+            owner = match.owner
+            click.echo(
+                f"{owner.stack_name}  {owner.logical_id}  {owner.resource_type}  "
+                f"service={owner.service_name or '-'}  "
+                f"component={owner.component_name or '-'}  ({match.match}: {match.key})"
+            )
+    if not matches:
+        logger.error(f"No resource found for {query}")
+        sys.exit(1)
 
 
 @main.command("init", help="Initialize config after installation")
 def init():
+    # First party
+    from aws_infra_graph.config_bootstrap import init_config
+
     logger.info("Init config")
     init_config()
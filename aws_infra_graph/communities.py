@@ -0,0 +1,155 @@
+# Core Library
+import random
+from typing import Set, Dict, List, Tuple, Iterable, Optional
+from collections import Counter, defaultdict
+
+# First party
+from aws_infra_graph.graph_algorithms import Edge, Node
+
+SERVICE = "service"
+COMMUNITY = "community"
+# service tags where present, communities for the untagged stacks
+HYBRID = "hybrid"
+CLUSTER_STRATEGIES = (SERVICE, COMMUNITY, HYBRID)
+
+LABEL_PROPAGATION_ROUNDS = 20
+# smaller communities are not drawn as a cluster
+MIN_CLUSTER_SIZE = 2
+
+ClusterPath = Tuple[str, ...]
+
+
+def label_propagation(
+    nodes: Iterable[Node],
+    edges: Iterable[Edge],
+    seed: int = 0,
+    max_rounds: int = LABEL_PROPAGATION_ROUNDS,
+) -> Dict[Node, int]:
+    """
+    Communities of the undirected graph: every node repeatedly takes the label
+    most of its neighbours have, until no label changes. Each round is linear
+    in the number of edges and a few rounds suffice. Repeated edges weigh
+    more. Ties keep the current label or take the smallest, so the result only
+    depends on the seed.
+    """
+    edges = list(edges)
+    names = sorted(set(nodes).union(*edges), key=str)
+    position = {name: number for number, name in enumerate(names)}
+    weights: List[Dict[int, int]] = [defaultdict(int) for _ in names]
+    for from_node, to_node in edges:
+        if from_node != to_node:
+            weights[position[from_node]][position[to_node]] += 1
+            weights[position[to_node]][position[from_node]] += 1
+    neighbours = [list(node_weights.items()) for node_weights in weights]
+
+    labels = list(range(len(names)))
+    order = [number for number, adjacent in enumerate(neighbours) if adjacent]
+    shuffle = random.Random(seed).shuffle
+    for _ in range(max_rounds):
+        shuffle(order)
+        changed = False
+        for node in order:
+            votes: Dict[int, int] = defaultdict(int)
+            for neighbour, weight in neighbours[node]:
+                votes[labels[neighbour]] += weight
+            best = max(votes.values())
+            if votes.get(labels[node]) == best:
+                continue
+            labels[node] = min(label for label, vote in votes.items() if vote == best)
+            changed = True
+        if not changed:
+            break
+
+    # number the communities by their first node
+    numbers: Dict[int, int] = {}
+    return {
+        name: numbers.setdefault(labels[number], len(numbers))
+        for number, name in enumerate(names)
+    }
+
+
+def hierarchical_communities(
+    nodes: Iterable[Node], edges: Iterable[Edge], levels: int = 1, seed: int = 0
+) -> Dict[Node, Tuple[int, ...]]:
+    """
+    Communities of communities: every further level runs the label
+    propagation on the graph of the communities of the level below. The path
+    of a node starts with its outermost community.
+    """
+    edges = list(edges)
+    names = set(nodes).union(*edges)
+    paths: Dict[Node, Tuple[int, ...]] = {name: () for name in names}
+    element_of: Dict[Node, Node] = {name: name for name in names}
+    level_nodes: Set[Node] = names
+    level_edges = edges
+    for _ in range(levels):
+        communities = label_propagation(level_nodes, level_edges, seed)
+        if len(set(communities.values())) == len(level_nodes):
+            break  # nothing was merged, further levels would not either
+        for name in names:
+            element_of[name] = communities[element_of[name]]
+            paths[name] = (element_of[name],) + paths[name]
+        level_nodes = set(communities.values())
+        # parallel edges between two communities are kept as their weight
+        level_edges = [
+            (communities[from_node], communities[to_node])
+            for from_node, to_node in level_edges
+            if communities[from_node] != communities[to_node]
+        ]
+    return paths
+
+
+def cluster_paths(
+    nodes: Iterable[Node],
+    edges: Iterable[Edge],
+    service_names: Dict[Node, Optional[str]],
+    strategy: str = SERVICE,
+    levels: int = 1,
+) -> Dict[Node, ClusterPath]:
+    """
+    The nested clusters of every node, outermost first. An empty path draws
+    the node outside of any cluster.
+    """
+    if strategy not in CLUSTER_STRATEGIES:
+        raise ValueError(f"Unknown clustering strategy '{strategy}'")
+    nodes = set(nodes)
+    if strategy == SERVICE:
+        return {
+            node: (service,) if (service := service_names.get(node)) else ()
+            for node in nodes
+        }
+
+    community_paths = _drop_small_clusters(
+        {
+            node: tuple(
+                "community " + ".".join(str(number) for number in communities[:depth])
+                for depth in range(1, len(communities) + 1)
+            )
+            for node, communities in hierarchical_communities(
+                nodes, edges, levels
+            ).items()
+            if strategy == COMMUNITY or not service_names.get(node)
+        }
+    )
+    return {
+        node: community_paths[node]
+        if node in community_paths
+        else (service_names[node],)
+        for node in nodes
+    }
+
+
+def _drop_small_clusters(paths: Dict[Node, ClusterPath]) -> Dict[Node, ClusterPath]:
+    """Leave out clusters below the minimum size or with the members of their parent"""
+    sizes = Counter(
+        path[:depth] for path in paths.values() for depth in range(1, len(path) + 1)
+    )
+    return {
+        node: tuple(
+            cluster
+            for depth, cluster in enumerate(path, start=1)
+            if sizes[path[:depth]] >= MIN_CLUSTER_SIZE
+            and (depth == 1 or sizes[path[:depth]] < sizes[path[: depth - 1]])
+        )
+        for node, path in paths.items()
+    }
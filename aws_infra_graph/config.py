@@ -1,34 +1,27 @@
 from __future__ import annotations
 
 # Core Library
-import os
 import sys
-import json
+import pickle
+import hashlib
 import logging
-import importlib.resources as pkg_resources
-from typing import Dict, List, Optional
+import functools
+from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 
 # Third party
-import coloredlogs
 from pydantic import BaseModel
-from pyhocon.tool import HOCONConverter
-from pyhocon.config_parser import ConfigFactory
 
 # First party
-from aws_infra_graph import data
+from aws_infra_graph.utils import SYSTEM_CACHE_ROOT
+from aws_infra_graph.config_bootstrap import SYSTEM_CONFIG_ROOT, init_config  # noqa
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    format="[%(levelname)s] %(message)s", level=os.getenv("LOG_LEVEL", "INFO")
-)
-coloredlogs.install(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    fmt="[%(levelname)s] %(message)s",
-    logger=logger,
-)
 
-SYSTEM_CONFIG_ROOT = Path.home() / Path(".config/aws-infra-graph")
+CONFIG_CACHE_ROOT = SYSTEM_CACHE_ROOT / Path("config")
+
+# (mtime in ns, size, sha256 of the file contents, validated config)
+CachedConfig = Tuple[int, int, str, "InfraGraphConfig"]
 
 
 class InfraGraphConfig(BaseModel):
@@ -51,6 +44,7 @@ class ProjectConfig(BaseModel):
     internal_manual_dependencies: Optional[
         Dict[str, List[ManualInternalDependency]]
     ] = None
+    filters: Optional[FilterConfig] = None
 
     class Config:
         allow_population_by_field_name = True
@@ -60,6 +54,22 @@ class ProjectConfig(BaseModel):
         }
 
 
+class FilterConfig(BaseModel):
+    stack_names: List[str] = []
+    exclude_stack_names: List[str] = []
+    services: List[str] = []
+    exclude_services: List[str] = []
+    tags: Dict[str, str] = {}
+
+    class Config:
+        allow_population_by_field_name = True
+        fields = {
+            "stack_names": "stackNames",
+            "exclude_stack_names": "excludeStackNames",
+            "exclude_services": "excludeServices",
+        }
+
+
 class ManualDependency(BaseModel):
     team: str
     service: str
@@ -69,27 +79,13 @@ class ManualInternalDependency(BaseModel):
     service: str
 
 
-def init_config():
-    config_root = SYSTEM_CONFIG_ROOT
-    target_config = config_root / "config.hocon"
-    template_body = pkg_resources.read_text(data, "config-empty.hocon")
-    if not target_config.exists():
-        logger.info(
-            f"Bootstraping config {target_config} from template. Adapt to your needs afterwards"
-        )
-        if not config_root.exists():
-            config_root.mkdir(parents=True)
-        target_config.touch()
-        with open(target_config, mode="w") as file:
-            file.write(template_body)
-    else:
-        logger.info(
-            f"Config {target_config} does already exist. Displaying current template if update is needed"
-        )
-        print(template_body)
-
-
-def load_config(config_path: str) -> InfraGraphConfig:
+def load_config(config_path: str, use_cache: bool = True) -> InfraGraphConfig:
+    """
+    Load and validate the HOCON config. The validated model is cached per config
+    file and config schema, and reused as long as the file's mtime/size or
+    content hash is unchanged. Files pulled in via HOCON `include` are not part
+    of the key.
+    """
     system_config_path = SYSTEM_CONFIG_ROOT / "config.hocon"
     config = Path(config_path)
     if config.exists():
@@ -103,10 +99,88 @@ def load_config(config_path: str) -> InfraGraphConfig:
         )
         sys.exit(1)
 
+    if not use_cache:
+        return _parse_config(config_to_load)
+
+    cache_path = _config_cache_path(config_to_load)
+    stat = config_to_load.stat()
+    cached = _read_config_cache(cache_path)
+    if cached is not None:
+        cached_mtime, cached_size, cached_digest, cached_config = cached
+        if (cached_mtime, cached_size) == (stat.st_mtime_ns, stat.st_size):
+            logger.debug(f"Using cached config '{cache_path}'")
+            return cached_config
+        digest = _file_digest(config_to_load)
+        if digest == cached_digest:
+            # only touched, the content is unchanged -> refresh the mtime key
+            _write_config_cache(cache_path, stat, digest, cached_config)
+            return cached_config
+    else:
+        digest = _file_digest(config_to_load)
+
+    config_model = _parse_config(config_to_load)
+    _write_config_cache(cache_path, stat, digest, config_model)
+    return config_model
+
+
+def _parse_config(config_to_load: Path) -> InfraGraphConfig:
+    # Third party
+    from pyhocon.config_parser import ConfigFactory
+
     hocon_conf = ConfigFactory.parse_file(config_to_load)
-    config_dict = json.loads(HOCONConverter.to_json(hocon_conf.get("infraGraph")))
+    config_dict = hocon_conf.get("infraGraph").as_plain_ordered_dict()
     return InfraGraphConfig(**config_dict)
 
 
+def _config_cache_path(config_to_load: Path) -> Path:
+    """
+    Keyed by config file and model schema: a model pickled before a field was
+    added would load without that field, so it is never read again
+    """
+    path_digest = hashlib.sha1(str(config_to_load.resolve()).encode()).hexdigest()
+    return CONFIG_CACHE_ROOT / f"{path_digest}-{_schema_digest()[:12]}.pickle"
+
+
+@functools.lru_cache(maxsize=None)
+def _schema_digest() -> str:
+    """Changes with every field added to the config models"""
+    schema = InfraGraphConfig.schema_json(sort_keys=True)
+    return hashlib.sha256(schema.encode()).hexdigest()
+
+
+def _file_digest(path: Path) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def _read_config_cache(cache_path: Path) -> Optional[CachedConfig]:
+    if not cache_path.exists():
+        return None
+    try:
+        with open(cache_path, "rb") as cachehandle:
+            return pickle.load(cachehandle)
+    except Exception as e:  # a stale or corrupt cache is never fatal
+        logger.debug(f"Ignoring unreadable config cache '{cache_path}': {e}")
+        return None
+
+
+def _write_config_cache(
+    cache_path: Path, stat, digest: str, config_model: InfraGraphConfig
+) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "wb") as cachehandle:
+            pickle.dump(
+                (stat.st_mtime_ns, stat.st_size, digest, config_model), cachehandle
+            )
+        # entries of the same config file written for another schema
+        path_digest = cache_path.name.split("-")[0]
+        for stale in cache_path.parent.glob(f"{path_digest}*.pickle"):
+            if stale != cache_path:
+                stale.unlink()
+    except OSError as e:
+        logger.debug(f"Could not write config cache '{cache_path}': {e}")
+
+
 InfraGraphConfig.update_forward_refs()
 ProjectConfig.update_forward_refs()
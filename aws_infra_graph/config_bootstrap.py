@@ -0,0 +1,31 @@
+# Core Library
+import logging
+import importlib.resources as pkg_resources
+from pathlib import Path
+
+# First party
+from aws_infra_graph import data
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_CONFIG_ROOT = Path.home() / Path(".config/aws-infra-graph")
+
+
+def init_config():
+    config_root = SYSTEM_CONFIG_ROOT
+    target_config = config_root / "config.hocon"
+    template_body = pkg_resources.read_text(data, "config-empty.hocon")
+    if not target_config.exists():
+        logger.info(
+            f"Bootstraping config {target_config} from template. Adapt to your needs afterwards"
+        )
+        if not config_root.exists():
+            config_root.mkdir(parents=True)
+        target_config.touch()
+        with open(target_config, mode="w") as file:
+            file.write(template_body)
+    else:
+        logger.info(
+            f"Config {target_config} does already exist. Displaying current template if update is needed"
+        )
+        print(template_body)
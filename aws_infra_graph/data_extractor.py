@@ -1,40 +1,42 @@
 #! /usr/bin/env python
 
 # Core Library
-import os
-import re
-import csv
 import time
 import logging
-from typing import Any, Dict, List, Iterable, Optional, Protocol
+from typing import Any, Set, Dict, List, Iterable, Optional, Protocol, NamedTuple
+from pathlib import Path
 
 # Third party
 import boto3
-import coloredlogs
 from colorama import Style
 from colorama.ansi import Fore
 from botocore.exceptions import ClientError
 from boto3_type_annotations import cloudformation
 
 # First party
-from aws_infra_graph.model import (
-    StackInfo,
-    StackExport,
-    StackResource,
-    StackParameter,
-    ExternalDependency,
+from aws_infra_graph.model import StackInfo, StackExport, StackResource, StackParameter
+from aws_infra_graph.utils import (
+    file_cached,
+    build_tag_search_patterns,
+    parse_external_dependency,
 )
-from aws_infra_graph.utils import file_cached, build_tag_search_patterns
+from aws_infra_graph.filters import StackFilter, stack_name_from_id
+from aws_infra_graph.journal import JOURNAL_SUFFIX, CheckpointJournal
+from aws_infra_graph.symbols import Symbols
+from aws_infra_graph.instrumentation import InstrumentedClient, instrumentation
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    format="[%(levelname)s] %(message)s", level=os.getenv("LOG_LEVEL", "INFO")
-)
-coloredlogs.install(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    fmt="[%(levelname)s] %(message)s",
-    logger=logger,
-)
+
+STACKS_JOURNAL = "gather_stacks"
+IMPORTS_JOURNAL = "list_imports"
+
+
+class ExportRef(NamedTuple):
+    """An export as listed, before its imports are known"""
+
+    export_name: str
+    exporting_stack_name: str
+    export_value: str
 
 
 class IDataExtractor(Protocol):
@@ -50,34 +52,63 @@ class DataExtractor:
     cfn_client: cloudformation.Client
 
     def __init__(
-        self, stack_prefix: str, service_tags: List[str], component_tags: List[str]
+        self,
+        stack_prefix: str,
+        service_tags: List[str],
+        component_tags: List[str],
+        cfn_client: Optional[cloudformation.Client] = None,
+        throttle_delay: float = 0.1,
+        symbols: Optional[Symbols] = None,
+        stack_filter: Optional[StackFilter] = None,
+        checkpoint_folder: Optional[Path] = None,
     ) -> None:
         self.stack_prefix = stack_prefix
-        self.cfn_client = boto3.client("cloudformation")
+        self.checkpoint_folder = checkpoint_folder
+        self.symbols = symbols or Symbols.for_stack_prefix(stack_prefix)
+        self.stack_filter = stack_filter or StackFilter(stack_prefix)
+        self.throttle_delay = throttle_delay
+        self.cfn_client = InstrumentedClient(
+            cfn_client or boto3.client("cloudformation"),
+            "cloudformation",
+            instrumentation,
+        )
         self.service_tag_search_patterns = build_tag_search_patterns(service_tags)
         self.component_tag_search_patterns = build_tag_search_patterns(component_tags)
 
     @file_cached("gather_and_filter_exports.cache")
     def gather_and_filter_exports(self, stacks: List[StackInfo]) -> List[StackExport]:
+        stack_names = {stack.stack_name for stack in stacks}
         exports_raw = self._gather_raw_exports()
-        exports = list(self._extract_exports(exports_raw))
+        exports = self._extract_exports(exports_raw, stack_names)
         logger.info(f"{Style.BRIGHT}Number of exports gathered: {len(exports)}")
-        exports_enriched = list(self._match_exports_with_imports(exports))
-        logger.info(
-            f"{Style.BRIGHT}Number of import-enriched exports gathered: {len(exports_enriched)}"
-        )
-        exports_with_service_names = list(
-            self._enrich_service_name(exports_enriched, stacks)
+        exports_enriched = list(
+            self._match_exports_with_imports(
+                exports, stack_names, self._service_of_stack(stacks)
+            )
         )
         logger.info(
-            f"{Style.BRIGHT}Number of import-enriched exports with service names gathered: {len(exports_with_service_names)}"
+            f"{Style.BRIGHT}Number of import-enriched exports with service names gathered: {len(exports_enriched)}"
         )
-        return exports_with_service_names
+        self._journal(IMPORTS_JOURNAL).delete()
+        return exports_enriched
 
     @file_cached("gather_stacks.cache")
     def gather_stacks(self) -> List[StackInfo]:
         logger.info(f"{Fore.BLUE}Gather data. Can take some minutes.")
-        return list(self._gather_stacks_gen())
+        stacks = list(self._gather_stacks_gen())
+        self._journal(STACKS_JOURNAL).delete()
+        return stacks
+
+    def _journal(self, name: str) -> CheckpointJournal:
+        """Checkpoints of an extraction step, disabled without checkpoint folder"""
+        if self.checkpoint_folder is None:
+            return CheckpointJournal(None)
+        return CheckpointJournal(
+            self.checkpoint_folder / f"{self._checkpoint_name()}.{name}{JOURNAL_SUFFIX}"
+        )
+
+    def _checkpoint_name(self) -> str:
+        return self.stack_prefix
 
     def _gather_stacks_gen(self) -> Iterable[StackInfo]:
         paginator = self.cfn_client.get_paginator("list_stacks")
@@ -96,53 +127,81 @@ class DataExtractor:
             ]
         )
 
-        for page in pages:
-            stacks = page["StackSummaries"]
-            logger.debug(f"Nr of stacks in page: {len(stacks)}")
-            for stack in stacks:
-                stack_name = stack["StackName"]
-                if stack_name.startswith(self._get_stack_prefix()):
-                    yield self._gather_stack_info(stack_name)
-                    time.sleep(0.1)  # avoid throttling
-
-    def _gather_stack_info(self, stack_name) -> StackInfo:
+        with self._journal(STACKS_JOURNAL) as journal:
+            checkpointed = journal.load()
+            for page in pages:
+                stacks = page["StackSummaries"]
+                logger.debug(f"Nr of stacks in page: {len(stacks)}")
+                for stack in stacks:
+                    stack_name = stack["StackName"]
+                    if stack_name in checkpointed:
+                        stack_info = checkpointed[stack_name]
+                    else:
+                        stack_filter = self._filter_of(stack_name)
+                        if not (stack_filter and stack_filter.matches_name(stack_name)):
+                            continue
+                        stack_info = self._gather_stack_info(stack_name, stack_filter)
+                        # filtered stacks are recorded as None to skip them as well
+                        journal.append(stack_name, stack_info)
+                        time.sleep(self.throttle_delay)  # avoid throttling
+                    if stack_info is not None:
+                        yield stack_info
+
+    def _filter_of(self, stack_name: str) -> Optional[StackFilter]:
+        """The filter of the project the stack belongs to, None for other stacks"""
+        if stack_name.startswith(self.stack_filter.prefix):
+            return self.stack_filter
+        return None
+
+    def _gather_stack_info(
+        self, stack_name: str, stack_filter: Optional[StackFilter] = None
+    ) -> Optional[StackInfo]:
+        stack_filter = stack_filter or self.stack_filter
         stack_detail_results = self.cfn_client.describe_stacks(StackName=stack_name)
+        stack_details = stack_detail_results["Stacks"][0]
+        stack_tags = stack_details["Tags"]
+        service_name = self._get_service_name(stack_tags)
+        if not (
+            stack_filter.matches_tags(stack_tags)
+            and stack_filter.matches_service(service_name)
+        ):
+            logger.debug(f"stack filtered: {stack_name}")
+            return None
+
         stack_template_details_result = self.cfn_client.get_template_summary(
             StackName=stack_name
         )
         stack_resource_details = self.cfn_client.describe_stack_resources(
             StackName=stack_name
         )
-        stack_details = stack_detail_results["Stacks"][0]
-        stack_tags = stack_details["Tags"]
         logger.debug(f"stack: {stack_name}")
         resources = self._extract_resources(stack_resource_details["StackResources"])
         parameters = self._extract_parameters(
             stack_details, stack_template_details_result
         )
-        service_name = self._get_service_name(stack_tags)
         component_name = self._get_component_name(stack_tags)
         return StackInfo(
-            stack_name=stack_name,
+            stack_name=self.symbols.stacks.intern(stack_name),
             service_name=service_name,
             component_name=component_name,
             parameters=parameters,
             resources=resources,
         )
 
-    @staticmethod
-    def _extract_resources(resource_details: Dict):
+    def _extract_resources(self, resource_details: Dict):
         return [
             StackResource(
                 logical_id=resource_detail["LogicalResourceId"],
                 physical_id=resource_detail.get("PhysicalResourceId"),
-                resource_type=resource_detail["ResourceType"],
+                resource_type=self.symbols.resource_types.intern(
+                    resource_detail["ResourceType"]
+                ),
             )
             for resource_detail in resource_details
         ]
 
     def _get_service_name(self, stack_tags) -> Optional[str]:
-        return next(
+        service_name = next(
             (
                 result
                 for pattern in self.service_tag_search_patterns
@@ -150,9 +209,10 @@ class DataExtractor:
             ),
             None,
         )
+        return self.symbols.services.intern(service_name) if service_name else None
 
     def _get_component_name(self, stack_tags) -> Optional[str]:
-        return next(
+        component_name = next(
             (
                 result
                 for pattern in self.component_tag_search_patterns
@@ -160,6 +220,9 @@ class DataExtractor:
             ),
             None,
         )
+        return (
+            self.symbols.components.intern(component_name) if component_name else None
+        )
 
     def _gather_raw_exports(self) -> List[Dict[Any, Any]]:
         should_paginate = True
@@ -197,102 +260,128 @@ class DataExtractor:
         for parameter in stack_template_details["Parameters"]:
             name = parameter["ParameterKey"]
             description = parameter.get("Description")
-            # TODO exceptions
-            external_dep = None
-            if description and "|" in description:
-                metadata_part = description.split("|")[1].strip()
-                metadata = list(
-                    [row for row in csv.reader([metadata_part], delimiter=",")]
-                )[0]
-                metadata_transformed = {
-                    metadata_entry.split("=")[0]: metadata_entry.split("=")[1]
-                    for metadata_entry in metadata
-                }
-                external_dep = ExternalDependency(
-                    team_name=metadata_transformed["team"],
-                    service_name=metadata_transformed["service"],
-                )
-
             params[name] = StackParameter(
                 name=params[name].name,
                 value=params[name].value,
                 description=description,
-                external_dependency=external_dep,
+                external_dependency=parse_external_dependency(description),
             )
 
         return list(params.values())
 
-    def _get_stack_prefix(self) -> str:
-        return self.stack_prefix
-
-    def _extract_exports(self, raw_exports: List[Dict]) -> Iterable[StackExport]:
+    def _extract_exports(
+        self, raw_exports: List[Dict], stack_names: Set[str]
+    ) -> List[ExportRef]:
         return [
             extracted_export
             for export in raw_exports
-            if (extracted_export := self._extract_export(export))
+            if (extracted_export := self._extract_export(export, stack_names))
         ]
 
-    def _extract_export(self, raw_export: Dict):
-        stack_id = raw_export["ExportingStackId"]
-        match = re.search(".*/(.*)/.*", stack_id)
-        if match:
-            stack = match.group(1)
-            name = raw_export["Name"]
-            value = raw_export["Value"]
-
-            if stack.startswith(self._get_stack_prefix()):
-                return StackExport(
-                    export_name=name, exporting_stack_name=stack, export_value=value
-                )
+    def _extract_export(
+        self, raw_export: Dict, stack_names: Set[str]
+    ) -> Optional[ExportRef]:
+        # only exports of extracted stacks are kept, dropping the others here
+        # saves their list_imports calls
+        stack = stack_name_from_id(raw_export["ExportingStackId"])
+        if stack not in stack_names:
+            return None
+        return ExportRef(
+            export_name=raw_export["Name"],
+            exporting_stack_name=self.symbols.stacks.intern(stack),
+            export_value=raw_export["Value"],
+        )
 
     def _match_exports_with_imports(
-        self, exports: List[StackExport]
+        self,
+        exports: List[ExportRef],
+        stack_names: Set[str],
+        service_of_stack: Dict[str, str],
     ) -> Iterable[StackExport]:
-        for export in exports:
-            export_name = export.export_name
-            should_paginate = True
-            next_token = None
-            imports: List[str] = []
-            try:
-                while should_paginate:
-                    logger.debug(
-                        f"Gather import stacks for export name: {export_name}"
-                    )  # TODO investigate pagniators
-                    result = (
-                        self.cfn_client.list_imports(
-                            ExportName=export_name, NextToken=next_token
-                        )
-                        if next_token
-                        else self.cfn_client.list_imports(ExportName=export_name)
-                    )
-                    next_token = result.get("NextToken", None)
-                    imports.extend(result["Imports"])
-                    if not next_token:
-                        should_paginate = False
-            except ClientError as e:
-                if "is not imported by any stack" in str(e):
-                    continue
+        """
+        Look up the importing stacks and services of every export. Each
+        StackExport is built once here with all of its fields.
+        """
+        with self._journal(IMPORTS_JOURNAL) as journal:
+            checkpointed = journal.load()
+            for export in exports:
+                export_name = export.export_name
+                if export_name in checkpointed:
+                    imports = checkpointed[export_name]
                 else:
-                    raise
+                    imports = self._list_imports(export_name, stack_names)
+                    journal.append(export_name, imports)
+                if imports is None:
+                    continue
 
-            yield StackExport(
-                export_name=export_name,
-                exporting_stack_name=export.exporting_stack_name,
-                export_value=export.export_value,
-                importing_stacks=imports,
-            )
+                yield StackExport(
+                    export_name=export_name,
+                    exporting_stack_name=export.exporting_stack_name,
+                    export_value=export.export_value,
+                    importing_stacks=imports,
+                    export_service=service_of_stack.get(export.exporting_stack_name),
+                    importing_services=[
+                        service_of_stack[importing_stack]
+                        for importing_stack in imports
+                        if importing_stack in service_of_stack
+                    ],
+                )
+
+    def _list_imports(
+        self, export_name: str, stack_names: Set[str]
+    ) -> Optional[List[str]]:
+        """The importing stacks of an export, None if it is not imported at all"""
+        should_paginate = True
+        next_token = None
+        imports: List[str] = []
+        try:
+            while should_paginate:
+                logger.debug(
+                    f"Gather import stacks for export name: {export_name}"
+                )  # TODO investigate pagniators
+                result = (
+                    self.cfn_client.list_imports(
+                        ExportName=export_name, NextToken=next_token
+                    )
+                    if next_token
+                    else self.cfn_client.list_imports(ExportName=export_name)
+                )
+                next_token = result.get("NextToken", None)
+                imports.extend(
+                    self.symbols.stacks.intern(importing_stack)
+                    for importing_stack in result["Imports"]
+                    if not self._is_filtered_stack(importing_stack, stack_names)
+                )
+                if not next_token:
+                    should_paginate = False
+        except ClientError as e:
+            if "is not imported by any stack" in str(e):
+                return None
+            else:
+                raise
+        return imports
+
+    def _is_filtered_stack(self, stack_name: str, stack_names: Set[str]) -> bool:
+        """Importing stacks of other projects are kept, filtered ones of this one not"""
+        return self._filter_of(stack_name) is not None and stack_name not in stack_names
+
+    @staticmethod
+    def _service_of_stack(stack_infos: List[StackInfo]) -> Dict[str, str]:
+        """Service names by stack name, for the stacks that have one"""
+        return {
+            stack_info.stack_name: stack_info.service_name
+            for stack_info in stack_infos
+            if stack_info.service_name is not None
+        }
 
     @staticmethod
     def _enrich_service_name(
         exports_enriched: List[StackExport], stack_infos: List[StackInfo]
     ) -> Iterable[StackExport]:
-        grouped_by_stack = {}
-        for stack_info in stack_infos:
-            if stack_info.service_name is not None:
-                grouped_by_stack[stack_info.stack_name] = stack_info.service_name
-
+        """Copies of the exports with the services of the given stacks only"""
+        grouped_by_stack = DataExtractor._service_of_stack(stack_infos)
         for export in exports_enriched:
-            service_name = grouped_by_stack[export.exporting_stack_name]
+            service_name = grouped_by_stack.get(export.exporting_stack_name)
             importing_services = [
                 grouped_by_stack[importing_stack]
                 for importing_stack in export.importing_stacks
@@ -0,0 +1,79 @@
+# Core Library
+import re
+import fnmatch
+from typing import Any, Dict, List, Pattern, Iterable, Optional, FrozenSet
+
+# Stack tags as returned by CloudFormation: [{"Key": ..., "Value": ...}]
+Tags = List[Dict[str, Any]]
+
+
+class StackFilter:
+    """
+    Decides which stacks and exports are extracted. The checks are ordered by
+    the data they need, so stacks can be dropped before further API calls:
+    the name is known from list_stacks, tags and service after describe_stacks.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        stack_names: Iterable[str] = (),
+        exclude_stack_names: Iterable[str] = (),
+        services: Iterable[str] = (),
+        exclude_services: Iterable[str] = (),
+        tags: Optional[Dict[str, str]] = None,
+    ):
+        self.prefix = prefix
+        self.include_names = _compile_globs(stack_names)
+        self.exclude_names = _compile_globs(exclude_stack_names)
+        self.services: FrozenSet[str] = frozenset(services)
+        self.exclude_services: FrozenSet[str] = frozenset(exclude_services)
+        self.tags = dict(tags or {})
+
+    @classmethod
+    def from_config(cls, prefix: str, filter_config) -> "StackFilter":
+        if filter_config is None:
+            return cls(prefix)
+        return cls(
+            prefix,
+            stack_names=filter_config.stack_names,
+            exclude_stack_names=filter_config.exclude_stack_names,
+            services=filter_config.services,
+            exclude_services=filter_config.exclude_services,
+            tags=filter_config.tags,
+        )
+
+    def matches_name(self, stack_name: str) -> bool:
+        if not stack_name.startswith(self.prefix):
+            return False
+        if self.include_names and not self.include_names.match(stack_name):
+            return False
+        return not (self.exclude_names and self.exclude_names.match(stack_name))
+
+    def matches_tags(self, stack_tags: Tags) -> bool:
+        if not self.tags:
+            return True
+        tag_values = {tag["Key"]: tag["Value"] for tag in stack_tags}
+        return all(tag_values.get(key) == value for key, value in self.tags.items())
+
+    def matches_service(self, service_name: Optional[str]) -> bool:
+        if self.services and service_name not in self.services:
+            return False
+        return service_name not in self.exclude_services
+
+
+def _compile_globs(globs: Iterable[str]) -> Optional[Pattern]:
+    """One regex for all globs, so a name is matched in a single call"""
+    globs = list(globs)
+    if not globs:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(glob)})" for glob in globs))
+
+
+def stack_name_from_id(stack_id: str) -> Optional[str]:
+    """
+    The stack name of an ARN like
+    arn:aws:cloudformation:eu-west-1:123456789012:stack/<name>/<uuid>
+    """
+    parts = stack_id.rsplit("/", 2)
+    return parts[1] if len(parts) == 3 else None
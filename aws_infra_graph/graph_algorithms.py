@@ -0,0 +1,162 @@
+# Core Library
+from typing import (
+    Set,
+    Dict,
+    List,
+    Tuple,
+    Mapping,
+    Hashable,
+    Iterable,
+    Optional,
+    DefaultDict,
+)
+from collections import defaultdict
+
+Node = Hashable
+Edge = Tuple[Node, Node]
+
+UPSTREAM = "upstream"
+DOWNSTREAM = "downstream"
+BOTH = "both"
+DIRECTIONS = (UPSTREAM, DOWNSTREAM, BOTH)
+
+
+def build_adjacency(edges: Iterable[Edge]) -> DefaultDict[Node, List[Node]]:
+    adjacency: DefaultDict[Node, List[Node]] = defaultdict(list)
+    for from_node, to_node in edges:
+        adjacency[from_node].append(to_node)
+    return adjacency
+
+
+def neighbourhood(
+    edges: Iterable[Edge],
+    seeds: Iterable[Node],
+    depth: Optional[int] = None,
+    direction: str = BOTH,
+) -> Set[Node]:
+    """
+    Nodes reachable from the seeds within `depth` hops (unlimited if None).
+    Edges point from the exporting (upstream) to the importing (downstream)
+    side; `both` follows each direction separately, so it returns the union of
+    the upstream and downstream neighbourhoods, not everything connected.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Unknown direction '{direction}'")
+    edges = list(edges)
+    seeds = set(seeds)
+    result = set(seeds)
+    if direction in (DOWNSTREAM, BOTH):
+        result |= _breadth_first(build_adjacency(edges), seeds, depth)
+    if direction in (UPSTREAM, BOTH):
+        reversed_edges = ((to_node, from_node) for from_node, to_node in edges)
+        result |= _breadth_first(build_adjacency(reversed_edges), seeds, depth)
+    return result
+
+
+def _breadth_first(
+    adjacency: Dict[Node, List[Node]], seeds: Set[Node], depth: Optional[int]
+) -> Set[Node]:
+    visited = set(seeds)
+    frontier = list(seeds)
+    level = 0
+    while frontier and (depth is None or level < depth):
+        next_frontier = []
+        for node in frontier:
+            for neighbour in adjacency.get(node, ()):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+        level += 1
+    return visited
+
+
+def strongly_connected_components(
+    nodes: Iterable[Node], adjacency: Mapping[Node, Iterable[Node]]
+) -> List[List[Node]]:
+    """
+    Tarjan's algorithm without recursion, stacks deeper than the recursion
+    limit are common in large accounts. Components come in reverse
+    topological order: a component only has edges to components before it.
+    """
+    index: Dict[Node, int] = {}
+    low_link: Dict[Node, int] = {}
+    on_stack: Set[Node] = set()
+    stack: List[Node] = []
+    components: List[List[Node]] = []
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = low_link[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(adjacency.get(root, ())))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = low_link[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(adjacency.get(successor, ()))))
+                    break
+                if successor in on_stack:
+                    low_link[node] = min(low_link[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low_link[parent] = min(low_link[parent], low_link[node])
+                if low_link[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def transitive_reduction(edges: Iterable[Edge]) -> Set[Edge]:
+    """
+    The edges without those implied by a longer path. Cycles are kept: the
+    reduction runs on the condensation, where an edge between two strongly
+    connected components is dropped when its target component is reachable
+    through another successor component. Edges inside a component stay, as
+    do parallel edges between two components that are not implied.
+    """
+    edges = set(edges)
+    adjacency = build_adjacency(edges)
+    nodes = set(adjacency).union(*adjacency.values())
+    components = strongly_connected_components(nodes, adjacency)
+    component_of: Dict[Node, int] = {
+        node: number
+        for number, component in enumerate(components)
+        for node in component
+    }
+
+    # components come sinks first, so the successors are done before a
+    # component is reached; all sets are bit sets over the component numbers
+    reachable: List[int] = []
+    implied: List[int] = []  # reachable through another successor component
+    for number, component in enumerate(components):
+        successors = 0
+        for node in component:
+            for target in adjacency[node]:
+                if component_of[target] != number:
+                    successors |= 1 << component_of[target]
+        beyond = 0
+        remaining = successors
+        while remaining:
+            lowest = remaining & -remaining
+            beyond |= reachable[lowest.bit_length() - 1]
+            remaining ^= lowest
+        reachable.append(successors | beyond)
+        implied.append(beyond)
+    return {
+        (from_node, to_node)
+        for from_node, to_node in edges
+        if not implied[component_of[from_node]] >> component_of[to_node] & 1
+    }
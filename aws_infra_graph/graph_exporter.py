@@ -2,19 +2,38 @@
 
 # Core Library
 import os
+import json
+import math
+import shutil
 import logging
-import collections
-from typing import Set, Dict, List, Tuple, Counter, Optional, FrozenSet, DefaultDict
+from typing import (
+    Any,
+    Set,
+    Dict,
+    List,
+    Tuple,
+    Counter,
+    TypeVar,
+    Callable,
+    Optional,
+    FrozenSet,
+)
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import field, fields, replace, dataclass
+from concurrent.futures import ThreadPoolExecutor
 
 # Third party
-import coloredlogs
-from colorama import Fore, Style, init
 from graphviz import Digraph
 
 # First party
-from aws_infra_graph.model import StackInfo, DataExport, StackExport
+from aws_infra_graph.model import (
+    StackInfo,
+    DataExport,
+    StackExport,
+    CentralityScores,
+    ServiceDependency,
+    ImplicitDependency,
+)
 from aws_infra_graph.utils import SYSTEM_CACHE_ROOT
 from aws_infra_graph.config import (
     InfraGraphConfig,
@@ -22,21 +41,39 @@ from aws_infra_graph.config import (
     ManualInternalDependency,
     load_config,
 )
+from aws_infra_graph.report import REPORT_FILE_NAME, log_summary, write_report
+from aws_infra_graph.filters import StackFilter
+from aws_infra_graph.journal import JOURNAL_SUFFIX
+from aws_infra_graph.symbols import Symbols, SymbolTable
+from aws_infra_graph.sharding import (
+    SHARDS_FOLDER,
+    MANIFEST_FILE_NAME,
+    Shard,
+    partition_by_service,
+)
+from aws_infra_graph.ownership import (
+    INDEX_FILE_NAME,
+    INDEX_CACHE_FILE_NAME,
+    OwnershipIndex,
+)
+from aws_infra_graph.centrality import compute_centrality
+from aws_infra_graph.statistics import compute_resource_statistics
+from aws_infra_graph.communities import SERVICE, ClusterPath, cluster_paths
+from aws_infra_graph.render_cache import RenderCache
+from aws_infra_graph.html_renderer import HTML, GRAPHVIZ, GraphDocument
 from aws_infra_graph.data_extractor import DataExtractor, IDataExtractor
-
-init(autoreset=True)
+from aws_infra_graph.snapshot_store import SnapshotStore
+from aws_infra_graph.instrumentation import instrumentation
+from aws_infra_graph.graph_algorithms import BOTH, neighbourhood, transitive_reduction
+from aws_infra_graph.implicit_dependencies import discover_implicit_dependencies
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    format="[%(levelname)s] %(message)s", level=os.getenv("LOG_LEVEL", "INFO")
-)
-coloredlogs.install(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    fmt="[%(levelname)s] %(message)s",
-    logger=logger,
-)
 
+# stacks with more transitive dependents are important
 IMPORTANT_STACK_DEPENDENCY_TRESHOLD = 4
+# share of the stacks with the highest PageRank that are critical if important
+CRITICAL_STACK_SHARE = 0.02
+IMPLICIT_EDGE_ATTRIBUTES = {"style": "dashed", "color": "darkviolet"}
 
 Node = str
 NodeSet = Set[Node]
@@ -52,6 +89,30 @@ class NodeAndEdgesStackGraph:
     nodes_with_downstream_deps: NodeSet
     leaf_nodes: NodeSet
     external_nodes: NodeSet
+    # dependencies found in parameter values instead of imports
+    edges_implicit: EdgeSet = field(default_factory=set)
+    critical_nodes: NodeSet = field(default_factory=set)
+    node_scores: Dict[Node, CentralityScores] = field(default_factory=dict)
+
+
+@dataclass
+class ServiceEdgeWeight:
+    exports: int = 0
+    exporting_stacks: NodeSet = field(default_factory=set)
+    importing_stacks: NodeSet = field(default_factory=set)
+
+
+@dataclass
+class ClusterOptions:
+    strategy: str = SERVICE
+    levels: int = 1
+
+
+@dataclass
+class FocusOptions:
+    service: str
+    depth: Optional[int] = None
+    direction: str = BOTH
 
 
 @dataclass
@@ -64,6 +125,17 @@ class NodeAndEdgesServiceGraph:
     external_nodes: NodeSet
     manual_downstream_nodes: NodeSet
     manual_internal_nodes: NodeSet
+    # multiplicity of the export edges aggregated into each service edge
+    edge_weights: Dict[Tuple[Node, Node], ServiceEdgeWeight] = field(
+        default_factory=dict
+    )
+    implicit_edges: EdgeSet = field(default_factory=set)
+    node_scores: Dict[Node, CentralityScores] = field(default_factory=dict)
+
+
+NodesAndEdges = TypeVar(
+    "NodesAndEdges", NodeAndEdgesStackGraph, NodeAndEdgesServiceGraph
+)
 
 
 class InfraGraphExporter:
@@ -81,40 +153,171 @@ class InfraGraphExporter:
         project_name: str,
         config_path: str = "./config.hocon",
         data_extractor: Optional[IDataExtractor] = None,
+        snapshot_store: Optional[SnapshotStore] = None,
+        render_cache: Optional[RenderCache] = None,
     ):
         self.config = load_config(config_path)
+        self.snapshot_store = snapshot_store
+        self.render_cache = render_cache
         self.output_folder = output_folder
         self.env = env
         self.project_name = (
             project_name if project_name else self.config.default_project
         )
         self.stack_prefix = f"{self.project_name}-{self.env}"
+        self.symbols = Symbols.for_stack_prefix(self.stack_prefix)
         if not data_extractor:
+            project_config = self.config.projects.get(self.project_name)
             self.data_extractor = DataExtractor(
                 self.stack_prefix,
                 service_tags=self.config.service_tags,
                 component_tags=self.config.component_tags,
+                symbols=self.symbols,
+                stack_filter=StackFilter.from_config(
+                    self.stack_prefix, project_config and project_config.filters
+                ),
+                checkpoint_folder=SYSTEM_CACHE_ROOT,
             )
         else:
             self.data_extractor = data_extractor
 
-    def export(self, refresh: bool, cluster_stack_graph: bool):
+    def export(
+        self,
+        refresh: bool,
+        cluster_stack_graph: bool,
+        prometheus_metrics: bool = False,
+        detailed_report: bool = False,
+        shard_by_service: bool = False,
+        shard_workers: Optional[int] = None,
+        focus: Optional[FocusOptions] = None,
+        renderer: str = GRAPHVIZ,
+        clustering: Optional[ClusterOptions] = None,
+        simplify: bool = False,
+    ):
         # TODO make caching work with multiple projects
+        instrumentation.reset()
         if refresh:
             self.delete_caches()
+        with instrumentation.stage("extraction"):
+            snapshot = None if refresh else self._load_snapshot()
+            stack_infos, exports = snapshot or self._extract()
+        self.export_extracted(
+            stack_infos,
+            exports,
+            cluster_stack_graph,
+            detailed_report,
+            shard_by_service,
+            shard_workers,
+            focus,
+            renderer,
+            clustering,
+            simplify,
+        )
+        if snapshot is None and isinstance(self.data_extractor, DataExtractor):
+            # whois reads the disc cache of the extractor, the index belongs to it
+            shutil.copyfile(
+                f"{self.output_folder}/{INDEX_FILE_NAME}",
+                SYSTEM_CACHE_ROOT / INDEX_CACHE_FILE_NAME,
+            )
+        instrumentation.write(self.output_folder, prometheus=prometheus_metrics)
+        logger.info(f"\nGraph and data exports finished in {self.output_folder} folder")
+
+    def export_extracted(
+        self,
+        stack_infos: List[StackInfo],
+        exports: List[StackExport],
+        cluster_stack_graph: bool,
+        detailed_report: bool = False,
+        shard_by_service: bool = False,
+        shard_workers: Optional[int] = None,
+        focus: Optional[FocusOptions] = None,
+        renderer: str = GRAPHVIZ,
+        clustering: Optional[ClusterOptions] = None,
+        simplify: bool = False,
+    ) -> None:
+        """Analyse, render and serialize already extracted stacks and exports"""
+        with instrumentation.stage("analysis"):
+            resource_statistics = compute_resource_statistics(
+                stack_infos, self.symbols.resource_types
+            )
+            statistics = resource_statistics.totals
+            imported_exports = [
+                export for export in exports if len(export.importing_stacks) > 0
+            ]
+            log_summary(stack_infos, imported_exports, statistics)
+            implicit_dependencies = discover_implicit_dependencies(stack_infos, exports)
+            service_graph = self._build_service_graph(
+                imported_exports, stack_infos, implicit_dependencies
+            )
+        if detailed_report:
+            with instrumentation.stage("report"):
+                write_report(
+                    f"{self.output_folder}/{REPORT_FILE_NAME}",
+                    stack_infos,
+                    imported_exports,
+                    statistics,
+                )
+        if shard_by_service:
+            with instrumentation.stage("rendering"):
+                self._visualize_services(service_graph, focus, renderer)
+                self._export_shards(
+                    stack_infos,
+                    exports,
+                    cluster_stack_graph,
+                    shard_workers,
+                    renderer,
+                    implicit_dependencies,
+                    clustering,
+                    simplify,
+                )
+        else:
+            with instrumentation.stage("rendering"):
+                stack_graph = self._visualize_stacks(
+                    imported_exports,
+                    stack_infos,
+                    cluster_stack_graph,
+                    focus=focus,
+                    renderer=renderer,
+                    implicit_dependencies=implicit_dependencies,
+                    clustering=clustering,
+                    simplify=simplify,
+                )
+                self._visualize_services(service_graph, focus, renderer)
+            with instrumentation.stage("serialization"):
+                self._create_data_export(
+                    stack_infos,
+                    statistics,
+                    exports,
+                    service_dependencies=self._service_dependencies(service_graph),
+                    resource_statistics_by=resource_statistics.to_dict(),
+                    implicit_dependencies=implicit_dependencies,
+                    stack_centrality=self._stack_centrality(stack_graph, stack_infos),
+                    service_centrality=service_graph.node_scores,
+                )
+        with instrumentation.timed("ownership_index.save"):
+            OwnershipIndex.from_stack_infos(stack_infos).save(
+                f"{self.output_folder}/{INDEX_FILE_NAME}"
+            )
+
+    def _load_snapshot(self) -> Optional[Tuple[List[StackInfo], List[StackExport]]]:
+        """The latest snapshot of the project in the store, if there is one"""
+        if self.snapshot_store:
+            snapshot_id = self.snapshot_store.latest(self.stack_prefix)
+            if snapshot_id is not None:
+                instrumentation.cache_hit("snapshot_store")
+                logger.info(f"using snapshot {snapshot_id} from the snapshot store")
+                with instrumentation.timed("snapshot_store.load"):
+                    return self.snapshot_store.load(snapshot_id)
+        return None
+
+    def _extract(self) -> Tuple[List[StackInfo], List[StackExport]]:
         stack_infos = self.data_extractor.gather_stacks()
-        self._print_stack_infos(stack_infos)
-        statistics = self._get_statictics(stack_infos)
-        self._print_statistics(statistics)
         exports = self.data_extractor.gather_and_filter_exports(stack_infos)
-        imported_exports = [
-            export for export in exports if len(export.importing_stacks) > 0
-        ]
-        self._print_export_infos(imported_exports)
-        self._visualize_stacks(imported_exports, stack_infos, cluster_stack_graph)
-        self._visualize_services(imported_exports, stack_infos)
-        self._create_data_export(stack_infos, statistics, exports)
-        logger.info(f"\nGraph and data exports finished in {self.output_folder} folder")
+        if self.snapshot_store:
+            instrumentation.cache_miss("snapshot_store")
+            with instrumentation.timed("snapshot_store.save"):
+                self.snapshot_store.save(self.stack_prefix, stack_infos, exports)
+        return stack_infos, exports
 
     @staticmethod
     def delete_caches():
@@ -124,122 +327,187 @@ class InfraGraphExporter:
         files = (
             x
             for x in SYSTEM_CACHE_ROOT.iterdir()
-            if x.is_file() and str(x).endswith(".cache")
+            if x.is_file() and x.suffix in (".cache", JOURNAL_SUFFIX)
         )
         for file in files:
             logger.info(f"Removing {str(file)}")
             file.unlink()
 
+    def _export_shards(
+        self,
+        stack_infos: List[StackInfo],
+        exports: List[StackExport],
+        cluster_stack_graph: bool,
+        max_workers: Optional[int] = None,
+        renderer: str = GRAPHVIZ,
+        implicit_dependencies: Optional[List[ImplicitDependency]] = None,
+        clustering: Optional[ClusterOptions] = None,
+        simplify: bool = False,
+    ) -> None:
+        partitioned_stacks = self._partition_node_set(
+            {stack.stack_name for stack in stack_infos},
+            {stack.stack_name: stack.service_name for stack in stack_infos},
+        )
+        stack_infos_by_name = {stack.stack_name: stack for stack in stack_infos}
+        stacks_by_service = {
+            service: sorted(
+                (stack_infos_by_name[stack_name] for stack_name in stack_names),
+                key=lambda stack: stack.stack_name,
+            )
+            for service, stack_names in partitioned_stacks
+        }
+        shards = partition_by_service(stack_infos, exports, stacks_by_service)
+
+        shards_folder = f"{self.output_folder}/{SHARDS_FOLDER}"
+        with ThreadPoolExecutor(max_workers or os.cpu_count()) as executor:
+            manifest_entries = list(
+                executor.map(
+                    lambda shard: self._export_shard(
+                        shard,
+                        shards_folder,
+                        cluster_stack_graph,
+                        renderer,
+                        implicit_dependencies,
+                        clustering,
+                        simplify,
+                    ),
+                    shards,
+                )
+            )
+
+        manifest = {
+            "stack_prefix": self.stack_prefix,
+            "shards": sorted(manifest_entries, key=lambda entry: entry["shard"]),
+        }
+        with open(f"{shards_folder}/{MANIFEST_FILE_NAME}", "w") as write_file:
+            json.dump(manifest, write_file, indent=2)
+        logger.info(f"{len(shards)} service shards written to {shards_folder}")
+
+    def _export_shard(
+        self,
+        shard: Shard,
+        shards_folder: str,
+        cluster_stack_graph: bool,
+        renderer: str = GRAPHVIZ,
+        implicit_dependencies: Optional[List[ImplicitDependency]] = None,
+        clustering: Optional[ClusterOptions] = None,
+        simplify: bool = False,
+    ) -> Dict[str, Any]:
+        shard_folder = f"{shards_folder}/{shard.name}"
+        os.makedirs(shard_folder, exist_ok=True)
+        imported_exports = [
+            export for export in shard.exports if len(export.importing_stacks) > 0
+        ]
+        shard_stacks = {stack.stack_name for stack in shard.stack_infos}
+        shard_dependencies = [
+            dependency
+            for dependency in implicit_dependencies or []
+            if dependency.consuming_stack in shard_stacks
+        ]
+        self._visualize_stacks(
+            imported_exports,
+            shard.stack_infos,
+            cluster_stack_graph,
+            shard_folder,
+            renderer=renderer,
+            implicit_dependencies=shard_dependencies,
+            clustering=clustering,
+            simplify=simplify,
+        )
+        resource_statistics = compute_resource_statistics(
+            shard.stack_infos, self.symbols.resource_types
+        )
+        self._create_data_export(
+            shard.stack_infos,
+            resource_statistics.totals,
+            shard.exports,
+            shard_folder,
+            resource_statistics_by=resource_statistics.to_dict(),
+            implicit_dependencies=shard_dependencies,
+        )
+        return {
+            "shard": shard.name,
+            "service": shard.service_name,
+            "path": f"{SHARDS_FOLDER}/{shard.name}",
+            "stacks": [stack.stack_name for stack in shard.stack_infos],
+            "exports": len(shard.exports),
+            "files": sorted(os.listdir(shard_folder)),
+        }
+
     def _create_data_export(
         self,
         stack_infos: List[StackInfo],
         statistics: Counter[str],
         stack_exports: List[StackExport],
+        output_folder: Optional[str] = None,
+        service_dependencies: Optional[List[ServiceDependency]] = None,
+        resource_statistics_by: Optional[Dict[str, Dict[str, Dict[str, int]]]] = None,
+        implicit_dependencies: Optional[List[ImplicitDependency]] = None,
+        stack_centrality: Optional[Dict[str, CentralityScores]] = None,
+        service_centrality: Optional[Dict[str, CentralityScores]] = None,
     ):
         export = DataExport(
             stacks=stack_infos,
             resource_statistics=dict(statistics.most_common()),
+            resource_statistics_by=resource_statistics_by or {},
             stack_exports=stack_exports,
+            service_dependencies=service_dependencies or [],
+            implicit_dependencies=implicit_dependencies or [],
+            stack_centrality=stack_centrality or {},
+            service_centrality=service_centrality or {},
         )
-        with open(f"{self.output_folder}/export.json", "w") as write_file:
-            write_file.write(export.json(indent=2))
-
-    @staticmethod
-    def _get_statictics(stack_infos: List[StackInfo]) -> Counter:
-        counts: Counter[str] = collections.Counter()
-        for stack_info in stack_infos:
-            for resource in stack_info.resources:
-                counts[resource.resource_type.replace("AWS::", "")] += 1
-        return counts
-
-    @staticmethod
-    def _print_statistics(statistics):
-        logger.info("\n")
-        logger.info(f"{Fore.BLUE}Resource Statistics:")
-        for resource_type, count in statistics.most_common():
-            logger.info(f"\t{resource_type}: {count} resources")
-        logger.info("\n")
+        # count the bytes written, not the characters
+        with open(
+            f"{output_folder or self.output_folder}/export.json", "wb"
+        ) as write_file:
+            written = write_file.write(export.json(indent=2).encode())
+        instrumentation.add_bytes("export.json.written", written)
 
     @staticmethod
-    def _print_export_infos(exports: List[StackExport]) -> None:
-        logger.info("\n")
-        logger.info(f"{Fore.BLUE}Export details:")
-        for export in exports:
-            logger.info(
-                f"{Style.BRIGHT}{export.export_name}:{export.export_value} [Stack: {export.exporting_stack_name}]"
+    def _service_dependencies(
+        service_graph: NodeAndEdgesServiceGraph,
+    ) -> List[ServiceDependency]:
+        return [
+            ServiceDependency(
+                exporting_service=exporting_service,
+                importing_service=importing_service,
+                exports=weight.exports,
+                exporting_stacks=len(weight.exporting_stacks),
+                importing_stacks=len(weight.importing_stacks),
             )
-            for importing_stack in export.importing_stacks:
-                logger.info(f"\t{importing_stack}")
+            for (exporting_service, importing_service), weight in sorted(
+                service_graph.edge_weights.items(),
+                key=lambda item: (-item[1].exports, item[0]),
+            )
+        ]
 
-        logger.info(f"{Fore.BLUE}Export details with service names:")
-        for export in exports:
+    def _stack_centrality(
+        self, stack_graph: NodeAndEdgesStackGraph, stack_infos: List[StackInfo]
+    ) -> Dict[str, CentralityScores]:
+        """The scores of the stack graph by full stack name"""
+        return {
+            stack.stack_name: scores
+            for stack in stack_infos
             if (
-                len(export.importing_services) == 1
-                and export.export_service == export.importing_services[0]
-            ):
-                logger.info(
-                    f"{Style.BRIGHT}{export.export_name} [Service: {export.export_service}] -> only reflexive dependency"
-                )
-            else:
-                logger.info(
-                    f"{Style.BRIGHT}{export.export_name} [Service: {export.export_service}]"
+                scores := stack_graph.node_scores.get(
+                    self._remove_stack_prefix(stack.stack_name)
                 )
-                for importing_service in export.importing_services:
-                    logger.info(f"\t{importing_service}")
+            )
+            is not None
+        }
 
     @staticmethod
-    def _print_stack_infos(stack_infos: List[StackInfo]) -> None:
-        logger.info("\n")
-        logger.info(f"{Fore.BLUE}Stacks without service name:")
-        grouped_by_service: DefaultDict[str, List[StackInfo]] = defaultdict(list)
-        for stack_info in stack_infos:
-            if stack_info.service_name is None:
-                logger.info(stack_info)
-            else:
-                grouped_by_service[stack_info.service_name].append(stack_info)
-
-        logger.info("\n")
-
-        logger.info(f"{Fore.BLUE}Stacks grouped by service name:")
-        for service, stacks in grouped_by_service.items():
-            logger.info(f"{Style.BRIGHT}\t{service}:")
-            for stack in stacks:
-                logger.info(f"\t\t{stack.stack_name} [{stack.component_name}]")
-
-        logger.info("\n")
-
-        logger.info(f"{Fore.BLUE}Stacks parameters:")
-        for stack_info in stack_infos:
-            logger.info(f"{Style.BRIGHT}\t{stack_info.stack_name}:")
-            for param in stack_info.parameters:
-                description = f"[{param.description}]" if param.description else ""
-                logger.info(f"\t\t{param.name}: {param.value} {description}")
-                if param.external_dependency:
-                    logger.info(f"\t\t{Fore.YELLOW}{param.external_dependency}")
-
-        logger.info(f"{Fore.BLUE}Stacks resources:")
-        for stack_info in stack_infos:
-            logger.info(f"{Style.BRIGHT}\t{stack_info.stack_name}:")
-            for resource in stack_info.resources:
-                logger.info(
-                    f"\t\t[{resource.resource_type}] {resource.logical_id}: {resource.physical_id}"
-                )
-
-        logger.info("\n")
+    def _get_statictics(
+        stack_infos: List[StackInfo], resource_types: Optional[SymbolTable] = None
+    ) -> Counter:
+        return compute_resource_statistics(stack_infos, resource_types).totals
 
-    def _visualize_services(
+    def _build_service_graph(
         self,
         exports_with_service_names: List[StackExport],
         stack_infos: List[StackInfo],
-    ) -> None:
-        stacks_graph = Digraph(
-            "StacksGraph",
-            node_attr={"shape": "box", "style": "filled", "fillcolor": "grey"},
-        )
-        stacks_graph.attr(
-            rankdir="LR", label="Service Dependencies", labelloc="t", fontsize="20"
-        )
-
+        implicit_dependencies: Optional[List[ImplicitDependency]] = None,
+    ) -> NodeAndEdgesServiceGraph:
         project_config = self.config.projects.get(self.project_name)
 
         downstream_dependencies = None
@@ -249,59 +517,213 @@ class InfraGraphExporter:
             downstream_dependencies = project_config.downstream_dependencies
             internal_manual_dependencies = project_config.internal_manual_dependencies
 
-        nodes_and_edges = self._retrieve_nodes_and_edges_for_service_graph(
-            exports_with_service_names,
-            stack_infos,
-            downstream_dependencies,
-            internal_manual_dependencies,
+        with instrumentation.timed("graph.services.build"):
+            return self._retrieve_nodes_and_edges_for_service_graph(
+                exports_with_service_names,
+                stack_infos,
+                downstream_dependencies,
+                internal_manual_dependencies,
+                implicit_dependencies,
+            )
+
+    def _visualize_services(
+        self,
+        nodes_and_edges: NodeAndEdgesServiceGraph,
+        focus: Optional[FocusOptions] = None,
+        renderer: str = GRAPHVIZ,
+    ) -> None:
+        if focus:
+            with instrumentation.timed("graph.services.focus"):
+                nodes_and_edges = self._restrict_to_focus(
+                    nodes_and_edges, {focus.service}, focus
+                )
+
+        if renderer == HTML:
+            with instrumentation.timed("graph.services.html"):
+                self._services_document(nodes_and_edges).write(
+                    f"{self.output_folder}/export-services"
+                )
+            return
+
+        stacks_graph = Digraph(
+            "StacksGraph",
+            node_attr={"shape": "box", "style": "filled", "fillcolor": "grey"},
+        )
+        stacks_graph.attr(
+            rankdir="LR", label="Service Dependencies", labelloc="t", fontsize="20"
         )
 
-        for node in nodes_and_edges.internal_nodes:
+        for node in sorted(nodes_and_edges.internal_nodes):
             stacks_graph.node(node, label=f'<<font point-size="17">{node}</font>>')
 
-        for export_service, importing_service in nodes_and_edges.edges:
-            stacks_graph.edge(export_service, importing_service)
+        for export_service, importing_service in sorted(nodes_and_edges.edges):
+            weight = nodes_and_edges.edge_weights[(export_service, importing_service)]
+            stacks_graph.edge(
+                export_service,
+                importing_service,
+                _attributes={
+                    "weight": str(weight.exports),
+                    "penwidth": f"{1 + math.log2(weight.exports):.2f}",
+                    "tooltip": f"{weight.exports} exports, "
+                    f"{len(weight.exporting_stacks)} exporting and "
+                    f"{len(weight.importing_stacks)} importing stacks",
+                },
+            )
 
-        for node in nodes_and_edges.external_nodes:  # TODO add team name
+        for node in sorted(nodes_and_edges.external_nodes):  # TODO add team name
             stacks_graph.node(
                 node,
                 _attributes={"fillcolor": "tomato"},
                 label=f'<<font point-size="19">{node}</font>>',
             )
 
-        for from_node, to_node in nodes_and_edges.external_edges:
+        for from_node, to_node in sorted(nodes_and_edges.external_edges):
             stacks_graph.edge(from_node, to_node)
 
-        for node in nodes_and_edges.manual_downstream_nodes:
+        for node in sorted(nodes_and_edges.manual_downstream_nodes):
             stacks_graph.node(
                 node,
                 _attributes={"fillcolor": "skyblue"},
                 label=f'<<font point-size="19">{node}</font>>',
             )
 
-        for from_node, to_node in nodes_and_edges.manual_downstream_edges:
+        for from_node, to_node in sorted(nodes_and_edges.manual_downstream_edges):
             stacks_graph.edge(from_node, to_node)
 
-        for node in nodes_and_edges.manual_internal_nodes:
+        for node in sorted(nodes_and_edges.manual_internal_nodes):
             stacks_graph.node(
                 node,
                 _attributes={"fillcolor": "grey68", "style": "dotted, filled"},
                 label=f'<<font point-size="17">{node}</font>>',
             )
 
-        for from_node, to_node in nodes_and_edges.manual_internal_edges:
+        for from_node, to_node in sorted(nodes_and_edges.manual_internal_edges):
             stacks_graph.edge(from_node, to_node)
 
-        stacks_graph.render(
-            format="png", filename=f"{self.output_folder}/export-services.gv"
-        )
+        for from_node, to_node in sorted(nodes_and_edges.implicit_edges):
+            stacks_graph.edge(from_node, to_node, _attributes=IMPLICIT_EDGE_ATTRIBUTES)
+
+        with instrumentation.timed("graph.services.render"):
+            self._render(stacks_graph, f"{self.output_folder}/export-services.gv")
+
+    def _render(self, graph: Digraph, filename: str) -> None:
+        """Render as PNG, through the render cache if there is one"""
+        if self.render_cache:
+            self.render_cache.render(graph, filename)
+        else:
+            graph.render(format="png", filename=filename)
+
+    def _services_document(
+        self, nodes_and_edges: NodeAndEdgesServiceGraph
+    ) -> GraphDocument:
+        document = GraphDocument("Service Dependencies")
+        for node in sorted(nodes_and_edges.internal_nodes):
+            document.node(node)
+        for node in sorted(nodes_and_edges.external_nodes):
+            document.node(node, color="tomato")
+        for node in sorted(nodes_and_edges.manual_downstream_nodes):
+            document.node(node, color="skyblue")
+        for node in sorted(nodes_and_edges.manual_internal_nodes):
+            document.node(node, color="grey68", style="dotted")
+
+        for edge in sorted(nodes_and_edges.edges):
+            document.edge(*edge, weight=nodes_and_edges.edge_weights[edge].exports)
+        for edge in sorted(nodes_and_edges.external_edges):
+            document.edge(*edge)
+        for edge in sorted(nodes_and_edges.manual_downstream_edges):
+            document.edge(*edge)
+        for edge in sorted(nodes_and_edges.manual_internal_edges):
+            document.edge(*edge)
+        for edge in sorted(nodes_and_edges.implicit_edges):
+            document.edge(*edge, style="dashed")
+        return document
+
+    def _stacks_document(
+        self,
+        nodes_and_edges: NodeAndEdgesStackGraph,
+        groups: Dict[str, str],
+    ) -> GraphDocument:
+        document = GraphDocument("Stack Dependencies")
+        for node in sorted(nodes_and_edges.all_nodes):
+            document.node(
+                node,
+                color=self._determine_node_color(
+                    node,
+                    nodes_and_edges.important_nodes,
+                    nodes_and_edges.leaf_nodes,
+                    nodes_and_edges.critical_nodes,
+                ),
+                group=groups.get(node),
+            )
+        for node in sorted(nodes_and_edges.external_nodes):
+            document.node(node, color="tomato")
+
+        for edge in sorted(nodes_and_edges.edges):
+            document.edge(*edge)
+        for edge in sorted(nodes_and_edges.edges_external):
+            document.edge(*edge)
+        for edge in sorted(nodes_and_edges.edges_implicit):
+            document.edge(*edge, style="dashed")
+        return document
 
     def _visualize_stacks(
         self,
         exports_enriched: List[StackExport],
         stack_infos: List[StackInfo],
         should_cluster: bool,
-    ) -> None:  # TODO already filter before
+        output_folder: Optional[str] = None,
+        focus: Optional[FocusOptions] = None,
+        renderer: str = GRAPHVIZ,
+        implicit_dependencies: Optional[List[ImplicitDependency]] = None,
+        clustering: Optional[ClusterOptions] = None,
+        simplify: bool = False,
+    ) -> NodeAndEdgesStackGraph:  # TODO already filter before
+        stacks_service_names: Dict[str, Optional[str]] = {
+            self._remove_stack_prefix(stack.stack_name): stack.service_name
+            for stack in stack_infos
+        }
+
+        with instrumentation.timed("graph.stacks.build"):
+            nodes_and_edges = self._retrieve_nodes_and_edges_for_stacks_graph(
+                exports_enriched, stack_infos, implicit_dependencies
+            )
+        stack_graph = nodes_and_edges
+
+        if focus:
+            with instrumentation.timed("graph.stacks.focus"):
+                focus_stacks = {
+                    stack
+                    for stack, service_name in stacks_service_names.items()
+                    if service_name == focus.service
+                }
+                nodes_and_edges = self._restrict_to_focus(
+                    nodes_and_edges, focus_stacks, focus
+                )
+
+        clusters: Dict[Node, ClusterPath] = {}
+        if should_cluster:
+            clustering = clustering or ClusterOptions()
+            with instrumentation.timed("graph.stacks.clustering"):
+                clusters = cluster_paths(
+                    nodes_and_edges.all_nodes,
+                    nodes_and_edges.edges | nodes_and_edges.edges_implicit,
+                    stacks_service_names,
+                    clustering.strategy,
+                    clustering.levels,
+                )
+
+        if simplify:
+            with instrumentation.timed("graph.stacks.simplify"):
+                nodes_and_edges = self._simplify(nodes_and_edges)
+
+        if renderer == HTML:
+            with instrumentation.timed("graph.stacks.html"):
+                self._stacks_document(
+                    nodes_and_edges,
+                    {node: "/".join(path) for node, path in clusters.items() if path},
+                ).write(f"{output_folder or self.output_folder}/export-stacks")
+            return stack_graph
+
         stacks_graph = Digraph(
             "StacksGraph",
             node_attr={"shape": "box", "style": "filled", "fillcolor": "grey"},
@@ -310,74 +732,56 @@ class InfraGraphExporter:
             rankdir="LR", label="Stack Dependencies", labelloc="t", fontsize="20"
         )
 
-        stacks_service_names: Dict[str, Optional[str]] = {
-            self._remove_stack_prefix(stack.stack_name): stack.service_name
-            for stack in stack_infos
-        }
-
-        nodes_and_edges = self._retrieve_nodes_and_edges_for_stacks_graph(
-            exports_enriched, stack_infos
-        )
-
         logger.debug(f"node_set_important: {nodes_and_edges.important_nodes}")
         logger.debug(f"node_set_leafs: {nodes_and_edges.leaf_nodes}")
 
-        if should_cluster:
-            partitioned_node_set_all = self._partition_node_set(
-                nodes_and_edges.all_nodes, stacks_service_names
-            )
-            for service, nodes in partitioned_node_set_all:
-                if service:
-                    with stacks_graph.subgraph(name=f"cluster_{service}") as subgraph:
-                        subgraph.attr(label=service)
-                        for node in nodes:
-                            subgraph.node(
-                                node,
-                                _attributes={
-                                    "fillcolor": self._determine_node_color(
-                                        node,
-                                        nodes_and_edges.important_nodes,
-                                        nodes_and_edges.leaf_nodes,
-                                    )
-                                },
-                            )
-                else:
-                    for node in nodes:
-                        stacks_graph.node(
-                            node,
-                            _attributes={
-                                "fillcolor": self._determine_node_color(
-                                    node,
-                                    nodes_and_edges.important_nodes,
-                                    nodes_and_edges.leaf_nodes,
-                                )
-                            },
-                        )
-        else:
-            for node in nodes_and_edges.all_nodes:
-                stacks_graph.node(
+        self._add_clustered_nodes(
+            stacks_graph,
+            {node: clusters.get(node, ()) for node in nodes_and_edges.all_nodes},
+            lambda node: {
+                "fillcolor": self._determine_node_color(
                     node,
+                    nodes_and_edges.important_nodes,
+                    nodes_and_edges.leaf_nodes,
+                    nodes_and_edges.critical_nodes,
+                )
+            },
+        )
+
+        edges = nodes_and_edges.edges
+        if simplify:
+            edges, bundles = self._bundle_cluster_edges(edges, clusters)
+            if bundles:
+                stacks_graph.attr(compound="true")
+            for (from_cluster, to_cluster), bundled in sorted(bundles.items()):
+                stacks_graph.edge(
+                    *bundled[0],
                     _attributes={
-                        "fillcolor": self._determine_node_color(
-                            node,
-                            nodes_and_edges.important_nodes,
-                            nodes_and_edges.leaf_nodes,
-                        )
+                        "ltail": self._cluster_name(from_cluster),
+                        "lhead": self._cluster_name(to_cluster),
+                        "penwidth": f"{1 + math.log2(len(bundled)):.2f}",
+                        "label": str(len(bundled)),
+                        "tooltip": f"{len(bundled)} dependencies",
                     },
                 )
 
-        for from_node, to_node in nodes_and_edges.edges:
+        for from_node, to_node in sorted(edges):
             stacks_graph.edge(from_node, to_node)
 
-        for node in nodes_and_edges.external_nodes:
+        for node in sorted(nodes_and_edges.external_nodes):
             stacks_graph.node(node, _attributes={"fillcolor": "tomato"})
 
-        for from_node, to_node in nodes_and_edges.edges_external:
+        for from_node, to_node in sorted(nodes_and_edges.edges_external):
             stacks_graph.edge(from_node, to_node)
 
-        stacks_graph.render(
-            format="png", filename=f"{self.output_folder}/export-stacks.gv"
-        )
+        for from_node, to_node in sorted(nodes_and_edges.edges_implicit):
+            stacks_graph.edge(from_node, to_node, _attributes=IMPLICIT_EDGE_ATTRIBUTES)
+
+        with instrumentation.timed("graph.stacks.render"):
+            self._render(
+                stacks_graph, f"{output_folder or self.output_folder}/export-stacks.gv"
+            )
+        return stack_graph
 
     @staticmethod
     def _retrieve_nodes_and_edges_for_service_graph(
@@ -387,6 +791,7 @@ class InfraGraphExporter:
         internal_manual_dependencies: Optional[
             Dict[str, List[ManualInternalDependency]]
         ],
+        implicit_dependencies: Optional[List[ImplicitDependency]] = None,
     ) -> NodeAndEdgesServiceGraph:
         edge_set = set()
         node_set_internal = set()
@@ -396,13 +801,29 @@ class InfraGraphExporter:
         manual_downstream_edges = set()
         manual_internal_nodes = set()
         manual_internal_edges = set()
+        implicit_edges = set()
+        edge_weights: Dict[Tuple[Node, Node], ServiceEdgeWeight] = {}
+        service_of_stack = {
+            stack.stack_name: stack.service_name for stack in stack_infos
+        }
         for export in exports:
-            for importing_service in export.importing_services:
+            for importing_service in dict.fromkeys(export.importing_services):
                 if export.export_service != importing_service:  # no reflexive
                     exporting_service = export.export_service or "Unknown"
-                    edge_set.add((exporting_service, importing_service))
-                    node_set_internal.add(exporting_service)
-                    node_set_internal.add(importing_service)
+                    edge = (exporting_service, importing_service)
+                    weight = edge_weights.get(edge)
+                    if weight is None:
+                        weight = edge_weights[edge] = ServiceEdgeWeight()
+                        edge_set.add(edge)
+                        node_set_internal.add(exporting_service)
+                        node_set_internal.add(importing_service)
+                    weight.exports += 1
+                    weight.exporting_stacks.add(export.exporting_stack_name)
+                    weight.importing_stacks.update(
+                        importing_stack
+                        for importing_stack in export.importing_stacks
+                        if service_of_stack.get(importing_stack) == importing_service
+                    )
 
         for stack in stack_infos:
             for parameter in stack.parameters:
@@ -414,6 +835,20 @@ class InfraGraphExporter:
                         (external_service_name, internal_service_name)
                     )
 
+        for dependency in implicit_dependencies or []:
+            edge = (
+                service_of_stack.get(dependency.providing_stack) or "Unknown",
+                service_of_stack.get(dependency.consuming_stack) or "Unknown",
+            )
+            if edge[0] != edge[1] and edge not in edge_set:
+                implicit_edges.add(edge)
+                node_set_internal.update(edge)
+
+        with instrumentation.timed("graph.services.centrality"):
+            node_scores = compute_centrality(
+                node_set_internal, edge_set | implicit_edges
+            )
+
         if downstream_dependencies:
             for service_name, dependencies in downstream_dependencies.items():
                 for dependency in dependencies:
@@ -440,17 +875,23 @@ class InfraGraphExporter:
             external_nodes=node_set_external,
             manual_internal_nodes=manual_internal_nodes,
             manual_downstream_nodes=manual_downstream_nodes,
+            edge_weights=edge_weights,
+            implicit_edges=implicit_edges,
+            node_scores=node_scores,
         )
 
     def _retrieve_nodes_and_edges_for_stacks_graph(
-        self, exports_enriched: List[StackExport], stack_infos: List[StackInfo]
+        self,
+        exports_enriched: List[StackExport],
+        stack_infos: List[StackInfo],
+        implicit_dependencies: Optional[List[ImplicitDependency]] = None,
     ) -> NodeAndEdgesStackGraph:
         edge_set = set()
-        node_set_important = set()
         node_set_all = set()
         node_set_has_downstream = set()
         edge_set_external = set()
         node_set_external = set()
+        edge_set_implicit = set()
 
         for export in exports_enriched:
             exporting_stack_name_short = self._remove_stack_prefix(
@@ -462,10 +903,6 @@ class InfraGraphExporter:
                 importing_stack_short = self._remove_stack_prefix(importing_stack)
                 edge_set.add((exporting_stack_name_short, importing_stack_short))
                 node_set_all.add(importing_stack_short)
-                logger.info(importing_stack)
-
-            if len(export.importing_stacks) > IMPORTANT_STACK_DEPENDENCY_TRESHOLD:
-                node_set_important.add(exporting_stack_name_short)
 
         for stack in stack_infos:
             for parameter in stack.parameters:
@@ -476,8 +913,32 @@ class InfraGraphExporter:
                     node_set_external.add(external_service_name)
                     edge_set_external.add((external_service_name, stack_name))
 
+        for dependency in implicit_dependencies or []:
+            edge = (
+                self._remove_stack_prefix(dependency.providing_stack),
+                self._remove_stack_prefix(dependency.consuming_stack),
+            )
+            if edge not in edge_set:
+                edge_set_implicit.add(edge)
+                node_set_all.update(edge)
+                node_set_has_downstream.add(edge[0])
+
         node_set_leafs = node_set_all - node_set_has_downstream
 
+        with instrumentation.timed("graph.stacks.centrality"):
+            node_scores = compute_centrality(node_set_all, edge_set | edge_set_implicit)
+        node_set_important = {
+            node
+            for node, scores in node_scores.items()
+            if scores.fan_out > IMPORTANT_STACK_DEPENDENCY_TRESHOLD
+        }
+        by_pagerank = sorted(
+            node_scores, key=lambda node: (-node_scores[node].pagerank, node)
+        )
+        node_set_critical = node_set_important.intersection(
+            by_pagerank[: max(1, int(len(by_pagerank) * CRITICAL_STACK_SHARE))]
+        )
+
         return NodeAndEdgesStackGraph(
             edges=edge_set,
             edges_external=edge_set_external,
@@ -486,20 +947,159 @@ class InfraGraphExporter:
             nodes_with_downstream_deps=node_set_has_downstream,
             leaf_nodes=node_set_leafs,
             external_nodes=node_set_external,
+            edges_implicit=edge_set_implicit,
+            critical_nodes=node_set_critical,
+            node_scores=node_scores,
         )
 
+    @staticmethod
+    def _restrict_to_focus(
+        nodes_and_edges: NodesAndEdges, seeds: NodeSet, focus: FocusOptions
+    ) -> NodesAndEdges:
+        """
+        Reduce all node and edge sets of a graph to the neighbourhood of the
+        seed nodes, before any Graphviz objects are created
+        """
+        if not seeds:
+            logger.warning(f"Focus service '{focus.service}' not found in the graph")
+        node_and_edge_sets = [
+            getattr(nodes_and_edges, graph_field.name)
+            for graph_field in fields(nodes_and_edges)
+        ]
+
+        def in_focus(element) -> bool:
+            if isinstance(element, tuple):
+                return element[0] in keep and element[1] in keep
+            return element in keep
+
+        all_edges = [
+            edge
+            for node_or_edge_set in node_and_edge_sets
+            for edge in node_or_edge_set
+            if isinstance(edge, tuple)
+        ]
+        keep = neighbourhood(all_edges, seeds, focus.depth, focus.direction)
+        logger.info(
+            f"Focus on {focus.service} ({focus.direction}, depth {focus.depth}): {len(keep)} nodes"
+        )
+        restricted: Dict[str, Any] = {}
+        for graph_field in fields(nodes_and_edges):
+            value = getattr(nodes_and_edges, graph_field.name)
+            if isinstance(value, dict):
+                restricted[graph_field.name] = {
+                    key: item for key, item in value.items() if in_focus(key)
+                }
+            else:
+                restricted[graph_field.name] = {
+                    element for element in value if in_focus(element)
+                }
+        return replace(nodes_and_edges, **restricted)
+
+    @staticmethod
+    def _simplify(nodes_and_edges: NodeAndEdgesStackGraph) -> NodeAndEdgesStackGraph:
+        """
+        Drop the edges implied by a longer dependency path, the node colors
+        keep reflecting the full graph
+        """
+        all_edges = (
+            nodes_and_edges.edges
+            | nodes_and_edges.edges_external
+            | nodes_and_edges.edges_implicit
+        )
+        reduced = transitive_reduction(all_edges)
+        removed = len(all_edges) - len(reduced)
+        instrumentation.increment("graph.stacks.simplify.removed_edges", removed)
+        logger.info(
+            f"Simplification removed {removed} of {len(all_edges)} stack graph edges"
+        )
+        return replace(
+            nodes_and_edges,
+            edges=nodes_and_edges.edges & reduced,
+            edges_external=nodes_and_edges.edges_external & reduced,
+            edges_implicit=nodes_and_edges.edges_implicit & reduced,
+        )
+
+    @staticmethod
+    def _bundle_cluster_edges(
+        edges: EdgeSet, clusters: Dict[Node, ClusterPath]
+    ) -> Tuple[EdgeSet, Dict[Tuple[ClusterPath, ClusterPath], List[Tuple[Node, Node]]]]:
+        """
+        Split off the edges running in parallel between two clusters, they
+        are drawn as one edge between the cluster borders. Clusters nested in
+        each other are not bundled, graphviz cannot clip such edges.
+        """
+        between_clusters: Dict[
+            Tuple[ClusterPath, ClusterPath], List[Tuple[Node, Node]]
+        ] = defaultdict(list)
+        for edge in edges:
+            from_cluster = clusters.get(edge[0], ())
+            to_cluster = clusters.get(edge[1], ())
+            shorter = min(len(from_cluster), len(to_cluster))
+            if shorter and from_cluster[:shorter] != to_cluster[:shorter]:
+                between_clusters[(from_cluster, to_cluster)].append(edge)
+        bundles = {
+            cluster_pair: sorted(bundled)
+            for cluster_pair, bundled in between_clusters.items()
+            if len(bundled) > 1
+        }
+        bundled_edges = {edge for bundled in bundles.values() for edge in bundled}
+        if bundles:
+            instrumentation.increment(
+                "graph.stacks.simplify.bundled_edges", len(bundled_edges)
+            )
+            logger.info(
+                f"Simplification bundled {len(bundled_edges)} edges between clusters"
+                f" into {len(bundles)}"
+            )
+        return edges - bundled_edges, bundles
+
     def _determine_node_color(
-        self, current_node: str, node_set_important: Set[str], node_set_leafs: Set[str]
+        self,
+        current_node: str,
+        node_set_important: Set[str],
+        node_set_leafs: Set[str],
+        node_set_critical: Optional[Set[str]] = None,
     ):
-        if current_node in node_set_important:
+        if node_set_critical and current_node in node_set_critical:
+            return "orangered"
+        elif current_node in node_set_important:
             return "orange"
         elif current_node in node_set_leafs:
             return "green"
         else:
             return "gray"
 
+    @staticmethod
+    def _add_clustered_nodes(
+        graph: Digraph,
+        clusters: Dict[Node, ClusterPath],
+        attributes: Callable[[Node], Dict[str, str]],
+        depth: int = 0,
+    ) -> None:
+        """Add the nodes inside nested subgraphs following their cluster paths"""
+        members: Dict[Optional[ClusterPath], List[Node]] = defaultdict(list)
+        for node, path in clusters.items():
+            members[path[: depth + 1] if len(path) > depth else None].append(node)
+        for node in sorted(members.pop(None, [])):
+            graph.node(node, _attributes=attributes(node))
+        for path, nodes in sorted(members.items()):
+            with graph.subgraph(
+                name=InfraGraphExporter._cluster_name(path)
+            ) as subgraph:
+                subgraph.attr(label=path[-1])
+                InfraGraphExporter._add_clustered_nodes(
+                    subgraph,
+                    {node: clusters[node] for node in nodes},
+                    attributes,
+                    depth + 1,
+                )
+
+    @staticmethod
+    def _cluster_name(path: ClusterPath) -> str:
+        return f"cluster_{'/'.join(path)}"
+
     def _remove_stack_prefix(self, stack_name: str):
-        return stack_name.replace(f"{self.stack_prefix}-", "")
+        return self.symbols.stacks.short_name(stack_name)
 
     @staticmethod
     def _partition_node_set(
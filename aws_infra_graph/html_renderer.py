@@ -0,0 +1,77 @@
+# Core Library
+import json
+import importlib.resources as pkg_resources
+from typing import Any, Dict, List, Optional
+
+# First party
+from aws_infra_graph import data
+
+GRAPHVIZ = "graphviz"
+HTML = "html"
+RENDERERS = (GRAPHVIZ, HTML)
+
+VIEWER_TEMPLATE = "graph-viewer.html"
+GRAPH_PLACEHOLDER = "/*GRAPH_JSON*/null"
+
+
+class GraphDocument:
+    """
+    Graph as compact JSON for the HTML viewer, filled with the same node and
+    edge calls as a graphviz Digraph. Nodes are listed once, edges refer to
+    them by index.
+    """
+
+    def __init__(self, title: str):
+        self.title = title
+        self.nodes: List[Dict[str, Any]] = []
+        self.edges: List[List[Any]] = []
+        self._node_index: Dict[str, int] = {}
+
+    def node(
+        self,
+        name: str,
+        color: str = "grey",
+        group: Optional[str] = None,
+        style: Optional[str] = None,
+    ) -> int:
+        index = self._node_index.get(name)
+        if index is None:
+            index = self._node_index[name] = len(self.nodes)
+            self.nodes.append({"id": name})
+        node = self.nodes[index]
+        node["color"] = color
+        if group is not None:
+            node["group"] = group
+        if style is not None:
+            node["style"] = style
+        return index
+
+    def edge(
+        self, from_node: str, to_node: str, weight: int = 1, style: Optional[str] = None
+    ) -> None:
+        # like graphviz, edges implicitly create missing nodes
+        from_index = self._node_index.get(from_node)
+        if from_index is None:
+            from_index = self.node(from_node)
+        to_index = self._node_index.get(to_node)
+        if to_index is None:
+            to_index = self.node(to_node)
+        edge = [from_index, to_index, weight]
+        if style is not None:
+            edge.append(style)
+        self.edges.append(edge)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"title": self.title, "nodes": self.nodes, "edges": self.edges}
+
+    def write(self, filename: str) -> None:
+        """Write <filename>.json and a self-contained <filename>.html viewer"""
+        graph_json = json.dumps(self.to_dict(), separators=(",", ":"))
+        with open(f"{filename}.json", "w") as write_file:
+            write_file.write(graph_json)
+
+        template = pkg_resources.read_text(data, VIEWER_TEMPLATE)
+        # keep stack names like "</script>" from ending the embedded script
+        embedded_json = graph_json.replace("</", "<\\/")
+        with open(f"{filename}.html", "w") as write_file:
+            write_file.write(template.replace(GRAPH_PLACEHOLDER, embedded_json, 1))
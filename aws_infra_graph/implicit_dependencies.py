@@ -0,0 +1,111 @@
+# Core Library
+import re
+import logging
+from typing import Set, Dict, List, Tuple, Iterable, Optional
+
+# First party
+from aws_infra_graph.model import StackInfo, StackExport, ImplicitDependency
+from aws_infra_graph.ownership import query_keys, resource_keys
+from aws_infra_graph.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+# shorter identifiers like "dev", "true" or port numbers match too much by chance
+MIN_IDENTIFIER_LENGTH = 8
+
+_TOKEN_SEPARATORS = re.compile(r"[\s,;|=\"'()\[\]{}]+")
+
+
+class IdentifierIndex:
+    """
+    Hashed token index over the physical ids and export values of all stacks.
+    Every identifier is stored under the keys of
+    aws_infra_graph.ownership.resource_keys, parameter values are split into
+    tokens whose ARN/URL components are looked up, so matching stays linear
+    in the size of the values instead of comparing every value with every id.
+    """
+
+    def __init__(self, identifiers: Iterable[Tuple[str, str]]):
+        owners: Dict[str, Set[str]] = {}
+        for identifier, stack_name in identifiers:
+            for key in resource_keys(identifier):
+                if _is_specific(key):
+                    owners.setdefault(key, set()).add(stack_name)
+        # a key owned by several stacks does not tell which one is meant
+        self._owner: Dict[str, str] = {
+            key: next(iter(stacks))
+            for key, stacks in owners.items()
+            if len(stacks) == 1
+        }
+
+    @classmethod
+    def from_stacks(
+        cls, stack_infos: List[StackInfo], exports: List[StackExport]
+    ) -> "IdentifierIndex":
+        return cls(
+            [
+                (resource.physical_id, stack.stack_name)
+                for stack in stack_infos
+                for resource in stack.resources
+                if resource.physical_id
+            ]
+            + [(export.export_value, export.exporting_stack_name) for export in exports]
+        )
+
+    def __len__(self) -> int:
+        return len(self._owner)
+
+    def match(self, value: str) -> Iterable[Tuple[str, str]]:
+        """The (key, owning stack) of the most specific identifier per token"""
+        for token in _TOKEN_SEPARATORS.split(value):
+            if not _is_specific(token):
+                continue
+            for key in query_keys(token):
+                owner = self._owner.get(key)
+                if owner is not None:
+                    yield key, owner
+                    break
+
+
+def discover_implicit_dependencies(
+    stack_infos: List[StackInfo],
+    exports: List[StackExport],
+    index: Optional[IdentifierIndex] = None,
+) -> List[ImplicitDependency]:
+    """
+    Dependencies through parameters holding the physical id or export value
+    of another stack, e.g. a hard-coded queue ARN. Pairs of stacks already
+    connected by an import are left out.
+    """
+    with instrumentation.timed("graph.implicit_dependencies"):
+        index = index or IdentifierIndex.from_stacks(stack_infos, exports)
+        imported = {
+            (export.exporting_stack_name, importing_stack)
+            for export in exports
+            for importing_stack in export.importing_stacks
+        }
+        dependencies: Dict[Tuple[str, str, str], ImplicitDependency] = {}
+        for stack in stack_infos:
+            for parameter in stack.parameters:
+                for key, providing_stack in index.match(parameter.value):
+                    pair = (providing_stack, stack.stack_name)
+                    if providing_stack == stack.stack_name or pair in imported:
+                        continue
+                    dependencies.setdefault(
+                        (*pair, parameter.name),
+                        ImplicitDependency(
+                            providing_stack=providing_stack,
+                            consuming_stack=stack.stack_name,
+                            parameter_name=parameter.name,
+                            identifier=key,
+                        ),
+                    )
+    logger.info(
+        f"Found {len(dependencies)} implicit dependencies in parameters "
+        f"matching {len(index)} identifiers"
+    )
+    return list(dependencies.values())
+
+
+def _is_specific(identifier: str) -> bool:
+    return len(identifier) >= MIN_IDENTIFIER_LENGTH and not identifier.isdigit()
@@ -0,0 +1,261 @@
+# Core Library
+import json
+import time
+import bisect
+import logging
+import threading
+from typing import Any, Dict, List, Tuple, Iterable, Iterator, Optional, Protocol
+from contextlib import contextmanager
+from dataclasses import field, dataclass
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in seconds, suited for AWS API calls up to `dot` layouts
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+PROMETHEUS_PREFIX = "infra_graph"
+
+
+class StageListener(Protocol):
+    def stage_started(self, stage: str) -> None:
+        ...
+
+    def stage_finished(self, stage: str) -> None:
+        ...
+
+
+@dataclass
+class Histogram:
+    buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS
+    # one slot per bucket plus the +Inf overflow, not cumulative
+    bucket_counts: List[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    def __post_init__(self):
+        if not self.bucket_counts:
+            self.bucket_counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative_buckets(self) -> List[Tuple[str, int]]:
+        result = []
+        running = 0
+        for upper_bound, count in zip(self.buckets, self.bucket_counts):
+            running += count
+            result.append((repr(upper_bound), running))
+        result.append(("+Inf", running + self.bucket_counts[-1]))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else None,
+            "min_seconds": self.min,
+            "max_seconds": self.max,
+            "histogram": dict(self.cumulative_buckets()),
+        }
+
+
+class Instrumentation:
+    """
+    Collects call counts, latencies, byte counts and cache hits/misses of a run.
+    Names are dotted paths like `cloudformation.list_imports` or
+    `cache.gather_stacks.cache`.
+    """
+
+    timers: Dict[str, Histogram]
+    counters: Dict[str, int]
+    byte_counters: Dict[str, int]
+    stage_listeners: List[StageListener]
+
+    def __init__(self) -> None:
+        self.stage_listeners = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.timers = {}
+        self.counters = {}
+        self.byte_counters = {}
+
+    @contextmanager
+    def timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a pipeline stage and notify the registered stage listeners"""
+        for listener in self.stage_listeners:
+            listener.stage_started(name)
+        try:
+            with self.timed(f"stage.{name}"):
+                yield
+        finally:
+            for listener in reversed(self.stage_listeners):
+                listener.stage_finished(name)
+
+    def add_stage_listener(self, listener: StageListener) -> None:
+        self.stage_listeners.append(listener)
+
+    def remove_stage_listener(self, listener: StageListener) -> None:
+        self.stage_listeners.remove(listener)
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Time every `next` call, e.g. the page fetches of a boto3 paginator"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(name, time.perf_counter() - start)
+            yield item
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.timers.get(name)
+            if histogram is None:
+                histogram = self.timers[name] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_bytes(self, name: str, amount: int) -> None:
+        with self._lock:
+            self.byte_counters[name] = self.byte_counters.get(name, 0) + amount
+
+    def cache_hit(self, name: str) -> None:
+        self.increment(f"{name}.hit")
+
+    def cache_miss(self, name: str) -> None:
+        self.increment(f"{name}.miss")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "timers": {
+                name: histogram.to_dict()
+                for name, histogram in sorted(self.timers.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "bytes": dict(sorted(self.byte_counters.items())),
+        }
+
+    def to_prometheus(self) -> str:
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_duration_seconds Latency of instrumented calls",
+            f"# TYPE {PROMETHEUS_PREFIX}_duration_seconds histogram",
+        ]
+        for name, histogram in sorted(self.timers.items()):
+            for upper_bound, count in histogram.cumulative_buckets():
+                lines.append(
+                    f'{PROMETHEUS_PREFIX}_duration_seconds_bucket{{name="{name}",le="{upper_bound}"}} {count}'
+                )
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_duration_seconds_sum{{name="{name}"}} {histogram.total}'
+            )
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_duration_seconds_count{{name="{name}"}} {histogram.count}'
+            )
+        lines.extend(
+            [
+                f"# HELP {PROMETHEUS_PREFIX}_events_total Counted events like cache hits",
+                f"# TYPE {PROMETHEUS_PREFIX}_events_total counter",
+            ]
+        )
+        for name, count in sorted(self.counters.items()):
+            lines.append(f'{PROMETHEUS_PREFIX}_events_total{{name="{name}"}} {count}')
+        lines.extend(
+            [
+                f"# HELP {PROMETHEUS_PREFIX}_bytes_total Bytes read or written",
+                f"# TYPE {PROMETHEUS_PREFIX}_bytes_total counter",
+            ]
+        )
+        for name, amount in sorted(self.byte_counters.items()):
+            lines.append(f'{PROMETHEUS_PREFIX}_bytes_total{{name="{name}"}} {amount}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_folder: str, prometheus: bool = False) -> None:
+        with open(f"{output_folder}/timings.json", "w") as write_file:
+            json.dump(self.to_dict(), write_file, indent=2)
+        if prometheus:
+            with open(f"{output_folder}/timings.prom", "w") as write_file:
+                write_file.write(self.to_prometheus())
+
+
+class InstrumentedClient:
+    """
+    Transparent proxy around a boto3 client that times every API call and
+    every page fetched through its paginators.
+    """
+
+    def __init__(self, client: Any, name: str, instrumentation: Instrumentation):
+        self._client = client
+        self._name = name
+        self._instrumentation = instrumentation
+
+    def get_paginator(self, operation_name: str) -> "InstrumentedPaginator":
+        return InstrumentedPaginator(
+            self._client.get_paginator(operation_name),
+            f"{self._name}.{operation_name}",
+            self._instrumentation,
+        )
+
+    def __getattr__(self, attribute: str) -> Any:
+        value = getattr(self._client, attribute)
+        if not callable(value):
+            return value
+        name = f"{self._name}.{attribute}"
+        instrumentation = self._instrumentation
+
+        def timed_call(*args, **kwargs):
+            with instrumentation.timed(name):
+                return value(*args, **kwargs)
+
+        return timed_call
+
+
+class InstrumentedPaginator:
+    def __init__(self, paginator: Any, name: str, instrumentation: Instrumentation):
+        self._paginator = paginator
+        self._name = name
+        self._instrumentation = instrumentation
+
+    def paginate(self, **kwargs) -> Iterator:
+        return self._instrumentation.timed_iter(
+            self._name, self._paginator.paginate(**kwargs)
+        )
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,92 @@
+# Core Library
+import os
+import pickle
+import logging
+from typing import IO, Any, Dict, List, Tuple, Optional
+from pathlib import Path
+
+# First party
+from aws_infra_graph.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal"
+DEFAULT_BATCH_SIZE = 25
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of finished records, so an interrupted extraction can
+    resume where it stopped. Records are buffered and written as one pickle
+    frame per batch followed by an fsync. A frame cut off by a crash is dropped
+    when the journal is loaded. Without a path the journal does nothing.
+    """
+
+    def __init__(self, path: Optional[Path], batch_size: int = DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending: List[Tuple[str, Any]] = []
+        self._file: Optional[IO[bytes]] = None
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def load(self) -> Dict[str, Any]:
+        """The records of earlier runs by key"""
+        records: Dict[str, Any] = {}
+        if self.path is None or not self.path.exists():
+            return records
+        valid_size = 0
+        with open(self.path, "rb") as read_file:
+            while True:
+                try:
+                    batch = pickle.load(read_file)
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError, AttributeError):
+                    logger.warning(f"Dropping the unreadable end of {self.path}")
+                    break
+                records.update(batch)
+                valid_size = read_file.tell()
+        if valid_size < self.path.stat().st_size:
+            # appends have to start after the last complete frame
+            os.truncate(self.path, valid_size)
+        if records:
+            logger.info(f"Resuming with {len(records)} records from {self.path}")
+            instrumentation.increment("checkpoint.resumed", len(records))
+        return records
+
+    def append(self, key: str, record: Any) -> None:
+        self._pending.append((key, record))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.path is None or not self._pending:
+            self._pending.clear()
+            return
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "ab")
+        # one frame per batch, so names repeated in a batch are pickled once
+        pickle.dump(self._pending, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        instrumentation.increment("checkpoint.batches")
+        self._pending = []
+
+    def close(self) -> None:
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def delete(self) -> None:
+        """Remove the journal once its results are stored elsewhere"""
+        self._pending.clear()
+        self.close()
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
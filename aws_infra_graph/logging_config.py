@@ -0,0 +1,20 @@
+# Core Library
+import os
+import logging
+
+LOG_FORMAT = "[%(levelname)s] %(message)s"
+
+
+def configure_logging() -> None:
+    """
+    Install the colored console logging for the CLI. Kept out of module import
+    time so that library users and light subcommands do not pay for it.
+    """
+    # Third party
+    import coloredlogs
+    from colorama import init
+
+    init(autoreset=True)
+    level = os.getenv("LOG_LEVEL", "INFO")
+    logging.basicConfig(format=LOG_FORMAT, level=level)
+    coloredlogs.install(level=level, fmt=LOG_FORMAT)
@@ -49,7 +49,54 @@ class StackExport:
     importing_services: List[str] = field(default_factory=list)
 
 
+@dataclass
+class ServiceDependency:
+    exporting_service: str
+    importing_service: str
+    exports: int
+    exporting_stacks: int
+    importing_stacks: int
+
+
+@dataclass
+class CentralityScores:
+    pagerank: float
+    fan_out: int  # nodes depending on it transitively
+    betweenness: float
+
+
+@dataclass
+class ImplicitDependency:
+    """A parameter of the consuming stack holds an id of the providing stack"""
+
+    providing_stack: str
+    consuming_stack: str
+    parameter_name: str
+    identifier: str
+
+
+@dataclass
+class ProjectSummary:
+    project_name: str
+    stack_prefix: str
+    stacks: int
+    exports: int
+
+
 class DataExport(BaseModel):
     stacks: List[StackInfo]
     stack_exports: List[StackExport]
     resource_statistics: Dict[str, int]
+    # dimension (service, component, stack) -> group -> resource type -> count
+    resource_statistics_by: Dict[str, Dict[str, Dict[str, int]]] = {}
+    service_dependencies: List[ServiceDependency] = []
+    implicit_dependencies: List[ImplicitDependency] = []
+    # importance of the stacks and services in the dependency graphs
+    stack_centrality: Dict[str, CentralityScores] = {}
+    service_centrality: Dict[str, CentralityScores] = {}
+
+
+class ProjectsExport(BaseModel):
+    projects: List[ProjectSummary]
+    # services are qualified with their project: <project>/<service>
+    service_dependencies: List[ServiceDependency] = []
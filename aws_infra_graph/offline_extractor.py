@@ -0,0 +1,283 @@
+# Core Library
+import re
+import json
+import logging
+from typing import IO, Any, Set, Dict, List, Tuple, Iterator, Optional
+from pathlib import Path
+
+# First party
+from aws_infra_graph.model import (
+    StackInfo,
+    StackExport,
+    StackResource,
+    StackParameter,
+    ExternalDependency,
+)
+from aws_infra_graph.symbols import SymbolTable
+from aws_infra_graph.sharding import SHARDS_FOLDER, MANIFEST_FILE_NAME
+from aws_infra_graph.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FILE_NAME = "export.json"
+SNAPSHOT_DB_SUFFIXES = (".sqlite", ".db")
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class OfflineDataExtractor:
+    """
+    Reads stacks and exports from a previous run instead of AWS. Supported are
+    an export.json, an output folder (plain or sharded) and a snapshot store.
+    """
+
+    def __init__(self, path: str, stack_prefix: Optional[str] = None):
+        self.path = Path(path)
+        self.stack_prefix = stack_prefix
+        self.names = SymbolTable()
+        self._loaded: Optional[Tuple[List[StackInfo], List[StackExport]]] = None
+
+    def gather_stacks(self) -> List[StackInfo]:
+        return self._load()[0]
+
+    def gather_and_filter_exports(self, stacks: List[StackInfo]) -> List[StackExport]:
+        return self._load()[1]
+
+    def _load(self) -> Tuple[List[StackInfo], List[StackExport]]:
+        if self._loaded is None:
+            with instrumentation.timed("offline.load"):
+                stack_infos, exports = self._read(self.path)
+            if self.stack_prefix:
+                stack_infos = [
+                    stack
+                    for stack in stack_infos
+                    if stack.stack_name.startswith(self.stack_prefix)
+                ]
+                exports = [
+                    export
+                    for export in exports
+                    if export.exporting_stack_name.startswith(self.stack_prefix)
+                ]
+            logger.info(
+                f"Loaded {len(stack_infos)} stacks and {len(exports)} exports from {self.path}"
+            )
+            self._loaded = stack_infos, exports
+        return self._loaded
+
+    def _read(self, path: Path) -> Tuple[List[StackInfo], List[StackExport]]:
+        if path.is_dir():
+            if (path / EXPORT_FILE_NAME).exists():
+                return self._read_export_file(path / EXPORT_FILE_NAME)
+            if (path / SHARDS_FOLDER / MANIFEST_FILE_NAME).exists():
+                return self._read_shards(path / SHARDS_FOLDER)
+            raise ValueError(f"No {EXPORT_FILE_NAME} or shards found in {path}")
+        if path.suffix in SNAPSHOT_DB_SUFFIXES:
+            return self._read_snapshot_store(path)
+        return self._read_export_file(path)
+
+    def _read_export_file(
+        self, path: Path
+    ) -> Tuple[List[StackInfo], List[StackExport]]:
+        stack_infos = []
+        exports = []
+        with open(path) as read_file:
+            for key, item in iter_top_level_arrays(
+                read_file, {"stacks", "stack_exports"}
+            ):
+                if key == "stacks":
+                    stack_infos.append(self._stack_info(item))
+                else:
+                    exports.append(self._stack_export(item))
+        return stack_infos, exports
+
+    def _read_shards(
+        self, shards_folder: Path
+    ) -> Tuple[List[StackInfo], List[StackExport]]:
+        """
+        Shards hold the exports of their stacks plus the imported ones restricted
+        to their importing stacks, so the exports get merged by name again
+        """
+        with open(shards_folder / MANIFEST_FILE_NAME) as read_file:
+            manifest = json.load(read_file)
+        stacks_by_name: Dict[str, StackInfo] = {}
+        exports_by_name: Dict[str, StackExport] = {}
+        importing_stacks: Dict[str, Dict[str, None]] = {}
+        for shard in manifest["shards"]:
+            shard_stacks, shard_exports = self._read_export_file(
+                shards_folder.parent / shard["path"] / EXPORT_FILE_NAME
+            )
+            for stack in shard_stacks:
+                stacks_by_name[stack.stack_name] = stack
+            for export in shard_exports:
+                exports_by_name.setdefault(export.export_name, export)
+                importing_stacks.setdefault(export.export_name, {}).update(
+                    dict.fromkeys(export.importing_stacks)
+                )
+
+        service_of_stack = {
+            stack.stack_name: stack.service_name for stack in stacks_by_name.values()
+        }
+        exports = [
+            StackExport(
+                export_name=export.export_name,
+                export_value=export.export_value,
+                exporting_stack_name=export.exporting_stack_name,
+                importing_stacks=list(importing_stacks[export.export_name]),
+                export_service=export.export_service,
+                importing_services=[
+                    service
+                    for importing_stack in importing_stacks[export.export_name]
+                    if (service := service_of_stack.get(importing_stack)) is not None
+                ],
+            )
+            for export in exports_by_name.values()
+        ]
+        return list(stacks_by_name.values()), exports
+
+    def _read_snapshot_store(
+        self, path: Path
+    ) -> Tuple[List[StackInfo], List[StackExport]]:
+        # First party
+        from aws_infra_graph.snapshot_store import SnapshotStore
+
+        with SnapshotStore(path) as store:
+            if self.stack_prefix:
+                snapshot_id = store.latest(self.stack_prefix)
+            else:
+                snapshots = store.snapshots()
+                snapshot_id = snapshots[-1].id if snapshots else None
+            if snapshot_id is None:
+                raise ValueError(f"No snapshot found in {path}")
+            return store.load(snapshot_id)
+
+    def _stack_info(self, item: Dict[str, Any]) -> StackInfo:
+        intern = self.names.intern
+        return StackInfo(
+            stack_name=intern(item["stack_name"]),
+            service_name=_optional(intern, item.get("service_name")),
+            component_name=_optional(intern, item.get("component_name")),
+            resources=[
+                StackResource(
+                    logical_id=resource["logical_id"],
+                    resource_type=intern(resource["resource_type"]),
+                    physical_id=resource.get("physical_id"),
+                )
+                for resource in item.get("resources", [])
+            ],
+            parameters=[
+                StackParameter(
+                    name=parameter["name"],
+                    value=parameter["value"],
+                    description=parameter.get("description"),
+                    external_dependency=ExternalDependency(
+                        **parameter["external_dependency"]
+                    )
+                    if parameter.get("external_dependency")
+                    else None,
+                )
+                for parameter in item.get("parameters", [])
+            ],
+        )
+
+    def _stack_export(self, item: Dict[str, Any]) -> StackExport:
+        intern = self.names.intern
+        return StackExport(
+            export_name=item["export_name"],
+            export_value=item["export_value"],
+            exporting_stack_name=intern(item["exporting_stack_name"]),
+            importing_stacks=[
+                intern(stack) for stack in item.get("importing_stacks", [])
+            ],
+            export_service=_optional(intern, item.get("export_service")),
+            importing_services=[
+                intern(service) for service in item.get("importing_services", [])
+            ],
+        )
+
+
+def _optional(intern, name: Optional[str]) -> Optional[str]:
+    return None if name is None else intern(name)
+
+
+def iter_top_level_arrays(
+    stream: IO[str], keys: Set[str], chunk_size: int = CHUNK_SIZE
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (key, element) for every element of the arrays stored under `keys`
+    in the top level object of a JSON document. The elements are decoded one
+    at a time from a chunked buffer, the document is never parsed as a whole.
+    """
+    reader = _JsonReader(stream, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode()
+        reader.expect(":")
+        if key in keys and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield key, reader.decode()
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            reader.decode()
+        if reader.expect(",}") == "}":
+            return
+
+
+class _JsonReader:
+    def __init__(self, stream: IO[str], chunk_size: int = CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if character not in characters:
+            raise ValueError(
+                f"Expected one of '{characters}' but got '{character}' in JSON document"
+            )
+        self.position += 1
+        return character
+
+    def decode(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number at the end of the buffer might continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.position = end
+            return value
@@ -0,0 +1,209 @@
+# Core Library
+import re
+import pickle
+from bisect import bisect_left
+from typing import Dict, List, Tuple, Union, Iterable, Optional
+from pathlib import Path
+from dataclasses import dataclass
+
+# First party
+from aws_infra_graph.model import StackInfo
+
+EXACT = "exact"
+COMPONENT = "component"
+PREFIX = "prefix"
+
+DEFAULT_LIMIT = 20
+
+# saved next to export.json and, for extractions from AWS, in the disc cache
+INDEX_FILE_NAME = "ownership-index.pickle"
+INDEX_CACHE_FILE_NAME = "ownership_index.cache"
+
+_SEPARATORS = re.compile(r"[/:]")
+
+
+@dataclass(frozen=True)
+class ResourceOwner:
+    physical_id: str
+    stack_name: str
+    service_name: Optional[str]
+    component_name: Optional[str]
+    logical_id: str
+    resource_type: str
+
+
+@dataclass(frozen=True)
+class OwnershipMatch:
+    owner: ResourceOwner
+    match: str  # exact, component or prefix
+    key: str
+
+
+def _resource_part(identifier: str) -> Optional[str]:
+    """The part of an ARN or URL after the account or the scheme"""
+    if identifier.startswith("arn:"):
+        parts = identifier.split(":", 5)
+        return parts[5] if len(parts) == 6 else None
+    if "://" in identifier:
+        return identifier.split("://", 1)[1]
+    return None
+
+
+def resource_keys(physical_id: str) -> List[str]:
+    """
+    The keys a physical id is indexed under: the id itself and every suffix of
+    its ARN resource or URL path starting after a separator, so
+    arn:aws:iam::123:role/path/name is found by role/path/name, path/name and name
+    """
+    keys = [physical_id]
+    resource = _resource_part(physical_id)
+    if resource:
+        keys.append(resource)
+        keys.extend(
+            resource[match.end() :]
+            for match in _SEPARATORS.finditer(resource)
+            if match.end() < len(resource)
+        )
+    return list(dict.fromkeys(keys))
+
+
+def query_keys(query: str) -> List[str]:
+    """
+    The keys to look up for a query, longest first: every run of separated
+    components of its ARN resource or URL path. Qualified ARNs and ARNs of
+    objects below a resource (function:name:3, bucket/key) find the resource.
+    """
+    resource = _resource_part(query) or query
+    bounds = [0]
+    for match in _SEPARATORS.finditer(resource):
+        bounds.extend((match.start(), match.end()))
+    bounds.append(len(resource))
+    starts, ends = bounds[0::2], bounds[1::2]
+    keys = {query}
+    for start_index, start in enumerate(starts):
+        for end in ends[start_index:]:
+            if end > start:
+                keys.add(resource[start:end])
+    return sorted(keys, key=lambda key: (-len(key), key))
+
+
+def best_matches(
+    query: str, keyed_owners: Iterable[Tuple[str, ResourceOwner]]
+) -> List[OwnershipMatch]:
+    """
+    Keep the owners found by the longest key, an exact match of the physical
+    id wins over any component match
+    """
+    candidates = list(keyed_owners)
+    exact = [owner for key, owner in candidates if owner.physical_id == query]
+    if exact:
+        return [OwnershipMatch(owner, EXACT, query) for owner in _unique(exact)]
+    if not candidates:
+        return []
+    longest = max(len(key) for key, _ in candidates)
+    return [
+        OwnershipMatch(owner, COMPONENT, key)
+        for key, owner in _unique_keyed(
+            (key, owner) for key, owner in candidates if len(key) == longest
+        )
+    ]
+
+
+def _unique(owners: Iterable[ResourceOwner]) -> List[ResourceOwner]:
+    return list(dict.fromkeys(owners))
+
+
+def _unique_keyed(
+    keyed_owners: Iterable[Tuple[str, ResourceOwner]]
+) -> List[Tuple[str, ResourceOwner]]:
+    return list({owner: (key, owner) for key, owner in keyed_owners}.values())
+
+
+class OwnershipIndex:
+    """
+    Answers which stack, service and component own a physical id. Exact ids
+    and ARN/URL components are hash lookups, prefixes a binary search over the
+    sorted keys, so a lookup stays far below a millisecond for hundreds of
+    thousands of resources.
+    """
+
+    def __init__(self, owners: List[ResourceOwner]):
+        self.owners = owners
+        self._by_key: Dict[str, List[int]] = {}
+        for index, owner in enumerate(owners):
+            for key in resource_keys(owner.physical_id):
+                self._by_key.setdefault(key, []).append(index)
+        self._sorted_keys = sorted(self._by_key)
+
+    @classmethod
+    def from_stack_infos(cls, stack_infos: List[StackInfo]) -> "OwnershipIndex":
+        return cls(
+            [
+                ResourceOwner(
+                    physical_id=resource.physical_id,
+                    stack_name=stack.stack_name,
+                    service_name=stack.service_name,
+                    component_name=stack.component_name,
+                    logical_id=resource.logical_id,
+                    resource_type=resource.resource_type,
+                )
+                for stack in stack_infos
+                for resource in stack.resources
+                if resource.physical_id
+            ]
+        )
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    def save(self, path: Union[str, Path]) -> None:
+        with open(path, "wb") as write_file:
+            pickle.dump(self, write_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: Path, source: Path) -> Optional["OwnershipIndex"]:
+        """
+        The index saved at `path`, None if there is none or if it is older than
+        the `source` file it was built from
+        """
+        try:
+            if path.stat().st_mtime_ns < source.stat().st_mtime_ns:
+                return None
+            with open(path, "rb") as read_file:
+                return pickle.load(read_file)
+        except FileNotFoundError:
+            return None
+
+    def lookup(self, query: str, limit: int = DEFAULT_LIMIT) -> List[OwnershipMatch]:
+        """
+        Owners of the resource with the physical id `query`, else of the
+        resources matching its longest ARN/URL component, else of the ids and
+        components starting with `query`
+        """
+        query = query.strip()
+        if not query:
+            return []
+        matches = best_matches(
+            query,
+            (
+                (key, self.owners[index])
+                for key in query_keys(query)
+                for index in self._by_key.get(key, ())
+            ),
+        )
+        if matches:
+            return matches[:limit]
+        return self._prefix_matches(query, limit)
+
+    def _prefix_matches(self, prefix: str, limit: int) -> List[OwnershipMatch]:
+        matches: Dict[ResourceOwner, OwnershipMatch] = {}
+        position = bisect_left(self._sorted_keys, prefix)
+        while position < len(self._sorted_keys) and len(matches) < limit:
+            key = self._sorted_keys[position]
+            if not key.startswith(prefix):
+                break
+            for index in self._by_key[key]:
+                owner = self.owners[index]
+                matches.setdefault(owner, OwnershipMatch(owner, PREFIX, key))
+            position += 1
+        return list(matches.values())[:limit]
@@ -0,0 +1,183 @@
+# Core Library
+import os
+import sys
+import json
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from typing import Any, Dict, List, Iterator, Optional, Sequence, DefaultDict
+from contextlib import ExitStack, contextmanager
+from collections import defaultdict
+
+# First party
+from aws_infra_graph.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLING_INTERVAL = 0.005
+TOP_ALLOCATIONS = 10
+
+
+class StageTracker:
+    """Remembers the pipeline stage that is currently running"""
+
+    def __init__(self) -> None:
+        self.current: Optional[str] = None
+
+    def stage_started(self, stage: str) -> None:
+        self.current = stage
+
+    def stage_finished(self, stage: str) -> None:
+        self.current = None
+
+
+class CProfileProfiler:
+    def __init__(self, output_folder: str) -> None:
+        self.output_folder = output_folder
+        self.profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+        stats_path = f"{self.output_folder}/profile.pstats"
+        self.profile.dump_stats(stats_path)
+        with open(f"{self.output_folder}/profile.txt", "w") as write_file:
+            stats = pstats.Stats(self.profile, stream=write_file)
+            stats.sort_stats("cumulative").print_stats(50)
+        logger.info(f"cProfile stats written to {stats_path}")
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of the profiled thread from a background thread and
+    writes them in the folded format understood by flamegraph.pl and
+    speedscope. Each stack is rooted at the pipeline stage it was sampled in.
+    """
+
+    def __init__(
+        self, output_folder: str, interval: float = DEFAULT_SAMPLING_INTERVAL
+    ) -> None:
+        self.output_folder = output_folder
+        self.interval = interval
+        self.samples: DefaultDict[str, int] = defaultdict(int)
+        self.stages = StageTracker()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._target_thread_id = threading.get_ident()
+
+    def start(self) -> None:
+        self._target_thread_id = threading.get_ident()
+        instrumentation.add_stage_listener(self.stages)
+        self._thread = threading.Thread(
+            target=self._run, name="infra-graph-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is None:
+                continue
+            names: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            names.append(self.stages.current or "other")
+            self.samples[";".join(reversed(names))] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+        instrumentation.remove_stage_listener(self.stages)
+        folded_path = f"{self.output_folder}/profile.folded"
+        with open(folded_path, "w") as write_file:
+            for stack, count in sorted(self.samples.items()):
+                write_file.write(f"{stack} {count}\n")
+        logger.info(
+            f"{sum(self.samples.values())} stack samples written to {folded_path}"
+        )
+
+
+class MemoryProfiler:
+    """Records the peak traced allocations of every pipeline stage"""
+
+    def __init__(self, output_folder: str) -> None:
+        self.output_folder = output_folder
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._stage_start_bytes = 0
+
+    def start(self) -> None:
+        tracemalloc.start()
+        instrumentation.add_stage_listener(self)
+
+    def stage_started(self, stage: str) -> None:
+        self._stage_start_bytes, _ = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, "reset_peak"):  # python >= 3.9
+            tracemalloc.reset_peak()
+
+    def stage_finished(self, stage: str) -> None:
+        current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        top_allocations = [
+            {"location": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        ]
+        self.stages[stage] = {
+            "peak_bytes": peak_bytes,
+            "peak_bytes_above_stage_start": peak_bytes - self._stage_start_bytes,
+            "retained_bytes": current_bytes - self._stage_start_bytes,
+            "top_allocations": top_allocations,
+        }
+
+    def stop(self) -> None:
+        instrumentation.remove_stage_listener(self)
+        tracemalloc.stop()
+        memory_path = f"{self.output_folder}/memory.json"
+        with open(memory_path, "w") as write_file:
+            json.dump(self.stages, write_file, indent=2)
+        for stage, result in self.stages.items():
+            logger.info(
+                f"Memory {stage}: peak {result['peak_bytes_above_stage_start'] / 2**20:.1f} MiB"
+            )
+
+
+@contextmanager
+def profiled(
+    modes: Sequence[str],
+    output_folder: str,
+    sampling_interval: float = DEFAULT_SAMPLING_INTERVAL,
+) -> Iterator[None]:
+    """
+    Profile the wrapped run with the given modes and store the results in the
+    output folder: `profile.pstats`/`profile.txt` (cprofile), `profile.folded`
+    (sampling) and `memory.json` (memory).
+    """
+    profilers: List[Any] = []
+    for mode in modes:
+        if mode == "cprofile":
+            profilers.append(CProfileProfiler(output_folder))
+        elif mode == "sampling":
+            profilers.append(SamplingProfiler(output_folder, sampling_interval))
+        elif mode == "memory":
+            profilers.append(MemoryProfiler(output_folder))
+        else:
+            raise ValueError(f"Unknown profile mode '{mode}'")
+
+    with ExitStack() as stack:
+        for profiler in profilers:
+            profiler.start()
+            stack.callback(_stop_profiler, profiler, output_folder)
+        yield
+
+
+def _stop_profiler(profiler: Any, output_folder: str) -> None:
+    os.makedirs(output_folder, exist_ok=True)
+    profiler.stop()
@@ -0,0 +1,382 @@
+# Core Library
+import os
+import math
+import logging
+from typing import Dict, List, Tuple, Optional
+from pathlib import Path
+from dataclasses import dataclass
+
+# Third party
+from colorama import Fore
+from graphviz import Digraph
+
+# First party
+from aws_infra_graph.model import StackInfo, StackExport, ProjectsExport, ProjectSummary
+from aws_infra_graph.utils import SYSTEM_CACHE_ROOT, file_cached
+from aws_infra_graph.config import InfraGraphConfig, load_config
+from aws_infra_graph.filters import StackFilter
+from aws_infra_graph.render_cache import RenderCache
+from aws_infra_graph.html_renderer import HTML, GRAPHVIZ, GraphDocument
+from aws_infra_graph.data_extractor import DataExtractor, IDataExtractor
+from aws_infra_graph.graph_exporter import (
+    FocusOptions,
+    ClusterOptions,
+    ServiceEdgeWeight,
+    InfraGraphExporter,
+    NodeAndEdgesServiceGraph,
+)
+from aws_infra_graph.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+PROJECTS_FILE_NAME = "projects.json"
+UNKNOWN_SERVICE = "Unknown"
+
+
+@dataclass
+class ProjectPartition:
+    project_name: str
+    stack_prefix: str
+    stack_infos: List[StackInfo]
+    exports: List[StackExport]
+
+
+class AllProjectsDataExtractor(DataExtractor):
+    """
+    Extracts the stacks of all projects with a single walk over list_stacks and
+    list_exports. Every stack is assigned to the project with the longest
+    matching prefix and filtered by that project's filter.
+    """
+
+    def __init__(
+        self,
+        stack_filters: List[StackFilter],
+        service_tags: List[str],
+        component_tags: List[str],
+        cfn_client=None,
+        throttle_delay: float = 0.1,
+        checkpoint_folder: Optional[Path] = None,
+    ) -> None:
+        super().__init__(
+            "",
+            service_tags,
+            component_tags,
+            cfn_client,
+            throttle_delay=throttle_delay,
+            checkpoint_folder=checkpoint_folder,
+        )
+        self.stack_filters = sorted(
+            stack_filters, key=lambda stack_filter: -len(stack_filter.prefix)
+        )
+
+    @file_cached("all_projects_gather_and_filter_exports.cache")
+    def gather_and_filter_exports(self, stacks: List[StackInfo]) -> List[StackExport]:
+        return DataExtractor.gather_and_filter_exports.__wrapped__(self, stacks)
+
+    @file_cached("all_projects_gather_stacks.cache")
+    def gather_stacks(self) -> List[StackInfo]:
+        return DataExtractor.gather_stacks.__wrapped__(self)
+
+    def _checkpoint_name(self) -> str:
+        return "all_projects"
+
+    def _filter_of(self, stack_name: str) -> Optional[StackFilter]:
+        return next(
+            (
+                stack_filter
+                for stack_filter in self.stack_filters
+                if stack_name.startswith(stack_filter.prefix)
+            ),
+            None,
+        )
+
+
+def partition_by_project(
+    stack_infos: List[StackInfo],
+    exports: List[StackExport],
+    stack_prefixes: Dict[str, str],
+) -> List[ProjectPartition]:
+    """
+    Split the stacks and exports of all projects by stack prefix. The exports
+    keep importing stacks of other projects, but their importing services are
+    restricted to the project like in a single project run.
+    """
+    prefixes = sorted(stack_prefixes.items(), key=lambda item: -len(item[1]))
+
+    def project_of(stack_name: str) -> Optional[str]:
+        return next(
+            (
+                project_name
+                for project_name, prefix in prefixes
+                if stack_name.startswith(prefix)
+            ),
+            None,
+        )
+
+    stacks_by_project: Dict[str, List[StackInfo]] = {
+        project_name: [] for project_name in stack_prefixes
+    }
+    for stack in stack_infos:
+        project_name = project_of(stack.stack_name)
+        if project_name is not None:
+            stacks_by_project[project_name].append(stack)
+
+    exports_by_project: Dict[str, List[StackExport]] = {
+        project_name: [] for project_name in stack_prefixes
+    }
+    for export in exports:
+        project_name = project_of(export.exporting_stack_name)
+        if project_name is not None:
+            exports_by_project[project_name].append(export)
+
+    return [
+        ProjectPartition(
+            project_name=project_name,
+            stack_prefix=stack_prefixes[project_name],
+            stack_infos=stacks_by_project[project_name],
+            exports=list(
+                DataExtractor._enrich_service_name(
+                    exports_by_project[project_name], stacks_by_project[project_name]
+                )
+            ),
+        )
+        for project_name in stack_prefixes
+    ]
+
+
+def build_cross_project_service_graph(
+    partitions: List[ProjectPartition],
+) -> NodeAndEdgesServiceGraph:
+    """
+    Service graph over all projects. Services are qualified with their project,
+    so equally named services of different teams stay apart.
+    """
+    service_of_stack = {
+        stack.stack_name: qualified_service_name(
+            partition.project_name, stack.service_name
+        )
+        for partition in partitions
+        for stack in partition.stack_infos
+    }
+    edges = set()
+    nodes = set()
+    edge_weights: Dict[Tuple[str, str], ServiceEdgeWeight] = {}
+    for partition in partitions:
+        for export in partition.exports:
+            exporting_service = service_of_stack[export.exporting_stack_name]
+            importing_stacks_by_service: Dict[str, List[str]] = {}
+            for importing_stack in export.importing_stacks:
+                importing_service = service_of_stack.get(importing_stack)
+                if importing_service not in (None, exporting_service):
+                    importing_stacks_by_service.setdefault(
+                        importing_service, []
+                    ).append(importing_stack)
+
+            for (
+                importing_service,
+                importing_stacks,
+            ) in importing_stacks_by_service.items():
+                edge = (exporting_service, importing_service)
+                weight = edge_weights.get(edge)
+                if weight is None:
+                    weight = edge_weights[edge] = ServiceEdgeWeight()
+                    edges.add(edge)
+                    nodes.update(edge)
+                weight.exports += 1
+                weight.exporting_stacks.add(export.exporting_stack_name)
+                weight.importing_stacks.update(importing_stacks)
+
+    return NodeAndEdgesServiceGraph(
+        edges=edges,
+        external_edges=set(),
+        manual_downstream_edges=set(),
+        manual_internal_edges=set(),
+        internal_nodes=nodes,
+        external_nodes=set(),
+        manual_downstream_nodes=set(),
+        manual_internal_nodes=set(),
+        edge_weights=edge_weights,
+    )
+
+
+def qualified_service_name(project_name: str, service_name: Optional[str]) -> str:
+    return f"{project_name}/{service_name or UNKNOWN_SERVICE}"
+
+
+class AllProjectsExporter:
+    """
+    Exports every configured project from one extraction: one output folder
+    per project plus a cross-project service graph in the output folder.
+    """
+
+    config: InfraGraphConfig
+
+    def __init__(
+        self,
+        env: str,
+        output_folder: str,
+        config_path: str = "./config.hocon",
+        data_extractor: Optional[IDataExtractor] = None,
+        render_cache: Optional[RenderCache] = None,
+    ):
+        self.config = load_config(config_path)
+        self.config_path = config_path
+        self.render_cache = render_cache
+        self.env = env
+        self.output_folder = output_folder
+        self.stack_prefixes = {
+            project_name: f"{project_name}-{env}"
+            for project_name in self.config.projects
+        }
+        self.data_extractor = data_extractor or AllProjectsDataExtractor(
+            [
+                StackFilter.from_config(
+                    stack_prefix, self.config.projects[project_name].filters
+                )
+                for project_name, stack_prefix in self.stack_prefixes.items()
+            ],
+            service_tags=self.config.service_tags,
+            component_tags=self.config.component_tags,
+            checkpoint_folder=SYSTEM_CACHE_ROOT,
+        )
+
+    def export(
+        self,
+        refresh: bool,
+        cluster_stack_graph: bool,
+        prometheus_metrics: bool = False,
+        detailed_report: bool = False,
+        shard_by_service: bool = False,
+        shard_workers: Optional[int] = None,
+        focus: Optional[FocusOptions] = None,
+        renderer: str = GRAPHVIZ,
+        clustering: Optional[ClusterOptions] = None,
+        simplify: bool = False,
+    ):
+        instrumentation.reset()
+        if refresh:
+            InfraGraphExporter.delete_caches()
+        with instrumentation.stage("extraction"):
+            stack_infos = self.data_extractor.gather_stacks()
+            exports = self.data_extractor.gather_and_filter_exports(stack_infos)
+        with instrumentation.stage("analysis"):
+            partitions = partition_by_project(stack_infos, exports, self.stack_prefixes)
+            service_graph = build_cross_project_service_graph(partitions)
+
+        for partition in partitions:
+            logger.info(f"{Fore.BLUE}Exporting project {partition.project_name}")
+            project_folder = f"{self.output_folder}/{partition.project_name}"
+            os.makedirs(project_folder, exist_ok=True)
+            InfraGraphExporter(
+                env=self.env,
+                output_folder=project_folder,
+                project_name=partition.project_name,
+                config_path=self.config_path,
+                data_extractor=self.data_extractor,
+                render_cache=self.render_cache,
+            ).export_extracted(
+                partition.stack_infos,
+                partition.exports,
+                cluster_stack_graph,
+                detailed_report,
+                shard_by_service,
+                shard_workers,
+                focus,
+                renderer,
+                clustering,
+                simplify,
+            )
+
+        with instrumentation.stage("rendering"):
+            self._visualize_projects(service_graph, renderer)
+        with instrumentation.stage("serialization"):
+            self._create_projects_export(partitions, service_graph)
+        instrumentation.write(self.output_folder, prometheus=prometheus_metrics)
+        logger.info(
+            f"\nGraphs of {len(partitions)} projects finished in {self.output_folder} folder"
+        )
+
+    def _visualize_projects(
+        self, service_graph: NodeAndEdgesServiceGraph, renderer: str = GRAPHVIZ
+    ) -> None:
+        nodes_by_project: Dict[str, List[str]] = {}
+        for node in sorted(service_graph.internal_nodes):
+            nodes_by_project.setdefault(node.split("/", 1)[0], []).append(node)
+
+        if renderer == HTML:
+            document = GraphDocument("Cross-Project Service Dependencies")
+            for project_name, nodes in nodes_by_project.items():
+                for node in nodes:
+                    document.node(node, group=project_name)
+            for edge in sorted(service_graph.edges):
+                document.edge(
+                    *edge,
+                    weight=service_graph.edge_weights[edge].exports,
+                    style=None if _is_internal_edge(edge) else "bold",
+                )
+            with instrumentation.timed("graph.projects.html"):
+                document.write(f"{self.output_folder}/export-projects")
+            return
+
+        projects_graph = Digraph(
+            "ProjectsGraph",
+            node_attr={"shape": "box", "style": "filled", "fillcolor": "grey"},
+        )
+        projects_graph.attr(
+            rankdir="LR",
+            label="Cross-Project Service Dependencies",
+            labelloc="t",
+            fontsize="20",
+        )
+        for project_name, nodes in nodes_by_project.items():
+            with projects_graph.subgraph(name=f"cluster_{project_name}") as subgraph:
+                subgraph.attr(label=project_name)
+                for node in nodes:
+                    subgraph.node(node, label=node.split("/", 1)[1])
+
+        for edge in sorted(service_graph.edges):
+            weight = service_graph.edge_weights[edge]
+            attributes = {
+                "weight": str(weight.exports),
+                "penwidth": f"{1 + math.log2(weight.exports):.2f}",
+                "tooltip": f"{weight.exports} exports",
+            }
+            if not _is_internal_edge(edge):
+                attributes["color"] = "darkorange"
+            projects_graph.edge(*edge, _attributes=attributes)
+
+        with instrumentation.timed("graph.projects.render"):
+            filename = f"{self.output_folder}/export-projects.gv"
+            if self.render_cache:
+                self.render_cache.render(projects_graph, filename)
+            else:
+                projects_graph.render(format="png", filename=filename)
+
+    def _create_projects_export(
+        self,
+        partitions: List[ProjectPartition],
+        service_graph: NodeAndEdgesServiceGraph,
+    ) -> None:
+        export = ProjectsExport(
+            projects=[
+                ProjectSummary(
+                    project_name=partition.project_name,
+                    stack_prefix=partition.stack_prefix,
+                    stacks=len(partition.stack_infos),
+                    exports=len(partition.exports),
+                )
+                for partition in partitions
+            ],
+            service_dependencies=InfraGraphExporter._service_dependencies(
+                service_graph
+            ),
+        )
+        os.makedirs(self.output_folder, exist_ok=True)
+        with open(f"{self.output_folder}/{PROJECTS_FILE_NAME}", "wb") as write_file:
+            written = write_file.write(export.json(indent=2).encode())
+        instrumentation.add_bytes(f"{PROJECTS_FILE_NAME}.written", written)
+
+
+def _is_internal_edge(edge) -> bool:
+    """Both services of the edge belong to the same project"""
+    return edge[0].split("/", 1)[0] == edge[1].split("/", 1)[0]
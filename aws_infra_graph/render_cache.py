@@ -0,0 +1,121 @@
+# Core Library
+import os
+import hashlib
+import logging
+import threading
+from typing import Set, Dict, Union
+from pathlib import Path
+
+# Third party
+from graphviz import Digraph
+
+# First party
+from aws_infra_graph.utils import SYSTEM_CACHE_ROOT
+from aws_infra_graph.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_CACHE = SYSTEM_CACHE_ROOT / Path("renders")
+# the least recently used renders beyond this number are deleted, renders of
+# the current run are always kept
+MAX_RENDER_CACHE_ENTRIES = 64
+
+METRIC_NAME = "cache.render"
+
+
+class RenderCache:
+    """
+    Rendered graphs keyed by a hash of their DOT source and render options.
+    A graph that did not change since an earlier run is linked into the
+    output folder instead of running dot again, which takes minutes on large
+    accounts. The graphs have to be built in a stable order for the source
+    to be the same. Shards render in parallel threads sharing one cache, so
+    the cache folder is only changed under a lock; other processes using the
+    same folder may still delete entries at any time.
+    """
+
+    def __init__(
+        self,
+        folder: Union[str, Path] = DEFAULT_RENDER_CACHE,
+        max_entries: int = MAX_RENDER_CACHE_ENTRIES,
+    ) -> None:
+        self.folder = Path(folder)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # entries linked or stored by this run, never pruned by it
+        self._used: Set[str] = set()
+
+    @staticmethod
+    def key(graph: Digraph, format: str) -> str:
+        options = f"{graph.engine}\n{format}\n"
+        return hashlib.sha256((options + graph.source).encode()).hexdigest()
+
+    def render(self, graph: Digraph, filename: str, format: str = "png") -> str:
+        """Like Digraph.render, writes the source and returns the rendered file"""
+        rendered = f"{filename}.{format}"
+        cached = self.folder / f"{self.key(graph, format)}.{format}"
+        if self._reuse(cached, Path(rendered)):
+            instrumentation.cache_hit(METRIC_NAME)
+            logger.info(f"using cached render '{cached}' for '{rendered}'")
+            graph.save(filename)
+            return rendered
+
+        instrumentation.cache_miss(METRIC_NAME)
+        # dot writes into the existing file, which may be linked to the cache
+        if os.path.lexists(rendered):
+            os.remove(rendered)
+        rendered = graph.render(format=format, filename=filename)
+        if rendered and os.path.exists(rendered):
+            with self._lock:
+                self.folder.mkdir(parents=True, exist_ok=True)
+                _link_or_copy(Path(rendered), cached)
+                self._used.add(cached.name)
+                self._prune()
+        return rendered
+
+    def _reuse(self, cached: Path, rendered: Path) -> bool:
+        """Link the cached render to the output, False if there is none"""
+        with self._lock:
+            try:
+                _link_or_copy(cached, rendered)
+                cached.touch()
+            except FileNotFoundError:
+                return False
+            self._used.add(cached.name)
+            return True
+
+    def _prune(self) -> None:
+        modified: Dict[Path, float] = {}
+        for entry in self.folder.iterdir():
+            if entry.name.startswith(".") or entry.name in self._used:
+                continue
+            try:
+                modified[entry] = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+        kept = max(0, self.max_entries - len(self._used))
+        for entry in sorted(modified, key=modified.__getitem__, reverse=True)[kept:]:
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    """
+    Hard link the target to the source, copy if the file system does not
+    allow it. The target is replaced atomically.
+    """
+    temporary = target.with_name(
+        f".{target.name}.{os.getpid()}.{threading.get_ident()}"
+    )
+    try:
+        os.link(source, temporary)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        temporary.write_bytes(source.read_bytes())
+    os.replace(temporary, target)
+    # rename does nothing if both are links to the same file already
+    if os.path.lexists(temporary):
+        os.remove(temporary)
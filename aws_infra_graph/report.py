@@ -0,0 +1,122 @@
+# Core Library
+import logging
+from typing import List, Counter, Iterable, DefaultDict
+from collections import defaultdict
+
+# Third party
+from colorama import Fore, Style
+
+# First party
+from aws_infra_graph.model import StackInfo, StackExport
+
+logger = logging.getLogger(__name__)
+
+REPORT_FILE_NAME = "report.txt"
+REPORT_BUFFER_SIZE = 1 << 20
+SUMMARY_TOP_RESOURCE_TYPES = 10
+
+
+def log_summary(
+    stack_infos: List[StackInfo],
+    imported_exports: List[StackExport],
+    statistics: Counter[str],
+) -> None:
+    """Log a few summary lines instead of every parameter and resource"""
+    services = {stack.service_name for stack in stack_infos if stack.service_name}
+    untagged = sum(1 for stack in stack_infos if stack.service_name is None)
+    imports = sum(len(export.importing_stacks) for export in imported_exports)
+    logger.info(
+        f"{Fore.BLUE}{len(stack_infos)} stacks in {len(services)} services "
+        f"({untagged} without service name)"
+    )
+    logger.info(
+        f"{Fore.BLUE}{len(imported_exports)} imported exports with {imports} imports"
+    )
+    logger.info(
+        f"{Fore.BLUE}{sum(statistics.values())} resources of {len(statistics)} types, top:"
+    )
+    for resource_type, count in statistics.most_common(SUMMARY_TOP_RESOURCE_TYPES):
+        logger.info(f"\t{resource_type}: {count} resources")
+
+
+def write_report(
+    path: str,
+    stack_infos: List[StackInfo],
+    imported_exports: List[StackExport],
+    statistics: Counter[str],
+) -> None:
+    """Write the full details of stacks, resources and exports into a text file"""
+    with open(path, "w", buffering=REPORT_BUFFER_SIZE) as report_file:
+        report_file.writelines(
+            f"{line}\n"
+            for lines in (
+                _stack_lines(stack_infos),
+                _statistics_lines(statistics),
+                _export_lines(imported_exports),
+            )
+            for line in lines
+        )
+    logger.info(f"{Style.BRIGHT}Detailed report written to {path}")
+
+
+def _stack_lines(stack_infos: List[StackInfo]) -> Iterable[str]:
+    yield "Stacks without service name:"
+    grouped_by_service: DefaultDict[str, List[StackInfo]] = defaultdict(list)
+    for stack_info in stack_infos:
+        if stack_info.service_name is None:
+            yield f"\t{stack_info.stack_name} [{stack_info.component_name}]"
+        else:
+            grouped_by_service[stack_info.service_name].append(stack_info)
+    yield ""
+
+    yield "Stacks grouped by service name:"
+    for service, stacks in grouped_by_service.items():
+        yield f"\t{service}:"
+        for stack in stacks:
+            yield f"\t\t{stack.stack_name} [{stack.component_name}]"
+    yield ""
+
+    yield "Stacks parameters:"
+    for stack_info in stack_infos:
+        yield f"\t{stack_info.stack_name}:"
+        for param in stack_info.parameters:
+            description = f"[{param.description}]" if param.description else ""
+            yield f"\t\t{param.name}: {param.value} {description}"
+            if param.external_dependency:
+                yield f"\t\t{param.external_dependency}"
+    yield ""
+
+    yield "Stacks resources:"
+    for stack_info in stack_infos:
+        yield f"\t{stack_info.stack_name}:"
+        for resource in stack_info.resources:
+            yield f"\t\t[{resource.resource_type}] {resource.logical_id}: {resource.physical_id}"
+    yield ""
+
+
+def _statistics_lines(statistics: Counter[str]) -> Iterable[str]:
+    yield "Resource Statistics:"
+    for resource_type, count in statistics.most_common():
+        yield f"\t{resource_type}: {count} resources"
+    yield ""
+
+
+def _export_lines(exports: List[StackExport]) -> Iterable[str]:
+    yield "Export details:"
+    for export in exports:
+        yield f"{export.export_name}:{export.export_value} [Stack: {export.exporting_stack_name}]"
+        for importing_stack in export.importing_stacks:
+            yield f"\t{importing_stack}"
+    yield ""
+
+    yield "Export details with service names:"
+    for export in exports:
+        if (
+            len(export.importing_services) == 1
+            and export.export_service == export.importing_services[0]
+        ):
+            yield f"{export.export_name} [Service: {export.export_service}] -> only reflexive dependency"
+        else:
+            yield f"{export.export_name} [Service: {export.export_service}]"
+            for importing_service in export.importing_services:
+                yield f"\t{importing_service}"
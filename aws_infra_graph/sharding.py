@@ -0,0 +1,86 @@
+# Core Library
+import re
+import hashlib
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+
+# First party
+from aws_infra_graph.model import StackInfo, StackExport
+
+UNASSIGNED_SHARD = "_unassigned"
+SHARDS_FOLDER = "shards"
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+@dataclass
+class Shard:
+    service_name: Optional[str]
+    stack_infos: List[StackInfo]
+    exports: List[StackExport]
+
+    @property
+    def name(self) -> str:
+        """
+        Folder name of the shard. Services whose name had to be changed get
+        a short hash of the original name, so "a/b" and "a b" stay apart.
+        """
+        if self.service_name is None:
+            return UNASSIGNED_SHARD
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", self.service_name)
+        if name == self.service_name and name != UNASSIGNED_SHARD:
+            return name
+        digest = hashlib.sha1(self.service_name.encode()).hexdigest()[:8]
+        return f"{name}-{digest}"
+
+
+def partition_by_service(
+    stack_infos: List[StackInfo],
+    exports: List[StackExport],
+    stacks_by_service: Dict[Optional[str], List[StackInfo]],
+) -> List[Shard]:
+    """
+    Build one shard per service. A shard holds the stacks of the service, the
+    exports of those stacks and the exports imported by them, restricted to the
+    importing stacks of the shard. Every edge of the stack graph that touches a
+    service therefore shows up in its shard.
+    """
+    service_of_stack = {stack.stack_name: stack.service_name for stack in stack_infos}
+    shard_exports: Dict[Optional[str], List[StackExport]] = {
+        service: [] for service in stacks_by_service
+    }
+    for export in exports:
+        exporting_service = service_of_stack.get(export.exporting_stack_name)
+        if exporting_service in shard_exports:
+            shard_exports[exporting_service].append(export)
+
+        importing_stacks_by_service: Dict[Optional[str], List[str]] = {}
+        for importing_stack in export.importing_stacks:
+            importing_service = service_of_stack.get(importing_stack)
+            if importing_service != exporting_service:
+                importing_stacks_by_service.setdefault(importing_service, []).append(
+                    importing_stack
+                )
+        for importing_service, importing_stacks in importing_stacks_by_service.items():
+            if importing_service not in shard_exports:
+                continue
+            shard_exports[importing_service].append(
+                StackExport(
+                    export_name=export.export_name,
+                    export_value=export.export_value,
+                    exporting_stack_name=export.exporting_stack_name,
+                    importing_stacks=importing_stacks,
+                    export_service=export.export_service,
+                    importing_services=[importing_service]
+                    if importing_service is not None
+                    else [],
+                )
+            )
+
+    return [
+        Shard(
+            service_name=service,
+            stack_infos=stacks,
+            exports=shard_exports[service],
+        )
+        for service, stacks in stacks_by_service.items()
+    ]
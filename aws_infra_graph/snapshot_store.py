@@ -0,0 +1,609 @@
+# Core Library
+import json
+import hashlib
+import logging
+import sqlite3
+import dataclasses
+from typing import Any, Dict, List, Tuple, Iterable, Optional
+from pathlib import Path
+from datetime import datetime, timezone
+from collections import defaultdict
+from dataclasses import dataclass
+
+# First party
+from aws_infra_graph.model import (
+    StackInfo,
+    StackExport,
+    StackResource,
+    StackParameter,
+    ExternalDependency,
+)
+from aws_infra_graph.utils import SYSTEM_CACHE_ROOT
+from aws_infra_graph.ownership import (
+    PREFIX,
+    DEFAULT_LIMIT,
+    ResourceOwner,
+    OwnershipMatch,
+    query_keys,
+    best_matches,
+    resource_keys,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DB = SYSTEM_CACHE_ROOT / Path("snapshots.sqlite")
+
+# Stacks and exports are stored as versions valid from one snapshot to
+# another of the same stack prefix. A version that did not change is not
+# copied into the next snapshot, only its valid_to is moved forward.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    stack_prefix TEXT NOT NULL,
+    taken_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_prefix ON snapshots (stack_prefix, id);
+
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS stacks (
+    id INTEGER PRIMARY KEY,
+    stack_prefix TEXT NOT NULL,
+    name_id INTEGER NOT NULL REFERENCES names (id),
+    service_id INTEGER REFERENCES names (id),
+    component_id INTEGER REFERENCES names (id),
+    content_hash TEXT NOT NULL,
+    valid_from INTEGER NOT NULL REFERENCES snapshots (id),
+    valid_to INTEGER NOT NULL REFERENCES snapshots (id)
+);
+CREATE INDEX IF NOT EXISTS stacks_current ON stacks (stack_prefix, valid_to);
+CREATE INDEX IF NOT EXISTS stacks_name ON stacks (name_id);
+CREATE INDEX IF NOT EXISTS stacks_service ON stacks (service_id);
+
+CREATE TABLE IF NOT EXISTS resources (
+    stack_id INTEGER NOT NULL REFERENCES stacks (id),
+    logical_id TEXT NOT NULL,
+    resource_type_id INTEGER NOT NULL REFERENCES names (id),
+    physical_id TEXT
+);
+CREATE INDEX IF NOT EXISTS resources_stack ON resources (stack_id);
+CREATE INDEX IF NOT EXISTS resources_physical_id ON resources (physical_id);
+
+-- the ownership index, see aws_infra_graph.ownership.resource_keys
+CREATE TABLE IF NOT EXISTS resource_keys (
+    key TEXT NOT NULL,
+    stack_id INTEGER NOT NULL REFERENCES stacks (id),
+    logical_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS resource_keys_key ON resource_keys (key);
+
+CREATE TABLE IF NOT EXISTS parameters (
+    stack_id INTEGER NOT NULL REFERENCES stacks (id),
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    description TEXT,
+    external_team TEXT,
+    external_service TEXT
+);
+CREATE INDEX IF NOT EXISTS parameters_stack ON parameters (stack_id);
+
+CREATE TABLE IF NOT EXISTS exports (
+    id INTEGER PRIMARY KEY,
+    stack_prefix TEXT NOT NULL,
+    name_id INTEGER NOT NULL REFERENCES names (id),
+    value TEXT NOT NULL,
+    exporting_stack_id INTEGER NOT NULL REFERENCES names (id),
+    export_service_id INTEGER REFERENCES names (id),
+    content_hash TEXT NOT NULL,
+    valid_from INTEGER NOT NULL REFERENCES snapshots (id),
+    valid_to INTEGER NOT NULL REFERENCES snapshots (id)
+);
+CREATE INDEX IF NOT EXISTS exports_current ON exports (stack_prefix, valid_to);
+CREATE INDEX IF NOT EXISTS exports_name ON exports (name_id);
+CREATE INDEX IF NOT EXISTS exports_service ON exports (export_service_id);
+
+CREATE TABLE IF NOT EXISTS imports (
+    export_id INTEGER NOT NULL REFERENCES exports (id),
+    importing_stack_id INTEGER NOT NULL REFERENCES names (id),
+    importing_service_id INTEGER REFERENCES names (id)
+);
+CREATE INDEX IF NOT EXISTS imports_export ON imports (export_id);
+CREATE INDEX IF NOT EXISTS imports_service ON imports (importing_service_id);
+"""
+
+
+@dataclass
+class Snapshot:
+    id: int
+    stack_prefix: str
+    taken_at: str
+
+
+@dataclass
+class DependencyPeriod:
+    stack_prefix: str
+    first_seen: str
+    last_seen: str
+
+
+class SnapshotStore:
+    """
+    History of extraction results in a local SQLite database, with the latest
+    snapshot of a stack prefix usable as a cache
+    """
+
+    def __init__(self, path: Path = DEFAULT_SNAPSHOT_DB):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._name_ids: Dict[str, int] = dict(
+            (name, name_id)
+            for name_id, name in self.connection.execute("SELECT id, name FROM names")
+        )
+        self._names: Dict[int, str] = {
+            name_id: name for name, name_id in self._name_ids.items()
+        }
+        self._index_unkeyed_resources()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def save(
+        self,
+        stack_prefix: str,
+        stack_infos: List[StackInfo],
+        exports: List[StackExport],
+        taken_at: Optional[datetime] = None,
+    ) -> int:
+        taken_at = taken_at or datetime.now(timezone.utc)
+        with self.connection:
+            previous_id = self.latest(stack_prefix)
+            snapshot_id = self.connection.execute(
+                "INSERT INTO snapshots (stack_prefix, taken_at) VALUES (?, ?)",
+                (stack_prefix, taken_at.isoformat()),
+            ).lastrowid
+            reused_stacks = self._save_stacks(
+                stack_prefix, stack_infos, snapshot_id, previous_id
+            )
+            reused_exports = self._save_exports(
+                stack_prefix,
+                exports,
+                {stack.stack_name: stack.service_name for stack in stack_infos},
+                snapshot_id,
+                previous_id,
+            )
+        logger.info(
+            f"Snapshot {snapshot_id} saved, {reused_stacks}/{len(stack_infos)} stacks "
+            f"and {reused_exports}/{len(exports)} exports unchanged"
+        )
+        return snapshot_id
+
+    def latest(self, stack_prefix: str) -> Optional[int]:
+        (snapshot_id,) = self.connection.execute(
+            "SELECT MAX(id) FROM snapshots WHERE stack_prefix = ?", (stack_prefix,)
+        ).fetchone()
+        return snapshot_id
+
+    def snapshots(self, stack_prefix: Optional[str] = None) -> List[Snapshot]:
+        query = "SELECT id, stack_prefix, taken_at FROM snapshots"
+        if stack_prefix is None:
+            rows = self.connection.execute(f"{query} ORDER BY id")
+        else:
+            rows = self.connection.execute(
+                f"{query} WHERE stack_prefix = ? ORDER BY id", (stack_prefix,)
+            )
+        return [Snapshot(*row) for row in rows]
+
+    def load(self, snapshot_id: int) -> Tuple[List[StackInfo], List[StackExport]]:
+        row = self.connection.execute(
+            "SELECT stack_prefix FROM snapshots WHERE id = ?", (snapshot_id,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown snapshot {snapshot_id}")
+        return (
+            self._load_stacks(row[0], snapshot_id),
+            self._load_exports(row[0], snapshot_id),
+        )
+
+    def service_dependency_history(
+        self, exporting_service: str, importing_service: str
+    ) -> List[DependencyPeriod]:
+        """
+        Periods in which `importing_service` imported at least one export of
+        `exporting_service`, the first one answers when it started
+        """
+        exporting_id = self._name_ids.get(exporting_service)
+        importing_id = self._name_ids.get(importing_service)
+        if exporting_id is None or importing_id is None:
+            return []
+        rows = self.connection.execute(
+            """
+            SELECT DISTINCT e.stack_prefix, e.valid_from, e.valid_to
+            FROM exports e JOIN imports i ON i.export_id = e.id
+            WHERE e.export_service_id = ? AND i.importing_service_id = ?
+            """,
+            (exporting_id, importing_id),
+        )
+        intervals_by_prefix: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for stack_prefix, valid_from, valid_to in rows:
+            intervals_by_prefix[stack_prefix].append((valid_from, valid_to))
+
+        periods = []
+        for stack_prefix, intervals in intervals_by_prefix.items():
+            snapshots = self.snapshots(stack_prefix)
+            position = {snapshot.id: index for index, snapshot in enumerate(snapshots)}
+            merged: List[List[int]] = []
+            for valid_from, valid_to in sorted(intervals):
+                start, end = position[valid_from], position[valid_to]
+                if merged and start <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            periods.extend(
+                DependencyPeriod(
+                    stack_prefix, snapshots[start].taken_at, snapshots[end].taken_at
+                )
+                for start, end in merged
+            )
+        return sorted(periods, key=lambda period: period.first_seen)
+
+    def whois(self, query: str, limit: int = DEFAULT_LIMIT) -> List[OwnershipMatch]:
+        """
+        Owners of a physical id in the latest snapshot of every stack prefix,
+        matched like OwnershipIndex.lookup but answered from the key index
+        """
+        query = query.strip()
+        if not query:
+            return []
+        keys = query_keys(query)
+        matches = best_matches(
+            query,
+            self._current_owners(f"k.key IN ({','.join('?' * len(keys))})", keys),
+        )
+        if matches:
+            return matches[:limit]
+        prefix_matches: Dict[ResourceOwner, OwnershipMatch] = {}
+        for key, owner in self._current_owners(
+            # U+10FFFF sorts after every character that can follow the prefix
+            "k.key >= ? AND k.key < ?",
+            [query, query + "\U0010ffff"],
+        ):
+            prefix_matches.setdefault(owner, OwnershipMatch(owner, PREFIX, key))
+            if len(prefix_matches) == limit:
+                break
+        return list(prefix_matches.values())
+
+    def _current_owners(
+        self, condition: str, parameters: List[str]
+    ) -> Iterable[Tuple[str, ResourceOwner]]:
+        rows = self.connection.execute(
+            f"""
+            SELECT k.key, r.physical_id, s.name_id, s.service_id, s.component_id,
+                   r.logical_id, r.resource_type_id
+            FROM resource_keys k
+            JOIN resources r ON r.stack_id = k.stack_id AND r.logical_id = k.logical_id
+            JOIN stacks s ON s.id = k.stack_id
+            WHERE {condition} AND s.valid_to = (
+                SELECT MAX(id) FROM snapshots WHERE stack_prefix = s.stack_prefix
+            )
+            ORDER BY k.key
+            """,
+            parameters,
+        )
+        for (
+            key,
+            physical_id,
+            name_id,
+            service_id,
+            component_id,
+            logical_id,
+            type_id,
+        ) in rows:
+            yield key, ResourceOwner(
+                physical_id=physical_id,
+                stack_name=self._names[name_id],
+                service_name=self._name(service_id),
+                component_name=self._name(component_id),
+                logical_id=logical_id,
+                resource_type=self._names[type_id],
+            )
+
+    def _index_unkeyed_resources(self) -> None:
+        """Stores written before the ownership index get their keys once"""
+        (unkeyed,) = self.connection.execute(
+            "SELECT EXISTS (SELECT 1 FROM resources WHERE physical_id IS NOT NULL) "
+            "AND NOT EXISTS (SELECT 1 FROM resource_keys)"
+        ).fetchone()
+        if not unkeyed:
+            return
+        rows = self.connection.execute(
+            "SELECT stack_id, logical_id, physical_id FROM resources "
+            "WHERE physical_id IS NOT NULL"
+        ).fetchall()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO resource_keys VALUES (?, ?, ?)",
+                _resource_key_rows(rows),
+            )
+
+    def _save_stacks(
+        self,
+        stack_prefix: str,
+        stack_infos: List[StackInfo],
+        snapshot_id: int,
+        previous_id: Optional[int],
+    ) -> int:
+        previous = self._current_versions("stacks", stack_prefix, previous_id)
+        extended = []
+        resources = []
+        keys = []
+        parameters = []
+        for stack in stack_infos:
+            name_id = self._name_id(stack.stack_name)
+            content_hash = _content_hash(stack)
+            version = previous.get(name_id)
+            if version is not None and version[1] == content_hash:
+                extended.append((snapshot_id, version[0]))
+                continue
+            stack_id = self.connection.execute(
+                """
+                INSERT INTO stacks (stack_prefix, name_id, service_id, component_id,
+                                    content_hash, valid_from, valid_to)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    stack_prefix,
+                    name_id,
+                    self._name_id(stack.service_name),
+                    self._name_id(stack.component_name),
+                    content_hash,
+                    snapshot_id,
+                    snapshot_id,
+                ),
+            ).lastrowid
+            resources.extend(
+                (
+                    stack_id,
+                    resource.logical_id,
+                    self._name_id(resource.resource_type),
+                    resource.physical_id,
+                )
+                for resource in stack.resources
+            )
+            keys.extend(
+                _resource_key_rows(
+                    (stack_id, resource.logical_id, resource.physical_id)
+                    for resource in stack.resources
+                    if resource.physical_id
+                )
+            )
+            parameters.extend(
+                (
+                    stack_id,
+                    parameter.name,
+                    parameter.value,
+                    parameter.description,
+                    parameter.external_dependency.team_name
+                    if parameter.external_dependency
+                    else None,
+                    parameter.external_dependency.service_name
+                    if parameter.external_dependency
+                    else None,
+                )
+                for parameter in stack.parameters
+            )
+        self.connection.executemany(
+            "UPDATE stacks SET valid_to = ? WHERE id = ?", extended
+        )
+        self.connection.executemany(
+            "INSERT INTO resources VALUES (?, ?, ?, ?)", resources
+        )
+        self.connection.executemany("INSERT INTO resource_keys VALUES (?, ?, ?)", keys)
+        self.connection.executemany(
+            "INSERT INTO parameters VALUES (?, ?, ?, ?, ?, ?)", parameters
+        )
+        return len(extended)
+
+    def _save_exports(
+        self,
+        stack_prefix: str,
+        exports: List[StackExport],
+        service_of_stack: Dict[str, Optional[str]],
+        snapshot_id: int,
+        previous_id: Optional[int],
+    ) -> int:
+        previous = self._current_versions("exports", stack_prefix, previous_id)
+        extended = []
+        imports = []
+        for export in exports:
+            name_id = self._name_id(export.export_name)
+            content_hash = _content_hash(export)
+            version = previous.get(name_id)
+            if version is not None and version[1] == content_hash:
+                extended.append((snapshot_id, version[0]))
+                continue
+            export_id = self.connection.execute(
+                """
+                INSERT INTO exports (stack_prefix, name_id, value, exporting_stack_id,
+                                     export_service_id, content_hash, valid_from, valid_to)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    stack_prefix,
+                    name_id,
+                    export.export_value,
+                    self._name_id(export.exporting_stack_name),
+                    self._name_id(export.export_service),
+                    content_hash,
+                    snapshot_id,
+                    snapshot_id,
+                ),
+            ).lastrowid
+            # importing_services is derived from the services of the importing
+            # stacks, keeping the service per import row allows to query it
+            imports.extend(
+                (
+                    export_id,
+                    self._name_id(importing_stack),
+                    self._name_id(service_of_stack.get(importing_stack)),
+                )
+                for importing_stack in export.importing_stacks
+            )
+        self.connection.executemany(
+            "UPDATE exports SET valid_to = ? WHERE id = ?", extended
+        )
+        self.connection.executemany("INSERT INTO imports VALUES (?, ?, ?)", imports)
+        return len(extended)
+
+    def _current_versions(
+        self, table: str, stack_prefix: str, snapshot_id: Optional[int]
+    ) -> Dict[int, Tuple[int, str]]:
+        if snapshot_id is None:
+            return {}
+        rows = self.connection.execute(
+            f"SELECT id, name_id, content_hash FROM {table} "
+            "WHERE stack_prefix = ? AND valid_to = ?",
+            (stack_prefix, snapshot_id),
+        )
+        return {
+            name_id: (row_id, content_hash) for row_id, name_id, content_hash in rows
+        }
+
+    def _load_stacks(self, stack_prefix: str, snapshot_id: int) -> List[StackInfo]:
+        stack_rows = self.connection.execute(
+            """
+            SELECT id, name_id, service_id, component_id FROM stacks
+            WHERE stack_prefix = ? AND valid_from <= ? AND valid_to >= ?
+            """,
+            (stack_prefix, snapshot_id, snapshot_id),
+        ).fetchall()
+        stack_ids = [row[0] for row in stack_rows]
+        resources: Dict[int, List[StackResource]] = defaultdict(list)
+        for stack_id, logical_id, resource_type_id, physical_id in self._children(
+            "SELECT stack_id, logical_id, resource_type_id, physical_id FROM resources",
+            "stack_id",
+            stack_ids,
+        ):
+            resources[stack_id].append(
+                StackResource(
+                    logical_id=logical_id,
+                    resource_type=self._names[resource_type_id],
+                    physical_id=physical_id,
+                )
+            )
+        parameters: Dict[int, List[StackParameter]] = defaultdict(list)
+        for stack_id, name, value, description, team, service in self._children(
+            "SELECT stack_id, name, value, description, external_team, "
+            "external_service FROM parameters",
+            "stack_id",
+            stack_ids,
+        ):
+            parameters[stack_id].append(
+                StackParameter(
+                    name=name,
+                    value=value,
+                    description=description,
+                    external_dependency=ExternalDependency(team, service)
+                    if service is not None
+                    else None,
+                )
+            )
+        return sorted(
+            (
+                StackInfo(
+                    stack_name=self._names[name_id],
+                    service_name=self._name(service_id),
+                    component_name=self._name(component_id),
+                    resources=resources[stack_id],
+                    parameters=parameters[stack_id],
+                )
+                for stack_id, name_id, service_id, component_id in stack_rows
+            ),
+            key=lambda stack: stack.stack_name,
+        )
+
+    def _load_exports(self, stack_prefix: str, snapshot_id: int) -> List[StackExport]:
+        export_rows = self.connection.execute(
+            """
+            SELECT id, name_id, value, exporting_stack_id, export_service_id
+            FROM exports
+            WHERE stack_prefix = ? AND valid_from <= ? AND valid_to >= ?
+            """,
+            (stack_prefix, snapshot_id, snapshot_id),
+        ).fetchall()
+        importing_stacks: Dict[int, List[str]] = defaultdict(list)
+        importing_services: Dict[int, List[str]] = defaultdict(list)
+        for export_id, stack_id, service_id in self._children(
+            "SELECT export_id, importing_stack_id, importing_service_id FROM imports",
+            "export_id",
+            [row[0] for row in export_rows],
+        ):
+            importing_stacks[export_id].append(self._names[stack_id])
+            if service_id is not None:
+                importing_services[export_id].append(self._names[service_id])
+        return sorted(
+            (
+                StackExport(
+                    export_name=self._names[name_id],
+                    export_value=value,
+                    exporting_stack_name=self._names[exporting_stack_id],
+                    importing_stacks=importing_stacks[export_id],
+                    export_service=self._name(export_service_id),
+                    importing_services=importing_services[export_id],
+                )
+                for export_id, name_id, value, exporting_stack_id, export_service_id in export_rows
+            ),
+            key=lambda export: export.export_name,
+        )
+
+    def _children(
+        self, query: str, parent_column: str, parent_ids: List[int]
+    ) -> Iterable[Tuple[Any, ...]]:
+        # stay below the SQLite limit of bound parameters per statement
+        for start in range(0, len(parent_ids), 500):
+            chunk = parent_ids[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            yield from self.connection.execute(
+                f"{query} WHERE {parent_column} IN ({placeholders}) ORDER BY rowid",
+                chunk,
+            )
+
+    def _name_id(self, name: Optional[str]) -> Optional[int]:
+        if name is None:
+            return None
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self.connection.execute(
+                "INSERT INTO names (name) VALUES (?)", (name,)
+            ).lastrowid
+            self._name_ids[name] = name_id
+            self._names[name_id] = name
+        return name_id
+
+    def _name(self, name_id: Optional[int]) -> Optional[str]:
+        return None if name_id is None else self._names[name_id]
+
+
+def _resource_key_rows(
+    resources: Iterable[Tuple[int, str, str]]
+) -> Iterable[Tuple[str, int, str]]:
+    for stack_id, logical_id, physical_id in resources:
+        for key in resource_keys(physical_id):
+            yield key, stack_id, logical_id
+
+
+def _content_hash(entry: Any) -> str:
+    content = json.dumps(dataclasses.asdict(entry), sort_keys=True)
+    return hashlib.sha1(content.encode()).hexdigest()
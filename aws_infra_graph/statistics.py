@@ -0,0 +1,87 @@
+# Core Library
+import collections
+from typing import Dict, List, Tuple, Counter, Iterable, Optional
+from dataclasses import field, dataclass
+
+# First party
+from aws_infra_graph.model import StackInfo
+from aws_infra_graph.symbols import RESOURCE_TYPE_PREFIX, SymbolTable
+
+SERVICE = "service"
+COMPONENT = "component"
+STACK = "stack"
+DIMENSIONS = (SERVICE, COMPONENT, STACK)
+UNKNOWN_GROUP = "Unknown"
+
+
+@dataclass
+class ResourceStatistics:
+    """Resource type counts in total and per service, component and stack"""
+
+    totals: Counter[str] = field(default_factory=collections.Counter)
+    by_dimension: Dict[str, Dict[str, Counter[str]]] = field(
+        default_factory=lambda: {dimension: {} for dimension in DIMENSIONS}
+    )
+
+    def group_totals(self, dimension: str) -> Counter[str]:
+        return collections.Counter(
+            {
+                group: sum(counts.values())
+                for group, counts in self.by_dimension[dimension].items()
+            }
+        )
+
+    def top_groups(self, dimension: str, limit: int) -> List[Tuple[str, int]]:
+        """The groups of a dimension with the most resources"""
+        return self.group_totals(dimension).most_common(limit)
+
+    def top_types(
+        self, limit: int, dimension: Optional[str] = None, group: Optional[str] = None
+    ) -> List[Tuple[str, int]]:
+        counts = (
+            self.totals if dimension is None else self.by_dimension[dimension][group]
+        )
+        return counts.most_common(limit)
+
+    def to_dict(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        return {
+            dimension: {
+                group: dict(counts.most_common())
+                for group, counts in sorted(
+                    groups.items(), key=lambda item: -sum(item[1].values())
+                )
+            }
+            for dimension, groups in self.by_dimension.items()
+        }
+
+
+def compute_resource_statistics(
+    stack_infos: Iterable[StackInfo], resource_types: Optional[SymbolTable] = None
+) -> ResourceStatistics:
+    """
+    Count the resource types of all stacks in a single pass. The types of a
+    stack are counted once and then added to every dimension it belongs to.
+    """
+    resource_types = resource_types or SymbolTable(RESOURCE_TYPE_PREFIX)
+    statistics = ResourceStatistics()
+    services = statistics.by_dimension[SERVICE]
+    components = statistics.by_dimension[COMPONENT]
+    stacks = statistics.by_dimension[STACK]
+    for stack_info in stack_infos:
+        type_counts = collections.Counter(
+            resource.resource_type for resource in stack_info.resources
+        )
+        stack_counts = stacks.setdefault(stack_info.stack_name, collections.Counter())
+        service_counts = services.setdefault(
+            stack_info.service_name or UNKNOWN_GROUP, collections.Counter()
+        )
+        component_counts = components.setdefault(
+            stack_info.component_name or UNKNOWN_GROUP, collections.Counter()
+        )
+        for resource_type, count in type_counts.items():
+            short_type = resource_types.short_name(resource_type)
+            stack_counts[short_type] += count
+            service_counts[short_type] += count
+            component_counts[short_type] += count
+            statistics.totals[short_type] += count
+    return statistics
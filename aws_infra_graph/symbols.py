@@ -0,0 +1,60 @@
+# Core Library
+import threading
+from typing import Dict
+from dataclasses import dataclass
+
+RESOURCE_TYPE_PREFIX = "AWS::"
+
+
+class SymbolTable:
+    """
+    Interns names so equal names share one string instance. The short name
+    (the name without a leading prefix) is computed once per interned name.
+    """
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._names: Dict[str, str] = {}
+        self._short_names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def intern(self, name: str) -> str:
+        """The one shared instance of an equal string"""
+        interned = self._names.get(name)
+        if interned is None:
+            with self._lock:
+                interned = self._names.setdefault(name, name)
+                self._short_names.setdefault(name, self._strip_prefix(name))
+        return interned
+
+    def short_name(self, name: str) -> str:
+        short_name = self._short_names.get(name)
+        return self._strip_prefix(name) if short_name is None else short_name
+
+    def _strip_prefix(self, name: str) -> str:
+        if self.prefix and name.startswith(self.prefix):
+            return name[len(self.prefix) :]
+        return name
+
+
+@dataclass
+class Symbols:
+    stacks: SymbolTable
+    services: SymbolTable
+    components: SymbolTable
+    resource_types: SymbolTable
+
+    @classmethod
+    def for_stack_prefix(cls, stack_prefix: str) -> "Symbols":
+        return cls(
+            stacks=SymbolTable(f"{stack_prefix}-" if stack_prefix else ""),
+            services=SymbolTable(),
+            components=SymbolTable(),
+            resource_types=SymbolTable(RESOURCE_TYPE_PREFIX),
+        )
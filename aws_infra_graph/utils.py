@@ -1,24 +1,19 @@
 # Core Library
-import os
+import csv
 import pickle
 import logging
-from typing import List
+import functools
+from typing import Any, List, Optional
 from pathlib import Path
 
 # Third party
 import jmespath
-import coloredlogs
 
-# TODO simplify logging
+# First party
+from aws_infra_graph.model import ExternalDependency
+from aws_infra_graph.instrumentation import instrumentation
+
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    format="[%(levelname)s] %(message)s", level=os.getenv("LOG_LEVEL", "INFO")
-)
-coloredlogs.install(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    fmt="[%(levelname)s] %(message)s",
-    logger=logger,
-)
 
 SYSTEM_CACHE_ROOT = Path.home() / Path(".cache/aws-infra-graph")
 
@@ -30,23 +25,36 @@ def file_cached(cachefile):
     """
 
     def decorator(fn):
+        @functools.wraps(fn)
         def wrapped(*args, **kwargs):
             cachefile_path = SYSTEM_CACHE_ROOT / Path(cachefile)
             if not SYSTEM_CACHE_ROOT.exists():
                 SYSTEM_CACHE_ROOT.mkdir(parents=True)
             # if cache exists -> load it and return its content
+            metric_name = f"cache.{cachefile}"
             if cachefile_path.exists():
-                with open(cachefile_path, "rb") as cachehandle:
-                    logger.info(f"using cached result from '{cachefile_path}'")
-                    return pickle.load(cachehandle)
+                instrumentation.cache_hit(metric_name)
+                with instrumentation.timed(f"{metric_name}.load"):
+                    with open(cachefile_path, "rb") as cachehandle:
+                        logger.info(f"using cached result from '{cachefile_path}'")
+                        res = pickle.load(cachehandle)
+                instrumentation.add_bytes(
+                    f"{metric_name}.read", cachefile_path.stat().st_size
+                )
+                return res
 
+            instrumentation.cache_miss(metric_name)
             # execute the function with all arguments passed
             res = fn(*args, **kwargs)
 
             # write to cache file
-            with open(cachefile_path, "wb") as cachehandle:
-                logger.info(f"saving result to cache '{cachefile_path}'")
-                pickle.dump(res, cachehandle)
+            with instrumentation.timed(f"{metric_name}.store"):
+                with open(cachefile_path, "wb") as cachehandle:
+                    logger.info(f"saving result to cache '{cachefile_path}'")
+                    pickle.dump(res, cachehandle)
+            instrumentation.add_bytes(
+                f"{metric_name}.written", cachefile_path.stat().st_size
+            )
 
             return res
 
@@ -55,5 +63,36 @@ def file_cached(cachefile):
     return decorator
 
 
+def read_cached(cachefile) -> Optional[Any]:
+    """The result stored by `file_cached` for "cachefile", None if not cached"""
+    cachefile_path = SYSTEM_CACHE_ROOT / Path(cachefile)
+    if not cachefile_path.exists():
+        return None
+    with open(cachefile_path, "rb") as cachehandle:
+        return pickle.load(cachehandle)
+
+
 def build_tag_search_patterns(tags: List[str]):
     return [jmespath.compile(f"[?Key==`{tag}`]|[0]|Value") for tag in tags]
+
+
+def parse_external_dependency(
+    description: Optional[str],
+) -> Optional[ExternalDependency]:
+    """
+    Parameter descriptions can name the external service behind a parameter,
+    e.g. "Host of the DWH | team=data,service=dwh"
+    """
+    # TODO exceptions
+    if not description or "|" not in description:
+        return None
+    metadata_part = description.split("|")[1].strip()
+    metadata = list([row for row in csv.reader([metadata_part], delimiter=",")])[0]
+    metadata_transformed = {
+        metadata_entry.split("=")[0]: metadata_entry.split("=")[1]
+        for metadata_entry in metadata
+    }
+    return ExternalDependency(
+        team_name=metadata_transformed["team"],
+        service_name=metadata_transformed["service"],
+    )
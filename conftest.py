@@ -1,4 +1,5 @@
 # Third party
+from _pytest.config import Config
 from _pytest.config.argparsing import Parser
 
 
@@ -9,10 +10,22 @@ def pytest_addoption(parser: Parser) -> None:
         default=False,
         help="Only run linting checks",
     )
+    parser.addoption(
+        "--benchmarks",
+        action="store_true",
+        default=False,
+        help="Only run the benchmarks, they are skipped otherwise",
+    )
+
+
+def pytest_configure(config: Config) -> None:
+    config.addinivalue_line(
+        "markers", "benchmark: compares a stage with the stored benchmark baseline"
+    )
 
 
 def pytest_collection_modifyitems(session, config, items) -> None:
-    """Enhance pytest to allow for a linting only option"""
+    """Enhance pytest to allow for a linting only and a benchmarks option"""
     if config.getoption("--lint-only"):
         lint_items = []
         for linter in ["flake8", "black", "mypy", "mccabe"]:
@@ -21,3 +34,11 @@ def pytest_collection_modifyitems(session, config, items) -> None:
                     [item for item in items if item.get_closest_marker(linter)]
                 )
         items[:] = lint_items
+    else:
+        benchmarks = config.getoption("--benchmarks")
+        selected, deselected = [], []
+        for item in items:
+            is_benchmark = bool(item.get_closest_marker("benchmark"))
+            (selected if is_benchmark == benchmarks else deselected).append(item)
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
@@ -23,3 +23,12 @@ def unit_tests(session: Session) -> None:
 @nox.session(python=False, name="static-code-analysis")
 def static_code_analysis(session: Session) -> None:
     session.run("pytest", "--lint-only", "--black", "--flake8", "--mypy", "--mccabe")
+
+
+@nox.session(python=False, name="benchmarks")
+def benchmarks(session: Session) -> None:
+    session.env["INFRA_GRAPH_BENCHMARK_SCALES"] = "100,1000,5000"
+    session.env["INFRA_GRAPH_BENCHMARK_REPORT"] = "tests/reports/benchmarks.json"
+    session.run(
+        "pytest", "--mocha", "--benchmarks", "tests/test_benchmark.py", *session.posargs
+    )
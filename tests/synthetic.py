@@ -0,0 +1,341 @@
+# Core Library
+import time
+import zlib
+import random
+from typing import Any, Dict, List, Tuple, Iterator, Optional
+from dataclasses import field, dataclass
+
+# Third party
+from botocore.exceptions import ClientError
+
+# First party
+from aws_infra_graph.model import (
+    StackInfo,
+    StackExport,
+    StackResource,
+    StackParameter,
+    ExternalDependency,
+)
+
+# rough distribution of resource types in a CDK heavy account
+RESOURCE_TYPE_WEIGHTS: List[Tuple[str, int]] = [
+    ("AWS::IAM::Role", 20),
+    ("AWS::IAM::Policy", 12),
+    ("AWS::Logs::LogGroup", 10),
+    ("AWS::Lambda::Function", 9),
+    ("AWS::Lambda::Permission", 6),
+    ("AWS::EC2::SecurityGroup", 6),
+    ("AWS::CloudWatch::Alarm", 6),
+    ("AWS::ECS::TaskDefinition", 4),
+    ("AWS::ECS::Service", 4),
+    ("AWS::SQS::Queue", 4),
+    ("AWS::SNS::Topic", 3),
+    ("AWS::S3::Bucket", 3),
+    ("AWS::DynamoDB::Table", 2),
+    ("AWS::Events::Rule", 2),
+    ("AWS::ElasticLoadBalancingV2::TargetGroup", 2),
+    ("AWS::StepFunctions::StateMachine", 1),
+]
+COMPONENTS = ["service", "task", "storage", "monitoring", "pipeline"]
+EXTERNAL_SERVICES = [("Data", "Snowflake"), ("Platform", "Kafka"), ("Search", "Solr")]
+EXPORTS_PAGE_SIZE = 100
+IMPORTS_PAGE_SIZE = 50
+ACCOUNT_ID = "123456789012"
+REGION = "eu-west-1"
+
+
+@dataclass
+class SyntheticStack:
+    name: str
+    service_name: Optional[str]
+    component_name: str
+    resources: List[Tuple[str, str, str]]  # logical id, type, physical id
+    parameters: List[Tuple[str, str, Optional[str]]]  # name, value, description
+    exports: List[Tuple[str, str]] = field(default_factory=list)  # name, value
+
+
+@dataclass
+class SyntheticAccount:
+    stack_prefix: str
+    stacks: List[SyntheticStack]
+    imports: Dict[str, List[str]]  # export name -> importing stack names
+
+    @property
+    def export_count(self) -> int:
+        return sum(len(stack.exports) for stack in self.stacks)
+
+    def stack_infos(self) -> List[StackInfo]:
+        return [
+            StackInfo(
+                stack_name=stack.name,
+                service_name=stack.service_name,
+                component_name=stack.component_name,
+                resources=[
+                    StackResource(
+                        logical_id=logical_id,
+                        resource_type=resource_type,
+                        physical_id=physical_id,
+                    )
+                    for logical_id, resource_type, physical_id in stack.resources
+                ],
+                parameters=[
+                    StackParameter(
+                        name=name,
+                        value=value,
+                        description=description,
+                        external_dependency=_external_dependency(description),
+                    )
+                    for name, value, description in stack.parameters
+                ],
+            )
+            for stack in self.stacks
+        ]
+
+    def stack_exports(self) -> List[StackExport]:
+        service_names = {stack.name: stack.service_name for stack in self.stacks}
+        return [
+            StackExport(
+                export_name=export_name,
+                export_value=export_value,
+                exporting_stack_name=stack.name,
+                importing_stacks=self.imports.get(export_name, []),
+                export_service=stack.service_name,
+                importing_services=[
+                    service_name
+                    for importing_stack in self.imports.get(export_name, [])
+                    if (service_name := service_names[importing_stack]) is not None
+                ],
+            )
+            for stack in self.stacks
+            for export_name, export_value in stack.exports
+        ]
+
+
+def _external_dependency(description: Optional[str]) -> Optional[ExternalDependency]:
+    if not description or "|" not in description:
+        return None
+    metadata = dict(
+        entry.split("=") for entry in description.split("|")[1].strip().split(",")
+    )
+    return ExternalDependency(
+        team_name=metadata["team"], service_name=metadata["service"]
+    )
+
+
+def generate_account(
+    stack_count: int,
+    seed: int = 42,
+    stack_prefix: str = "testTeam-dev",
+    other_stack_count: int = 0,
+    untagged_ratio: float = 0.1,
+    external_parameter_ratio: float = 0.1,
+) -> SyntheticAccount:
+    """
+    Generate a reproducible account with `stack_count` stacks of the project and
+    `other_stack_count` stacks of other projects. Exports only get imported by
+    stacks created later, so the dependencies form a DAG like in CloudFormation.
+    Import fan-out is skewed: most exports have one or two importers while a few
+    shared exports (VPC, cluster, ...) are imported by many stacks.
+    """
+    rng = random.Random(seed)
+    resource_types = [resource_type for resource_type, _ in RESOURCE_TYPE_WEIGHTS]
+    resource_weights = [weight for _, weight in RESOURCE_TYPE_WEIGHTS]
+    service_count = max(1, stack_count // 5)
+    stacks: List[SyntheticStack] = []
+    imports: Dict[str, List[str]] = {}
+
+    def make_stack(prefix: str, index: int) -> SyntheticStack:
+        service_name = (
+            None
+            if rng.random() < untagged_ratio
+            else f"service{rng.randrange(service_count)}"
+        )
+        component_name = rng.choice(COMPONENTS)
+        name = f"{prefix}-{service_name or 'misc'}-{component_name}-{index}"
+        resources = []
+        for resource_index, resource_type in enumerate(
+            rng.choices(resource_types, resource_weights, k=rng.randint(3, 40))
+        ):
+            logical_id = f"{resource_type.split('::')[-1]}{resource_index}"
+            physical_id = _physical_id(name, logical_id, resource_type)
+            resources.append((logical_id, resource_type, physical_id))
+        parameters: List[Tuple[str, str, Optional[str]]] = [
+            ("Environment", "dev", "The environment to deploy to")
+        ]
+        if rng.random() < external_parameter_ratio:
+            team, external_service = rng.choice(EXTERNAL_SERVICES)
+            parameters.append(
+                (
+                    f"{external_service}Host",
+                    f"{external_service.lower()}.example.com",
+                    f"Host of {external_service} | team={team},service={external_service}",
+                )
+            )
+        exports = [
+            (f"{name}-output-{export_index}", rng.choice(resources)[2])
+            for export_index in range(rng.choice([0, 0, 1, 1, 2, 3]))
+        ]
+        return SyntheticStack(
+            name=name,
+            service_name=service_name,
+            component_name=component_name,
+            resources=resources,
+            parameters=parameters,
+            exports=exports,
+        )
+
+    for index in range(stack_count):
+        stacks.append(make_stack(stack_prefix, index))
+    for index in range(other_stack_count):
+        stacks.append(make_stack("otherTeam-dev", index))
+
+    project_stacks = [stack for stack in stacks if stack.name.startswith(stack_prefix)]
+    for position, stack in enumerate(project_stacks):
+        candidates = project_stacks[position + 1 :]
+        for export_name, _ in stack.exports:
+            if not candidates or rng.random() < 0.15:
+                continue  # exported but never imported
+            fan_out = min(len(candidates), int(rng.paretovariate(1.5)))
+            imports[export_name] = [
+                importer.name for importer in rng.sample(candidates, fan_out)
+            ]
+
+    return SyntheticAccount(stack_prefix=stack_prefix, stacks=stacks, imports=imports)
+
+
+def _physical_id(stack_name: str, logical_id: str, resource_type: str) -> str:
+    if resource_type == "AWS::IAM::Role":
+        return f"arn:aws:iam::{ACCOUNT_ID}:role/{stack_name}-{logical_id}"
+    if resource_type == "AWS::SQS::Queue":
+        return (
+            f"https://sqs.{REGION}.amazonaws.com/{ACCOUNT_ID}/{stack_name}-{logical_id}"
+        )
+    if resource_type == "AWS::SNS::Topic":
+        return f"arn:aws:sns:{REGION}:{ACCOUNT_ID}:{stack_name}-{logical_id}"
+    if resource_type == "AWS::EC2::SecurityGroup":
+        return f"sg-{zlib.crc32(f'{stack_name}/{logical_id}'.encode()):08x}"
+    return f"{stack_name}-{logical_id}"
+
+
+class FakeCloudFormationClient:
+    """
+    Serves a SyntheticAccount through the subset of the CloudFormation API used
+    by the DataExtractor. Every call sleeps for `latency` seconds to simulate the
+    network round trip.
+    """
+
+    def __init__(self, account: SyntheticAccount, latency: float = 0.0) -> None:
+        self.account = account
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._stacks_by_name = {stack.name: stack for stack in account.stacks}
+        self._exports = [
+            {
+                "ExportingStackId": f"arn:aws:cloudformation:{REGION}:{ACCOUNT_ID}:stack/{stack.name}/{index:08d}",
+                "Name": export_name,
+                "Value": export_value,
+            }
+            for index, stack in enumerate(account.stacks)
+            for export_name, export_value in stack.exports
+        ]
+
+    def _call(self, operation: str) -> None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_paginator(self, operation_name: str) -> "FakeListStacksPaginator":
+        assert operation_name == "list_stacks"
+        return FakeListStacksPaginator(self)
+
+    def describe_stacks(self, StackName: str) -> Dict[str, Any]:
+        self._call("describe_stacks")
+        stack = self._stacks_by_name[StackName]
+        tags = [{"Key": "Component", "Value": stack.component_name}]
+        if stack.service_name:
+            tags.append({"Key": "Service", "Value": stack.service_name})
+        return {
+            "Stacks": [
+                {
+                    "StackName": StackName,
+                    "Tags": tags,
+                    "Parameters": [
+                        {"ParameterKey": name, "ParameterValue": value}
+                        for name, value, _ in stack.parameters
+                    ],
+                }
+            ]
+        }
+
+    def get_template_summary(self, StackName: str) -> Dict[str, Any]:
+        self._call("get_template_summary")
+        stack = self._stacks_by_name[StackName]
+        return {
+            "Parameters": [
+                {"ParameterKey": name, "Description": description}
+                for name, _, description in stack.parameters
+            ]
+        }
+
+    def describe_stack_resources(self, StackName: str) -> Dict[str, Any]:
+        self._call("describe_stack_resources")
+        stack = self._stacks_by_name[StackName]
+        return {
+            "StackResources": [
+                {
+                    "LogicalResourceId": logical_id,
+                    "PhysicalResourceId": physical_id,
+                    "ResourceType": resource_type,
+                }
+                for logical_id, resource_type, physical_id in stack.resources
+            ]
+        }
+
+    def list_exports(self, NextToken: Optional[str] = None) -> Dict[str, Any]:
+        self._call("list_exports")
+        start = int(NextToken) if NextToken else 0
+        end = start + EXPORTS_PAGE_SIZE
+        result: Dict[str, Any] = {"Exports": self._exports[start:end]}
+        if end < len(self._exports):
+            result["NextToken"] = str(end)
+        return result
+
+    def list_imports(
+        self, ExportName: str, NextToken: Optional[str] = None
+    ) -> Dict[str, Any]:
+        self._call("list_imports")
+        importing_stacks = self.account.imports.get(ExportName)
+        if not importing_stacks:
+            raise ClientError(
+                {
+                    "Error": {
+                        "Code": "ValidationError",
+                        "Message": f"Export '{ExportName}' is not imported by any stack.",
+                    }
+                },
+                "ListImports",
+            )
+        start = int(NextToken) if NextToken else 0
+        end = start + IMPORTS_PAGE_SIZE
+        result: Dict[str, Any] = {"Imports": importing_stacks[start:end]}
+        if end < len(importing_stacks):
+            result["NextToken"] = str(end)
+        return result
+
+
+class FakeListStacksPaginator:
+    page_size = 100
+
+    def __init__(self, client: FakeCloudFormationClient) -> None:
+        self.client = client
+
+    def paginate(self, **kwargs) -> Iterator[Dict[str, Any]]:
+        stacks = self.client.account.stacks
+        for start in range(0, len(stacks), self.page_size):
+            self.client._call("list_stacks")
+            yield {
+                "StackSummaries": [
+                    {"StackName": stack.name, "StackStatus": "UPDATE_COMPLETE"}
+                    for stack in stacks[start : start + self.page_size]
+                ]
+            }
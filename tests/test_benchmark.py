@@ -0,0 +1,249 @@
+# Core Library
+import os
+import json
+import time
+import shutil
+import tracemalloc
+from typing import Any, Dict, List, Callable
+from pathlib import Path
+
+# Third party
+import pytest
+from pyexpect import expect
+
+# First party
+from aws_infra_graph import utils
+from aws_infra_graph.model import DataExport
+from aws_infra_graph.data_extractor import DataExtractor
+from aws_infra_graph.graph_exporter import InfraGraphExporter
+
+# Local
+from .synthetic import FakeCloudFormationClient, generate_account
+from .test_graph import FakeDataExtractor
+
+pytestmark = pytest.mark.benchmark
+
+# `nox -s benchmarks` runs bigger scales, these keep a local run fast.
+BENCHMARK_SCALES = [
+    int(scale)
+    for scale in os.getenv("INFRA_GRAPH_BENCHMARK_SCALES", "50,200").split(",")
+]
+# simulated CloudFormation round trip in seconds
+BENCHMARK_LATENCY = float(os.getenv("INFRA_GRAPH_BENCHMARK_LATENCY", "0"))
+BENCHMARK_REPORT = os.getenv("INFRA_GRAPH_BENCHMARK_REPORT")
+
+# Measurements of earlier runs per stage and scale: {"seconds", "peak_bytes"}.
+# A stage fails when it takes more than BENCHMARK_TOLERANCE times its baseline,
+# scales without a baseline are only recorded. Run with
+# INFRA_GRAPH_BENCHMARK_UPDATE_BASELINE=1 to store the results as new baseline.
+BENCHMARK_BASELINE = Path(__file__).parent / "benchmark_baseline.json"
+BENCHMARK_TOLERANCE = float(os.getenv("INFRA_GRAPH_BENCHMARK_TOLERANCE", "2"))
+UPDATE_BASELINE = os.getenv("INFRA_GRAPH_BENCHMARK_UPDATE_BASELINE") == "1"
+# timer and scheduler noise on stages that only take a few milliseconds
+SECONDS_SLACK = 0.05
+
+results: List[Dict[str, Any]] = []
+
+
+def load_baseline() -> Dict[str, Dict[str, Dict[str, float]]]:
+    if not BENCHMARK_BASELINE.exists():
+        return {}
+    with open(BENCHMARK_BASELINE) as baseline_file:
+        return json.load(baseline_file)
+
+
+baseline = load_baseline()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_report():
+    yield
+    if BENCHMARK_REPORT:
+        Path(BENCHMARK_REPORT).parent.mkdir(parents=True, exist_ok=True)
+        with open(BENCHMARK_REPORT, "w") as report_file:
+            json.dump(results, report_file, indent=2)
+    if UPDATE_BASELINE:
+        for result in results:
+            baseline.setdefault(result["stage"], {})[str(result["stacks"])] = {
+                "seconds": round(result["seconds"], 6),
+                "peak_bytes": result["peak_bytes"],
+            }
+        with open(BENCHMARK_BASELINE, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+
+
+def measure(stage: str, scale: int, fn: Callable[[], Any]) -> Any:
+    """
+    Run `fn` once for wall time and once under tracemalloc for the peak memory,
+    record the result and compare it with the baseline of the stage.
+    """
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    results.append(
+        {
+            "stage": stage,
+            "stacks": scale,
+            "seconds": seconds,
+            "stacks_per_second": scale / seconds if seconds else None,
+            "peak_bytes": peak_bytes,
+        }
+    )
+    expected = baseline.get(stage, {}).get(str(scale))
+    if expected and not UPDATE_BASELINE:
+        # the baseline is measured without latency
+        if not BENCHMARK_LATENCY:
+            expect(seconds).is_less_than(
+                expected["seconds"] * BENCHMARK_TOLERANCE + SECONDS_SLACK
+            )
+        expect(peak_bytes).is_less_than(expected["peak_bytes"] * BENCHMARK_TOLERANCE)
+    return result
+
+
+def create_exporter(account, output_folder: str) -> InfraGraphExporter:
+    return InfraGraphExporter(
+        env="dev",
+        project_name="testTeam",
+        config_path="tests/test_config.hocon",
+        output_folder=output_folder,
+        data_extractor=FakeDataExtractor(
+            account.stack_infos(), account.stack_exports()
+        ),
+    )
+
+
+@pytest.mark.parametrize("scale", BENCHMARK_SCALES)
+class TestBenchmark:
+    def test_extraction(self, scale):
+        """Benchmark :: extraction through a simulated CloudFormation API"""
+        # GIVEN
+        account = generate_account(scale, other_stack_count=scale // 2)
+
+        def extract():
+            extractor = DataExtractor(
+                account.stack_prefix,
+                service_tags=["Service"],
+                component_tags=["Component"],
+                cfn_client=FakeCloudFormationClient(account, BENCHMARK_LATENCY),
+                throttle_delay=0,
+            )
+            # bypass the disc cache, that one is measured on its own
+            stacks = DataExtractor.gather_stacks.__wrapped__(extractor)
+            exports = DataExtractor.gather_and_filter_exports.__wrapped__(
+                extractor, stacks
+            )
+            return stacks, exports
+
+        # WHEN
+        stacks, exports = measure("extraction", scale, extract)
+
+        # THEN
+        expect(len(stacks)).to_equal(scale)
+        expect(len(exports)).to_equal(
+            len(
+                [
+                    export
+                    for export in account.stack_exports()
+                    if export.importing_stacks
+                    and export.exporting_stack_name.startswith(account.stack_prefix)
+                ]
+            )
+        )
+
+    def test_cache(self, scale, tmp_path, monkeypatch):
+        """Benchmark :: storing and loading the disc cache"""
+        # GIVEN
+        monkeypatch.setattr(utils, "SYSTEM_CACHE_ROOT", tmp_path)
+        stack_infos = generate_account(scale).stack_infos()
+
+        @utils.file_cached("benchmark.cache")
+        def gather():
+            return stack_infos
+
+        def store_and_load():
+            (tmp_path / "benchmark.cache").unlink(missing_ok=True)
+            gather()
+            return gather()
+
+        # WHEN
+        loaded = measure("cache", scale, store_and_load)
+
+        # THEN
+        expect(len(loaded)).to_equal(scale)
+
+    def test_graph_build(self, scale, tmp_path):
+        """Benchmark :: building the nodes and edges of both graphs"""
+        # GIVEN
+        account = generate_account(scale)
+        exporter = create_exporter(account, str(tmp_path))
+        stack_infos = account.stack_infos()
+        exports = [
+            export for export in account.stack_exports() if export.importing_stacks
+        ]
+
+        def build():
+            return (
+                exporter._retrieve_nodes_and_edges_for_stacks_graph(
+                    exports, stack_infos
+                ),
+                exporter._retrieve_nodes_and_edges_for_service_graph(
+                    exports, stack_infos, None, None
+                ),
+            )
+
+        # WHEN
+        stacks_graph, services_graph = measure("graph_build", scale, build)
+
+        # THEN
+        expect(len(stacks_graph.edges)).is_greater_than(0)
+        expect(len(services_graph.internal_nodes)).is_greater_than(0)
+
+    @pytest.mark.skipif(shutil.which("dot") is None, reason="needs graphviz dot")
+    def test_render(self, scale, tmp_path):
+        """Benchmark :: rendering the stack graph with graphviz"""
+        # GIVEN
+        account = generate_account(scale)
+        exporter = create_exporter(account, str(tmp_path))
+        stack_infos = account.stack_infos()
+        exports = [
+            export for export in account.stack_exports() if export.importing_stacks
+        ]
+
+        # WHEN
+        measure(
+            "render",
+            scale,
+            lambda: exporter._visualize_stacks(exports, stack_infos, False),
+        )
+
+        # THEN
+        expect((tmp_path / "export-stacks.gv.png").exists()).is_true()
+
+    def test_json_export(self, scale, tmp_path):
+        """Benchmark :: serializing the data export"""
+        # GIVEN
+        account = generate_account(scale)
+        exporter = create_exporter(account, str(tmp_path))
+        stack_infos = account.stack_infos()
+        exports = account.stack_exports()
+        statistics = exporter._get_statictics(stack_infos)
+
+        # WHEN
+        measure(
+            "json_export",
+            scale,
+            lambda: exporter._create_data_export(stack_infos, statistics, exports),
+        )
+
+        # THEN
+        export = DataExport.parse_file(tmp_path / "export.json")
+        expect(len(export.stacks)).to_equal(scale)
@@ -0,0 +1,229 @@
+# Core Library
+import json
+import shutil
+
+# Third party
+from pyexpect import expect
+from click.testing import CliRunner
+
+# First party
+from aws_infra_graph import cdk_extractor
+from aws_infra_graph.cli import main
+from aws_infra_graph.model import ExternalDependency
+from aws_infra_graph.cdk_extractor import CdkDataExtractor, render
+
+
+def bucket_template(service: str, import_from: str = None):
+    resources = {
+        "BucketA": {
+            "Type": "AWS::S3::Bucket",
+            "Properties": {
+                "BucketName": f"testproject1-dev-{service}-buckets-bucketa",
+                "Tags": [{"Key": "Service", "Value": service}],
+            },
+        }
+    }
+    if import_from:
+        resources["SSMParam"] = {
+            "Type": "AWS::SSM::Parameter",
+            "Properties": {
+                "Type": "String",
+                "Value": {
+                    "Fn::Sub": [
+                        "import: ${value_to_import}, param: ${ParamDWH}",
+                        {"value_to_import": {"Fn::ImportValue": import_from}},
+                    ]
+                },
+            },
+        }
+    return {
+        "Parameters": {
+            "ParamDWH": {
+                "Type": "String",
+                "Default": "fakedwh.host",
+                "Description": "The domain of the DWH to connect to. | team=data,service=dwh",
+            }
+        },
+        "Resources": resources,
+        "Outputs": {
+            "OutputBucketA": {
+                "Value": {"Ref": "BucketA"},
+                "Export": {
+                    "Name": {
+                        "Fn::Join": ["-", ["testproject1-dev", service, "bucketa"]]
+                    }
+                },
+            }
+        },
+    }
+
+
+def write_assembly(folder, templates, nested=None):
+    """Write a cdk.out with one stack artifact per template"""
+    folder.mkdir(parents=True, exist_ok=True)
+    artifacts = {}
+    for stack_name, (template, tags) in templates.items():
+        (folder / f"{stack_name}.template.json").write_text(json.dumps(template))
+        artifacts[stack_name] = {
+            "type": "aws:cloudformation:stack",
+            "properties": {"templateFile": f"{stack_name}.template.json"},
+            "metadata": {
+                f"/{stack_name}": [
+                    {
+                        "type": "aws:cdk:stack-tags",
+                        "data": [
+                            {"Key": key, "Value": value} for key, value in tags.items()
+                        ],
+                    }
+                ]
+            },
+        }
+    if nested:
+        artifacts["assembly-Stage"] = {
+            "type": "cdk:cloud-assembly",
+            "properties": {"directoryName": nested},
+        }
+    (folder / "manifest.json").write_text(
+        json.dumps({"version": "5.0.0", "artifacts": artifacts})
+    )
+
+
+class TestCdkExtractor:
+    def test_extract_cloud_assembly(self, tmp_path):
+        """CdkExtractor :: stacks, exports and imports are read from cdk.out"""
+        # GIVEN the sample app with the importing stack in a nested assembly
+        write_assembly(
+            tmp_path / "cdk.out",
+            {
+                "testproject1-dev-etl-buckets": (
+                    bucket_template("etl"),
+                    {"Service": "etl", "Component": "buckets"},
+                ),
+            },
+            nested="assembly-Stage",
+        )
+        write_assembly(
+            tmp_path / "cdk.out" / "assembly-Stage",
+            {
+                "testproject1-dev-api-buckets": (
+                    bucket_template("api", import_from="testproject1-dev-etl-bucketa"),
+                    {},
+                ),
+            },
+        )
+        extractor = CdkDataExtractor(
+            str(tmp_path / "cdk.out"),
+            service_tags=["Service"],
+            component_tags=["Component"],
+        )
+
+        # WHEN
+        stacks = extractor.gather_stacks()
+        exports = extractor.gather_and_filter_exports(stacks)
+
+        # THEN
+        expect([stack.stack_name for stack in stacks]).to_equal(
+            ["testproject1-dev-etl-buckets", "testproject1-dev-api-buckets"]
+        )
+        etl, api = stacks
+        expect(etl.component_name).to_equal("buckets")
+        # without stack tags the tags of the resources are used
+        expect(api.service_name).to_equal("api")
+        expect(api.component_name).to_equal(None)
+        expect(etl.resources[0].physical_id).to_equal(
+            "testproject1-dev-etl-buckets-bucketa"
+        )
+        expect(etl.parameters[0].value).to_equal("fakedwh.host")
+        expect(etl.parameters[0].external_dependency).to_equal(
+            ExternalDependency(team_name="data", service_name="dwh")
+        )
+        # the api export is not imported and dropped like in CloudFormation
+        expect(len(exports)).to_equal(1)
+        expect(exports[0].export_name).to_equal("testproject1-dev-etl-bucketa")
+        expect(exports[0].export_value).to_equal("testproject1-dev-etl-buckets-bucketa")
+        expect(exports[0].importing_stacks).to_equal(["testproject1-dev-api-buckets"])
+        expect(exports[0].export_service).to_equal("etl")
+        expect(exports[0].importing_services).to_equal(["api"])
+
+    def test_cli_filters_project(self, tmp_path, monkeypatch):
+        """CdkExtractor :: the export command only reads the stacks of its project"""
+        # GIVEN a cloud assembly with the stacks of two projects
+        write_assembly(
+            tmp_path / "cdk.out",
+            {
+                "testTeam-dev-etl-buckets": (bucket_template("etl"), {}),
+                "otherTeam-dev-etl-buckets": (bucket_template("etl"), {}),
+            },
+        )
+        shutil.copy("tests/test_config.hocon", tmp_path / "config.hocon")
+        (tmp_path / "output").mkdir()
+        monkeypatch.chdir(tmp_path)
+
+        # WHEN
+        result = CliRunner(mix_stderr=False).invoke(
+            main,
+            [
+                "export",
+                "--from-cdk-out",
+                "cdk.out",
+                "-o",
+                "output",
+                "--renderer",
+                "html",
+            ],
+        )
+
+        # THEN
+        expect(result.exit_code).to_equal(0)
+        exported = json.loads((tmp_path / "output" / "export.json").read_text())
+        expect([stack["stack_name"] for stack in exported["stacks"]]).to_equal(
+            ["testTeam-dev-etl-buckets"]
+        )
+
+    def test_parallel_parsing(self, tmp_path, monkeypatch):
+        """CdkExtractor :: templates parsed in worker processes give the same models"""
+        # GIVEN
+        write_assembly(
+            tmp_path,
+            {
+                f"testproject1-dev-service{index}": (
+                    bucket_template(
+                        f"service{index}",
+                        import_from=f"testproject1-dev-service{index - 1}-bucketa",
+                    ),
+                    {"Service": f"service{index}"},
+                )
+                for index in range(10)
+            },
+        )
+
+        def extract(threshold):
+            monkeypatch.setattr(cdk_extractor, "PARALLEL_TEMPLATE_THRESHOLD", threshold)
+            extractor = CdkDataExtractor(
+                str(tmp_path), ["Service"], ["Component"], max_workers=2
+            )
+            stacks = extractor.gather_stacks()
+            return stacks, extractor.gather_and_filter_exports(stacks)
+
+        # WHEN
+        parallel = extract(threshold=0)
+        sequential = extract(threshold=100)
+
+        # THEN
+        expect(parallel).to_equal(sequential)
+        expect(len(parallel[1])).to_equal(9)
+
+    def test_render(self):
+        """CdkExtractor :: intrinsic functions are resolved as far as possible"""
+        names = {"Env": "dev", "Bucket": "my-bucket"}
+        expect(render({"Ref": "Bucket"}, names)).to_equal("my-bucket")
+        expect(render({"Ref": "AWS::Region"}, names)).to_equal("${AWS::Region}")
+        expect(render({"Fn::GetAtt": ["Bucket", "Arn"]}, names)).to_equal(
+            "${Bucket.Arn}"
+        )
+        expect(render({"Fn::Sub": "app-${Env}-${Missing}"}, names)).to_equal(
+            "app-dev-${Missing}"
+        )
+        expect(render({"Fn::Join": [":", ["a", {"Ref": "Env"}, 3]]}, names)).to_equal(
+            "a:dev:3"
+        )
@@ -0,0 +1,124 @@
+# Core Library
+import json
+import time
+import random
+
+# Third party
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.model import StackInfo, StackExport
+from aws_infra_graph.centrality import compute_centrality
+from aws_infra_graph.graph_exporter import InfraGraphExporter
+
+# Local
+from .test_graph import FakeDataExtractor
+
+
+class TestCentrality:
+    def test_scores(self):
+        """Centrality :: providers rank higher and chains pass through the middle"""
+        # GIVEN a -> b -> c -> d, c <-> e
+        edges = {("a", "b"), ("b", "c"), ("c", "d"), ("c", "e"), ("e", "c")}
+
+        # WHEN
+        scores = compute_centrality({"a", "b", "c", "d", "e", "lonely"}, edges)
+
+        # THEN
+        expect({node: score.fan_out for node, score in scores.items()}).to_equal(
+            {"a": 4, "b": 3, "c": 2, "d": 0, "e": 2, "lonely": 0}
+        )
+        expect(scores["a"].pagerank).is_greater_than(scores["b"].pagerank)
+        expect(scores["b"].pagerank).is_greater_than(scores["d"].pagerank)
+        expect(scores["a"].betweenness).to_equal(0)
+        expect(scores["c"].betweenness).is_greater_than(scores["b"].betweenness)
+        expect(sum(score.pagerank for score in scores.values())).is_greater_than(0.999)
+
+    def test_sampled_betweenness(self):
+        """Centrality :: sampled betweenness keeps the order of the exact one"""
+        # GIVEN a hub every chain passes through
+        edges = {(f"in{index}", "hub") for index in range(40)} | {
+            ("hub", f"out{index}") for index in range(40)
+        }
+        edges |= {(f"in{index}", f"out{index}") for index in range(40)}
+
+        # WHEN
+        exact = compute_centrality(set(), edges, betweenness_samples=1000)
+        sampled = compute_centrality(set(), edges, betweenness_samples=20)
+
+        # THEN
+        for scores in (exact, sampled):
+            expect(max(scores, key=lambda node: scores[node].betweenness)).to_equal(
+                "hub"
+            )
+        expect(sampled["hub"].fan_out).to_equal(exact["hub"].fan_out)
+
+    def test_large_graph(self):
+        """Centrality :: 10k nodes are scored in well under a few seconds"""
+        # GIVEN
+        rng = random.Random(1)
+        edges = {
+            (node, rng.randrange(node + 1, 10001))
+            for node in range(10000)
+            for _ in range(rng.randint(0, 3))
+        }
+
+        # WHEN
+        start = time.perf_counter()
+        scores = compute_centrality(range(10001), edges)
+
+        # THEN
+        expect(time.perf_counter() - start).is_less_than(3)
+        expect(len(scores)).to_equal(10001)
+
+    def test_importance_and_export(self, tmp_path):
+        """Centrality :: transitive dependents make stacks important"""
+        # GIVEN a chain of six stacks, no export has more than one importer
+        stack_names = [f"teamName-dev-stack{index}" for index in range(6)]
+        stack_infos = [
+            StackInfo(
+                stack_name=name,
+                service_name="service",
+                component_name=None,
+                resources=[],
+            )
+            for name in stack_names
+        ]
+        stack_exports = [
+            StackExport(
+                export_name=f"output{index}",
+                export_value="fake",
+                exporting_stack_name=exporting,
+                importing_stacks=[importing],
+                export_service="service",
+                importing_services=["service"],
+            )
+            for index, (exporting, importing) in enumerate(
+                zip(stack_names, stack_names[1:])
+            )
+        ]
+        graph_exporter = InfraGraphExporter(
+            env="dev",
+            project_name="teamName",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=FakeDataExtractor(stack_infos, stack_exports),
+        )
+
+        # WHEN
+        stack_graph = graph_exporter._retrieve_nodes_and_edges_for_stacks_graph(
+            stack_exports, stack_infos
+        )
+        graph_exporter.export(refresh=False, cluster_stack_graph=False, renderer="html")
+
+        # THEN
+        expect(stack_graph.important_nodes).to_equal({"stack0"})
+        expect(stack_graph.critical_nodes).to_equal({"stack0"})
+        exported = json.loads((tmp_path / "export.json").read_text())
+        expect(exported["stack_centrality"]["teamName-dev-stack1"]["fan_out"]).to_equal(
+            4
+        )
+        stacks_document = json.loads((tmp_path / "export-stacks.json").read_text())
+        expect(
+            {node["id"]: node["color"] for node in stacks_document["nodes"]}["stack0"]
+        ).to_equal("orangered")
@@ -0,0 +1,130 @@
+# Core Library
+from itertools import combinations
+
+# Third party
+import pytest
+from graphviz import Digraph
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.model import StackInfo, StackExport
+from aws_infra_graph.communities import (
+    HYBRID,
+    COMMUNITY,
+    cluster_paths,
+    label_propagation,
+    hierarchical_communities,
+)
+from aws_infra_graph.graph_exporter import ClusterOptions, InfraGraphExporter
+
+# Local
+from .test_graph import FakeDataExtractor
+
+
+def clique(prefix: str, size: int):
+    return {
+        (f"{prefix}{first}", f"{prefix}{second}")
+        for first, second in combinations(range(size), 2)
+    }
+
+
+# two groups of two cliques, the cliques of a group share two edges
+GROUPS = (
+    clique("a", 5)
+    | clique("b", 5)
+    | {("a0", "b0"), ("a1", "b1")}
+    | clique("c", 5)
+    | clique("d", 5)
+    | {("c0", "d0"), ("c1", "d1")}
+    | {("b4", "c4")}
+)
+
+
+class TestCommunities:
+    def test_label_propagation(self):
+        """Communities :: densely connected stacks end up in one community"""
+        # WHEN
+        communities = label_propagation({"lonely"}, clique("a", 5) | clique("b", 5))
+
+        # THEN
+        expect(len(set(communities.values()))).to_equal(3)
+        expect({communities[f"a{index}"] for index in range(5)}).to_equal({0})
+        expect(len({communities[f"b{index}"] for index in range(5)})).to_equal(1)
+        expect(communities["lonely"]).not_to_equal(communities["a0"])
+
+    def test_hierarchical_communities(self):
+        """Communities :: further levels group communities of communities"""
+        # WHEN
+        paths = hierarchical_communities(set(), GROUPS, levels=2)
+
+        # THEN the cliques are the inner, the groups the outer communities
+        expect(len({path for path in paths.values()})).to_equal(4)
+        expect(len({path[0] for path in paths.values()})).to_equal(2)
+        expect(paths["a0"][0]).to_equal(paths["b3"][0])
+        expect(paths["a0"][0]).not_to_equal(paths["c0"][0])
+
+    def test_cluster_paths(self):
+        """Communities :: hybrid clusters keep the service tags where present"""
+        # GIVEN only the a stacks are tagged
+        service_names = {f"a{index}": "api" for index in range(5)}
+        nodes = {node for edge in GROUPS for node in edge} | {"lonely"}
+
+        # WHEN
+        community = cluster_paths(nodes, GROUPS, service_names, COMMUNITY, levels=2)
+        hybrid = cluster_paths(nodes, GROUPS, service_names, HYBRID)
+
+        # THEN
+        expect(len(community["a0"])).to_equal(2)
+        expect(community["lonely"]).to_equal(())
+        expect(hybrid["a0"]).to_equal(("api",))
+        expect(hybrid["b0"]).to_equal(hybrid["b4"])
+        expect(hybrid["b0"][0]).to_contain("community")
+        with pytest.raises(ValueError):
+            cluster_paths(nodes, GROUPS, service_names, "unknown")
+
+    def test_nested_clusters_in_dot(self, tmp_path, monkeypatch):
+        """Communities :: community clusters are nested subgraphs of the stack graph"""
+        # GIVEN untagged stacks importing along the edges of the groups
+        stack_names = sorted({node for edge in GROUPS for node in edge})
+        stack_infos = [
+            StackInfo(
+                stack_name=f"teamName-dev-{name}",
+                service_name=None,
+                component_name=None,
+                resources=[],
+            )
+            for name in stack_names
+        ]
+        stack_exports = [
+            StackExport(
+                export_name=f"{exporting}-{importing}",
+                export_value="fake",
+                exporting_stack_name=f"teamName-dev-{exporting}",
+                importing_stacks=[f"teamName-dev-{importing}"],
+            )
+            for exporting, importing in sorted(GROUPS)
+        ]
+        graph_exporter = InfraGraphExporter(
+            env="dev",
+            project_name="teamName",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=FakeDataExtractor(stack_infos, stack_exports),
+        )
+        sources = []
+        monkeypatch.setattr(
+            Digraph, "render", lambda graph, **kwargs: sources.append(graph.source)
+        )
+
+        # WHEN
+        graph_exporter._visualize_stacks(
+            stack_exports,
+            stack_infos,
+            True,
+            clustering=ClusterOptions(strategy=COMMUNITY, levels=2),
+        )
+
+        # THEN
+        (source,) = sources
+        expect(source.count("subgraph ")).to_equal(6)
+        expect(source).to_contain('label="community 0.0"')
@@ -0,0 +1,84 @@
+# Core Library
+import os
+import shutil
+
+# Third party
+import pytest
+from pyexpect import expect
+
+# First party
+from aws_infra_graph import config
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONFIG_CACHE_ROOT", tmp_path / "cache")
+    target = tmp_path / "config.hocon"
+    shutil.copy("tests/test_config.hocon", target)
+    return target
+
+
+class TestConfig:
+    def test_load_config(self, config_file):
+        """Config :: can be loaded from HOCON without the JSON round trip"""
+        # WHEN
+        loaded = config.load_config(str(config_file), use_cache=False)
+
+        # THEN
+        expect(loaded.default_project).to_equal("testTeam")
+        expect(loaded.service_tags).to_equal(["Service"])
+        dependency = loaded.projects["testTeam"].downstream_dependencies["api"][0]
+        expect(dependency.service).to_equal("ExternalService")
+        expect(dependency.team).to_equal("ExternalServiceTeam")
+
+    def test_load_config_cached(self, config_file, monkeypatch):
+        """Config :: unchanged configs are loaded from the cache"""
+        # GIVEN a config that was loaded once
+        first = config.load_config(str(config_file))
+
+        # WHEN it is loaded again without parsing being possible
+        def fail_parse(_):
+            raise AssertionError("config should come from the cache")
+
+        monkeypatch.setattr(config, "_parse_config", fail_parse)
+        second = config.load_config(str(config_file))
+
+        # THEN the cached model is returned
+        expect(second).to_equal(first)
+
+        # AND only touching the file still hits the cache via the content hash
+        stat = config_file.stat()
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        expect(config.load_config(str(config_file))).to_equal(first)
+
+    def test_load_config_cache_invalidated(self, config_file):
+        """Config :: changed configs are parsed again"""
+        # GIVEN a cached config
+        config.load_config(str(config_file))
+
+        # WHEN its content changes
+        content = config_file.read_text().replace("testTeam", "otherTeam")
+        config_file.write_text(content)
+        stat = config_file.stat()
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        # THEN the new content is loaded
+        expect(config.load_config(str(config_file)).default_project).to_equal(
+            "otherTeam"
+        )
+
+    def test_load_config_cache_outdated(self, config_file):
+        """Config :: a cache written for another config schema is replaced"""
+        # GIVEN a cache entry of the config written by an older version
+        cache_path = config._config_cache_path(config_file)
+        outdated = cache_path.with_name(cache_path.name.split("-")[0] + ".pickle")
+        outdated.parent.mkdir(parents=True)
+        outdated.write_bytes(b"pickled by an older version")
+
+        # WHEN
+        loaded = config.load_config(str(config_file))
+
+        # THEN the config is parsed again and the outdated entry removed
+        expect(loaded.projects["testTeam"].filters).to_equal(None)
+        expect(outdated.exists()).is_false()
+        expect(cache_path.exists()).is_true()
@@ -0,0 +1,74 @@
+# Third party
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.model import StackExport
+from aws_infra_graph.data_extractor import DataExtractor
+
+# Local
+from .synthetic import FakeCloudFormationClient, generate_account
+
+
+def by_export_name(exports):
+    return sorted(exports, key=lambda export: export.export_name)
+
+
+class TestDataExtractor:
+    def test_gather_and_filter_exports(self):
+        """Data extractor :: exports carry their importing stacks and services"""
+        # GIVEN an account where a stack of another project imports an export
+        account = generate_account(60, seed=11, other_stack_count=20)
+        other_stack = next(
+            stack.name
+            for stack in account.stacks
+            if not stack.name.startswith(account.stack_prefix)
+        )
+        imported_export = next(iter(account.imports))
+        account.imports[imported_export] = account.imports[imported_export] + [
+            other_stack
+        ]
+        extractor = DataExtractor(
+            account.stack_prefix,
+            service_tags=["Service"],
+            component_tags=["Component"],
+            cfn_client=FakeCloudFormationClient(account),
+            throttle_delay=0,
+        )
+        stacks = DataExtractor.gather_stacks.__wrapped__(extractor)
+        project_services = {
+            stack.stack_name: stack.service_name
+            for stack in stacks
+            if stack.service_name
+        }
+
+        # WHEN
+        exports = DataExtractor.gather_and_filter_exports.__wrapped__(extractor, stacks)
+
+        # THEN the exports of the project that are imported are kept, services
+        # only come from the stacks of the project
+        expected = [
+            StackExport(
+                export_name=export.export_name,
+                export_value=export.export_value,
+                exporting_stack_name=export.exporting_stack_name,
+                importing_stacks=export.importing_stacks,
+                export_service=export.export_service,
+                importing_services=[
+                    project_services[importing_stack]
+                    for importing_stack in export.importing_stacks
+                    if importing_stack in project_services
+                ],
+            )
+            for export in account.stack_exports()
+            if export.importing_stacks
+            and export.exporting_stack_name.startswith(account.stack_prefix)
+        ]
+        expect(by_export_name(exports)).to_equal(by_export_name(expected))
+        imported = next(
+            export for export in exports if export.export_name == imported_export
+        )
+        expect(imported.importing_stacks).to_contain(other_stack)
+        # AND enriching the services again changes nothing
+        expect(list(DataExtractor._enrich_service_name(exports, stacks))).to_equal(
+            exports
+        )
@@ -0,0 +1,154 @@
+# Third party
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.config import FilterConfig, ProjectConfig
+from aws_infra_graph.filters import StackFilter, stack_name_from_id
+from aws_infra_graph.data_extractor import DataExtractor
+
+# Local
+from .synthetic import FakeCloudFormationClient, generate_account
+
+
+def extract(account, stack_filter=None):
+    client = FakeCloudFormationClient(account)
+    extractor = DataExtractor(
+        account.stack_prefix,
+        service_tags=["Service"],
+        component_tags=["Component"],
+        cfn_client=client,
+        throttle_delay=0,
+        stack_filter=stack_filter,
+    )
+    stacks = DataExtractor.gather_stacks.__wrapped__(extractor)
+    exports = DataExtractor.gather_and_filter_exports.__wrapped__(extractor, stacks)
+    return stacks, exports, client.calls
+
+
+class TestFilters:
+    def test_matches_name(self):
+        """Filters :: stack names are matched by prefix and globs"""
+        # GIVEN
+        stack_filter = StackFilter(
+            "teamName-dev",
+            stack_names=["*-api-*", "*-worker"],
+            exclude_stack_names=["*-legacy-*"],
+        )
+
+        # THEN
+        expect(stack_filter.matches_name("teamName-dev-api-service")).is_true()
+        expect(stack_filter.matches_name("teamName-dev-worker")).is_true()
+        expect(stack_filter.matches_name("teamName-dev-legacy-api-x")).is_false()
+        expect(stack_filter.matches_name("teamName-dev-frontend")).is_false()
+        expect(stack_filter.matches_name("otherTeam-dev-api-service")).is_false()
+
+    def test_matches_tags_and_services(self):
+        """Filters :: tags have to match and services can be included or excluded"""
+        # GIVEN
+        stack_filter = StackFilter(
+            "teamName-dev",
+            exclude_services=["legacy"],
+            tags={"Owner": "teamName"},
+        )
+        included = StackFilter("teamName-dev", services=["api"])
+
+        # THEN
+        expect(
+            stack_filter.matches_tags([{"Key": "Owner", "Value": "teamName"}])
+        ).is_true()
+        expect(
+            stack_filter.matches_tags([{"Key": "Owner", "Value": "other"}])
+        ).is_false()
+        expect(stack_filter.matches_tags([])).is_false()
+        expect(stack_filter.matches_service("api")).is_true()
+        expect(stack_filter.matches_service(None)).is_true()
+        expect(stack_filter.matches_service("legacy")).is_false()
+        expect(included.matches_service("api")).is_true()
+        expect(included.matches_service(None)).is_false()
+
+    def test_from_config(self):
+        """Filters :: the HOCON filters block of a project configures the filter"""
+        # GIVEN
+        project_config = ProjectConfig.parse_obj(
+            {
+                "filters": {
+                    "stackNames": ["*-api-*"],
+                    "excludeServices": ["legacy"],
+                    "tags": {"Owner": "teamName"},
+                }
+            }
+        )
+
+        # WHEN
+        stack_filter = StackFilter.from_config("teamName-dev", project_config.filters)
+
+        # THEN
+        expect(project_config.filters).to_equal(
+            FilterConfig(
+                stack_names=["*-api-*"],
+                exclude_services=["legacy"],
+                tags={"Owner": "teamName"},
+            )
+        )
+        expect(stack_filter.matches_name("teamName-dev-api-x")).is_true()
+        expect(stack_filter.matches_service("legacy")).is_false()
+        expect(StackFilter.from_config("teamName-dev", None).tags).to_equal({})
+
+    def test_stack_name_from_id(self):
+        """Filters :: the stack name is taken from the stack ARN"""
+        expect(
+            stack_name_from_id(
+                "arn:aws:cloudformation:eu-west-1:123456789012:stack/teamName-dev-api/1234"
+            )
+        ).to_equal("teamName-dev-api")
+        expect(stack_name_from_id("teamName-dev-api")).to_equal(None)
+
+    def test_extraction_skips_filtered_stacks(self):
+        """Filters :: filtered stacks and their exports cause no further API calls"""
+        # GIVEN
+        account = generate_account(40, seed=5)
+        excluded = {"service0", "service1"}
+        _, all_exports, all_calls = extract(account)
+
+        # WHEN
+        stacks, exports, calls = extract(
+            account,
+            StackFilter(account.stack_prefix, exclude_services=excluded),
+        )
+
+        # THEN no excluded stack, export or importer is left
+        stack_names = {stack.stack_name for stack in stacks}
+        expect(stack_names).not_to_contain(None)
+        for stack in stacks:
+            expect(excluded).not_to_contain(stack.service_name)
+        for export in exports:
+            expect(stack_names).to_contain(export.exporting_stack_name)
+            for importing_stack in export.importing_stacks:
+                expect(stack_names).to_contain(importing_stack)
+
+        # AND the dropped stacks and exports were not queried
+        expect(len(exports)).is_less_than(len(all_exports))
+        expect(calls["describe_stacks"]).to_equal(all_calls["describe_stacks"])
+        expect(calls["describe_stack_resources"]).to_equal(len(stacks))
+        expect(calls["describe_stack_resources"]).is_less_than(
+            all_calls["describe_stack_resources"]
+        )
+        expect(calls["list_imports"]).is_less_than(all_calls["list_imports"])
+
+    def test_extraction_with_untagged_exporters(self):
+        """Filters :: exports of stacks without a service tag are extracted"""
+        # GIVEN an account where many stacks have no service tag
+        account = generate_account(30, seed=7, untagged_ratio=0.5)
+
+        # WHEN
+        stacks, exports, _ = extract(account)
+
+        # THEN
+        untagged = {stack.stack_name for stack in stacks if not stack.service_name}
+        expect(len(untagged)).is_greater_than(0)
+        untagged_exports = [
+            export for export in exports if export.exporting_stack_name in untagged
+        ]
+        expect(len(untagged_exports)).is_greater_than(0)
+        for export in untagged_exports:
+            expect(export.export_service).to_equal(None)
@@ -1,8 +1,10 @@
 # Core Library
+import json
 from typing import List
 from collections import Counter
 
 # Third party
+from graphviz import Digraph
 from pyexpect import expect
 
 # First party
@@ -13,7 +15,12 @@ from aws_infra_graph.model import (
     StackParameter,
     ExternalDependency,
 )
-from aws_infra_graph.graph_exporter import InfraGraphExporter
+from aws_infra_graph.sharding import Shard
+from aws_infra_graph.graph_exporter import (
+    FocusOptions,
+    InfraGraphExporter,
+    NodeAndEdgesServiceGraph,
+)
 
 EXPECTED_OUTPUT_FILES = {
     "export.json",
@@ -21,6 +28,8 @@ EXPECTED_OUTPUT_FILES = {
     "export-services.gv.png",
     "export-stacks.gv",
     "export-stacks.gv.png",
+    "ownership-index.pickle",
+    "timings.json",
 }
 
 
@@ -116,6 +125,34 @@ class TestGraph:
             expect(contents).to_contain("etl -> api")
             expect(contents).to_contain("api -> ExternalService")
 
+    def test_export_bytes_written(self, tmp_path):
+        """Graph :: the written size of export.json is counted in bytes"""
+        # GIVEN a service name with non-ASCII characters
+        stack_infos = [
+            StackInfo(
+                stack_name="testTeam-dev-api",
+                service_name="zahlungsüberprüfung",
+                component_name="service",
+                resources=[],
+            )
+        ]
+        graph_exporter = InfraGraphExporter(
+            env="dev",
+            project_name="testTeam",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=FakeDataExtractor(stack_infos, []),
+        )
+
+        # WHEN
+        graph_exporter.export(refresh=False, cluster_stack_graph=False)
+
+        # THEN
+        timings = json.loads((tmp_path / "timings.json").read_text())
+        expect(timings["bytes"]["export.json.written"]).to_equal(
+            (tmp_path / "export.json").stat().st_size
+        )
+
     def test_partition_node_set(self):
         """Graph :: can partition a node set by service name"""
 
@@ -189,3 +226,280 @@ class TestGraph:
         expect(statistics).to_equal(
             Counter({"Logs::LogGroup": 1, "ECS::Service": 2, "IAM::Role": 1})
         )
+
+    def test_export_sharded(self, tmp_path):
+        """Graph :: can be exported sharded by service with a manifest"""
+
+        # GIVEN an infra with two services depending on each other
+        stack_infos = [
+            StackInfo(
+                stack_name="dev-teamName-api",
+                service_name="api",
+                component_name="service",
+                resources=[],
+            ),
+            StackInfo(
+                stack_name="dev-teamName-etl",
+                service_name="etl",
+                component_name="task",
+                resources=[],
+            ),
+            StackInfo(
+                stack_name="dev-teamName-misc",
+                service_name=None,
+                component_name=None,
+                resources=[],
+            ),
+        ]
+        stack_exports = [
+            StackExport(
+                export_name="etl-data-path",
+                export_value="fake",
+                exporting_stack_name="dev-teamName-etl",
+                importing_stacks=["dev-teamName-api", "dev-teamName-misc"],
+                importing_services=["api"],
+                export_service="etl",
+            )
+        ]
+        graph_exporter = InfraGraphExporter(
+            env="dev",
+            project_name="testTeam",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=FakeDataExtractor(stack_infos, stack_exports),
+        )
+
+        # WHEN i export it sharded
+        graph_exporter.export(
+            refresh=True, cluster_stack_graph=False, shard_by_service=True
+        )
+
+        # THEN every service gets its own shard listed in the manifest
+        manifest = json.loads((tmp_path / "shards" / "manifest.json").read_text())
+        expect([shard["shard"] for shard in manifest["shards"]]).to_equal(
+            ["_unassigned", "api", "etl"]
+        )
+        for shard in manifest["shards"]:
+            expect(set(shard["files"])).to_equal(
+                {"export.json", "export-stacks.gv", "export-stacks.gv.png"}
+            )
+        # AND the importing shard only contains its own side of the edge
+        api_export = json.loads(
+            (tmp_path / "shards" / "api" / "export.json").read_text()
+        )
+        expect(api_export["stack_exports"][0]["importing_stacks"]).to_equal(
+            ["dev-teamName-api"]
+        )
+        # AND no monolithic stack graph is rendered
+        expect((tmp_path / "export-stacks.gv").exists()).is_false()
+
+    def test_shard_names_unique(self):
+        """Graph :: services differing only in special characters get own shards"""
+        # WHEN
+        names = [
+            Shard(service_name=service, stack_infos=[], exports=[]).name
+            for service in ["api", "a/b", "a b", "_unassigned", None]
+        ]
+
+        # THEN
+        expect(len(set(names))).to_equal(5)
+        expect(names[0]).to_equal("api")
+        expect(names[1]).to_match(r"^a_b-[0-9a-f]{8}$")
+
+    def test_restrict_to_focus(self):
+        """Graph :: can restrict a graph to the neighbourhood of a focus"""
+        # GIVEN a service graph api <- etl <- Snowflake and an unrelated service
+        nodes_and_edges = NodeAndEdgesServiceGraph(
+            edges={("etl", "api"), ("billing", "invoices")},
+            external_edges={("Snowflake", "etl")},
+            manual_downstream_edges=set(),
+            manual_internal_edges=set(),
+            internal_nodes={"etl", "api", "billing", "invoices"},
+            external_nodes={"Snowflake"},
+            manual_downstream_nodes=set(),
+            manual_internal_nodes=set(),
+        )
+
+        # WHEN focusing on the direct dependencies of api
+        result = InfraGraphExporter._restrict_to_focus(
+            nodes_and_edges, {"api"}, FocusOptions("api", 1, "upstream")
+        )
+
+        # THEN only api and etl remain
+        expect(result.internal_nodes).to_equal({"api", "etl"})
+        expect(result.edges).to_equal({("etl", "api")})
+        expect(result.external_nodes).to_equal(set())
+
+    def test_simplify(self, tmp_path, monkeypatch):
+        """Graph :: shortcut edges are removed and parallel cluster edges bundled"""
+        # GIVEN db -> cache -> api, the shortcut db -> api and cache -> worker
+        services = {"db": "data", "cache": "data", "api": "app", "worker": "app"}
+        stack_infos = [
+            StackInfo(
+                stack_name=f"teamName-dev-{name}",
+                service_name=service,
+                component_name="service",
+                resources=[],
+            )
+            for name, service in services.items()
+        ]
+        stack_exports = [
+            StackExport(
+                export_name=f"{exporting}-{importing}",
+                export_value="fake",
+                exporting_stack_name=f"teamName-dev-{exporting}",
+                importing_stacks=[f"teamName-dev-{importing}"],
+                importing_services=[services[importing]],
+                export_service=services[exporting],
+            )
+            for exporting, importing in [
+                ("db", "cache"),
+                ("cache", "api"),
+                ("db", "api"),
+                ("cache", "worker"),
+            ]
+        ]
+        graph_exporter = InfraGraphExporter(
+            env="dev",
+            project_name="teamName",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=FakeDataExtractor(stack_infos, stack_exports),
+        )
+        sources = []
+        monkeypatch.setattr(
+            Digraph, "render", lambda graph, **kwargs: sources.append(graph.source)
+        )
+
+        # WHEN
+        stack_graph = graph_exporter._visualize_stacks(
+            stack_exports, stack_infos, True, simplify=True
+        )
+
+        # THEN only db -> cache and one bundled edge data -> app are drawn
+        (source,) = sources
+        expect(source.count(" -> ")).to_equal(2)
+        expect(source).to_contain("db -> cache")
+        expect(source).to_contain("compound=true")
+        expect(source).to_contain("lhead=cluster_app")
+        expect(source).to_contain("label=2")
+        # AND the returned graph is not simplified
+        expect(stack_graph.edges).to_contain(("db", "api"))
+
+    def test_service_edge_weights(self):
+        """Graph :: service edges keep the number of exports and stacks behind them"""
+        # GIVEN two etl stacks exporting three values to the api service
+        stack_infos = [
+            StackInfo(
+                stack_name=name,
+                service_name=service,
+                component_name=None,
+                resources=[],
+            )
+            for name, service in [
+                ("dev-teamName-api", "api"),
+                ("dev-teamName-api-worker", "api"),
+                ("dev-teamName-etl", "etl"),
+                ("dev-teamName-etl-bucket", "etl"),
+            ]
+        ]
+        stack_exports = [
+            StackExport(
+                export_name=export_name,
+                export_value="fake",
+                exporting_stack_name=exporting_stack,
+                importing_stacks=importing_stacks,
+                importing_services=["api"] * len(importing_stacks),
+                export_service="etl",
+            )
+            for export_name, exporting_stack, importing_stacks in [
+                ("etl-data-path", "dev-teamName-etl", ["dev-teamName-api"]),
+                ("etl-queue", "dev-teamName-etl", ["dev-teamName-api-worker"]),
+                (
+                    "etl-bucket",
+                    "dev-teamName-etl-bucket",
+                    ["dev-teamName-api", "dev-teamName-api-worker"],
+                ),
+            ]
+        ]
+
+        # WHEN
+        service_graph = InfraGraphExporter._retrieve_nodes_and_edges_for_service_graph(
+            stack_exports, stack_infos, None, None
+        )
+
+        # THEN
+        expect(service_graph.edges).to_equal({("etl", "api")})
+        weight = service_graph.edge_weights[("etl", "api")]
+        expect(weight.exports).to_equal(3)
+        expect(len(weight.exporting_stacks)).to_equal(2)
+        expect(len(weight.importing_stacks)).to_equal(2)
+        # AND they are part of the data export
+        dependencies = InfraGraphExporter._service_dependencies(service_graph)
+        expect([dependency.exports for dependency in dependencies]).to_equal([3])
+
+    def test_export_html(self, tmp_path):
+        """Graph :: the HTML renderer writes graph JSON and viewers without Graphviz"""
+        # GIVEN
+        stack_infos = [
+            StackInfo(
+                stack_name="teamName-dev-api",
+                service_name="api",
+                component_name="service",
+                resources=[],
+            ),
+            StackInfo(
+                stack_name="teamName-dev-etl</script>",
+                service_name="etl",
+                component_name="task",
+                resources=[],
+            ),
+        ]
+        stack_exports = [
+            StackExport(
+                export_name="etl-data-path",
+                export_value="fake",
+                exporting_stack_name="teamName-dev-etl</script>",
+                importing_stacks=["teamName-dev-api"],
+                importing_services=["api"],
+                export_service="etl",
+            )
+        ]
+        graph_exporter = InfraGraphExporter(
+            env="dev",
+            project_name="teamName",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=FakeDataExtractor(stack_infos, stack_exports),
+        )
+
+        # WHEN
+        graph_exporter.export(refresh=False, cluster_stack_graph=True, renderer="html")
+
+        # THEN
+        resulting_files = {file.name for file in tmp_path.iterdir()}
+        expect(resulting_files).to_equal(
+            {
+                "export.json",
+                "export-services.json",
+                "export-services.html",
+                "export-stacks.json",
+                "export-stacks.html",
+                "ownership-index.pickle",
+                "timings.json",
+            }
+        )
+        stacks_graph = json.loads((tmp_path / "export-stacks.json").read_text())
+        expect(sorted(stacks_graph["nodes"], key=lambda node: node["id"])).to_equal(
+            [
+                {"id": "api", "color": "green", "group": "api"},
+                {"id": "etl</script>", "color": "gray", "group": "etl"},
+            ]
+        )
+        expect(len(stacks_graph["edges"])).to_equal(1)
+        services_graph = json.loads((tmp_path / "export-services.json").read_text())
+        expect(services_graph["edges"]).to_equal([[1, 0, 1]])
+        # AND the viewer embeds the graph without breaking out of its script
+        viewer = (tmp_path / "export-stacks.html").read_text()
+        expect(viewer).to_contain('"id":"etl<\\/script>"')
+        expect(viewer).not_to_contain("/*GRAPH_JSON*/")
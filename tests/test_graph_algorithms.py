@@ -0,0 +1,75 @@
+# Third party
+import pytest
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.graph_algorithms import (
+    neighbourhood,
+    build_adjacency,
+    transitive_reduction,
+    strongly_connected_components,
+)
+
+# a -> b -> c -> d and x -> c
+EDGES = {("a", "b"), ("b", "c"), ("c", "d"), ("x", "c")}
+
+
+class TestGraphAlgorithms:
+    @pytest.mark.parametrize(
+        "direction,depth,expected",
+        [
+            ("downstream", None, {"b", "c", "d"}),
+            ("downstream", 1, {"b", "c"}),
+            ("upstream", None, {"a", "b"}),
+            ("both", 1, {"a", "b", "c"}),
+        ],
+    )
+    def test_neighbourhood(self, direction, depth, expected):
+        """Graph algorithms :: neighbourhood follows the requested direction"""
+        expect(neighbourhood(EDGES, {"b"}, depth, direction)).to_equal(expected)
+
+    def test_neighbourhood_both_is_not_connected_component(self):
+        """Graph algorithms :: both directions do not walk sideways"""
+        # x is a sibling upstream dependency of c, not an ancestor of d
+        expect(neighbourhood(EDGES, {"d"}, None, "upstream")).to_contain("x")
+        expect(neighbourhood(EDGES, {"a"}, None, "both")).not_to_contain("x")
+
+    def test_strongly_connected_components(self):
+        """Graph algorithms :: components come in reverse topological order"""
+        # GIVEN a -> b <-> c -> d
+        adjacency = build_adjacency([("a", "b"), ("b", "c"), ("c", "b"), ("c", "d")])
+
+        # WHEN
+        components = strongly_connected_components("abcd", adjacency)
+
+        # THEN
+        expect([sorted(component) for component in components]).to_equal(
+            [["d"], ["b", "c"], ["a"]]
+        )
+
+    def test_strongly_connected_components_deep(self):
+        """Graph algorithms :: long chains do not hit the recursion limit"""
+        chain = build_adjacency((index, index + 1) for index in range(20000))
+        expect(len(strongly_connected_components(range(20001), chain))).to_equal(20001)
+
+    def test_transitive_reduction(self):
+        """Graph algorithms :: edges implied by longer paths are removed"""
+        # GIVEN a -> b -> c -> d with shortcuts a -> c and a -> d
+        edges = EDGES | {("a", "c"), ("a", "d")}
+
+        # WHEN
+        reduced = transitive_reduction(edges)
+
+        # THEN
+        expect(reduced).to_equal(EDGES)
+
+    def test_transitive_reduction_keeps_cycles(self):
+        """Graph algorithms :: cycles stay, shortcuts around them are removed"""
+        # GIVEN a -> b <-> c -> d and the shortcut a -> d
+        cycle = {("a", "b"), ("b", "c"), ("c", "b"), ("c", "d")}
+
+        # WHEN
+        reduced = transitive_reduction(cycle | {("a", "d"), ("b", "d")})
+
+        # THEN b -> d leaves the cycle in parallel with c -> d
+        expect(reduced).to_equal(cycle | {("b", "d")})
@@ -0,0 +1,171 @@
+# Core Library
+import json
+import time
+
+# Third party
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.model import (
+    StackInfo,
+    StackExport,
+    StackResource,
+    StackParameter,
+    ImplicitDependency,
+)
+from aws_infra_graph.graph_exporter import InfraGraphExporter
+from aws_infra_graph.implicit_dependencies import discover_implicit_dependencies
+
+# Local
+from .synthetic import ACCOUNT_ID, generate_account
+from .test_graph import FakeDataExtractor
+
+QUEUE_URL = f"https://sqs.eu-west-1.amazonaws.com/{ACCOUNT_ID}/teamName-dev-etl-Queue"
+
+
+def stack(name, service, resources=(), parameters=()):
+    return StackInfo(
+        stack_name=name,
+        service_name=service,
+        component_name="service",
+        resources=[
+            StackResource(
+                logical_id=logical_id,
+                resource_type=resource_type,
+                physical_id=physical_id,
+            )
+            for logical_id, resource_type, physical_id in resources
+        ],
+        parameters=[
+            StackParameter(name=name, value=value) for name, value in parameters
+        ],
+    )
+
+
+stack_infos = [
+    stack(
+        "teamName-dev-etl",
+        "etl",
+        resources=[
+            ("Queue", "AWS::SQS::Queue", QUEUE_URL),
+            ("Bucket", "AWS::S3::Bucket", "teamname-dev-etl-bucket"),
+        ],
+        parameters=[("Environment", "dev")],
+    ),
+    stack(
+        "teamName-dev-api",
+        "api",
+        parameters=[
+            # the queue by its ARN, the bucket within a list
+            (
+                "QueueArn",
+                f"arn:aws:sqs:eu-west-1:{ACCOUNT_ID}:teamName-dev-etl-Queue",
+            ),
+            ("Buckets", "other-bucket, teamname-dev-etl-bucket"),
+            ("Environment", "dev"),
+        ],
+    ),
+    stack(
+        "teamName-dev-api-worker",
+        "api",
+        parameters=[("Bucket", "teamname-dev-etl-bucket")],
+    ),
+]
+# the worker imports from etl already
+stack_exports = [
+    StackExport(
+        export_name="etl-bucket",
+        export_value="teamname-dev-etl-bucket",
+        exporting_stack_name="teamName-dev-etl",
+        importing_stacks=["teamName-dev-api-worker"],
+        export_service="etl",
+        importing_services=["api"],
+    )
+]
+
+
+class TestImplicitDependencies:
+    def test_discover(self):
+        """Implicit dependencies :: parameters holding ids of other stacks are found"""
+        # WHEN
+        dependencies = discover_implicit_dependencies(stack_infos, stack_exports)
+
+        # THEN the worker is left out as it imports the bucket
+        expect(dependencies).to_equal(
+            [
+                ImplicitDependency(
+                    providing_stack="teamName-dev-etl",
+                    consuming_stack="teamName-dev-api",
+                    parameter_name="QueueArn",
+                    identifier="teamName-dev-etl-Queue",
+                ),
+                ImplicitDependency(
+                    providing_stack="teamName-dev-etl",
+                    consuming_stack="teamName-dev-api",
+                    parameter_name="Buckets",
+                    identifier="teamname-dev-etl-bucket",
+                ),
+            ]
+        )
+
+    def test_graphs_and_export(self, tmp_path):
+        """Implicit dependencies :: are extra edges of both graphs and in export.json"""
+        # GIVEN
+        graph_exporter = InfraGraphExporter(
+            env="dev",
+            project_name="teamName",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=FakeDataExtractor(stack_infos, []),
+        )
+        dependencies = discover_implicit_dependencies(stack_infos, [])
+
+        # WHEN
+        stack_graph = graph_exporter._retrieve_nodes_and_edges_for_stacks_graph(
+            [], stack_infos, dependencies
+        )
+        service_graph = InfraGraphExporter._retrieve_nodes_and_edges_for_service_graph(
+            [], stack_infos, None, None, dependencies
+        )
+        graph_exporter.export(refresh=False, cluster_stack_graph=False, renderer="html")
+
+        # THEN
+        expect(stack_graph.edges).to_equal(set())
+        expect(stack_graph.edges_implicit).to_equal(
+            {("etl", "api"), ("etl", "api-worker")}
+        )
+        expect(stack_graph.leaf_nodes).to_equal({"api", "api-worker"})
+        expect(service_graph.implicit_edges).to_equal({("etl", "api")})
+        exported = json.loads((tmp_path / "export.json").read_text())
+        expect(len(exported["implicit_dependencies"])).to_equal(3)
+        stacks_document = json.loads((tmp_path / "export-stacks.json").read_text())
+        expect([edge[3] for edge in stacks_document["edges"]]).to_equal(
+            ["dashed", "dashed"]
+        )
+
+    def test_scales_linearly(self):
+        """Implicit dependencies :: matching does not compare all values with all ids"""
+        # GIVEN every stack referencing resources of another stack by parameter
+
+        def account_stacks(stack_count):
+            stacks = generate_account(stack_count, seed=4).stack_infos()
+            for position, consumer in enumerate(stacks):
+                provider = stacks[(position * 7 + 1) % len(stacks)]
+                consumer.parameters.extend(
+                    StackParameter(name=f"Ref{index}", value=resource.physical_id)
+                    for index, resource in enumerate(provider.resources[:3])
+                )
+            return stacks
+
+        def duration(stacks):
+            start = time.perf_counter()
+            dependencies = discover_implicit_dependencies(stacks, [])
+            return time.perf_counter() - start, dependencies
+
+        # WHEN
+        small_time, _ = duration(account_stacks(200))
+        large_time, dependencies = duration(account_stacks(2000))
+
+        # THEN ten times the stacks take far less than a hundred times as long
+        expect(len(dependencies)).is_greater_than(2000)
+        expect(large_time).is_less_than(small_time * 30)
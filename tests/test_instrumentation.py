@@ -0,0 +1,110 @@
+# Core Library
+import json
+
+# Third party
+from pyexpect import expect
+
+# First party
+from aws_infra_graph import utils
+from aws_infra_graph.instrumentation import (
+    Histogram,
+    Instrumentation,
+    InstrumentedClient,
+    instrumentation,
+)
+
+
+class FakePaginator:
+    def paginate(self, **kwargs):
+        return iter([{"page": 1}, {"page": 2}])
+
+
+class FakeClient:
+    region_name = "eu-west-1"
+
+    def list_exports(self):
+        return {"Exports": []}
+
+    def get_paginator(self, operation_name):
+        return FakePaginator()
+
+
+class TestInstrumentation:
+    def test_histogram(self):
+        """Instrumentation :: histogram buckets are cumulative like in Prometheus"""
+        # GIVEN
+        histogram = Histogram(buckets=(0.1, 1.0))
+
+        # WHEN
+        for value in [0.05, 0.1, 0.5, 3.0]:
+            histogram.observe(value)
+
+        # THEN
+        expect(histogram.cumulative_buckets()).to_equal(
+            [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+        )
+        expect(histogram.count).to_equal(4)
+        expect(histogram.max).to_equal(3.0)
+
+    def test_instrumented_client(self):
+        """Instrumentation :: client calls and paginator pages are timed"""
+        # GIVEN
+        metrics = Instrumentation()
+        client = InstrumentedClient(FakeClient(), "cloudformation", metrics)
+
+        # WHEN
+        client.list_exports()
+        client.list_exports()
+        pages = list(client.get_paginator("list_stacks").paginate())
+
+        # THEN
+        expect(len(pages)).to_equal(2)
+        expect(client.region_name).to_equal("eu-west-1")
+        expect(metrics.timers["cloudformation.list_exports"].count).to_equal(2)
+        expect(metrics.timers["cloudformation.list_stacks"].count).to_equal(2)
+
+    def test_file_cached_hit_and_miss(self, tmp_path, monkeypatch):
+        """Instrumentation :: disc cache hits, misses and bytes are recorded"""
+        # GIVEN
+        monkeypatch.setattr(utils, "SYSTEM_CACHE_ROOT", tmp_path)
+        instrumentation.reset()
+
+        @utils.file_cached("test.cache")
+        def compute():
+            return list(range(100))
+
+        # WHEN
+        compute()
+        compute()
+
+        # THEN
+        expect(instrumentation.counters).to_equal(
+            {"cache.test.cache.miss": 1, "cache.test.cache.hit": 1}
+        )
+        size = (tmp_path / "test.cache").stat().st_size
+        expect(instrumentation.byte_counters).to_equal(
+            {"cache.test.cache.written": size, "cache.test.cache.read": size}
+        )
+
+    def test_write(self, tmp_path):
+        """Instrumentation :: timings can be written as JSON and Prometheus text"""
+        # GIVEN
+        metrics = Instrumentation()
+        with metrics.timed("graph.stacks.render"):
+            pass
+        metrics.cache_hit("cache.gather_stacks.cache")
+
+        # WHEN
+        metrics.write(str(tmp_path), prometheus=True)
+
+        # THEN
+        timings = json.loads((tmp_path / "timings.json").read_text())
+        expect(timings["timers"]["graph.stacks.render"]["count"]).to_equal(1)
+        expect(timings["counters"]).to_equal({"cache.gather_stacks.cache.hit": 1})
+        prometheus = (tmp_path / "timings.prom").read_text()
+        expect(prometheus).to_contain(
+            'infra_graph_duration_seconds_count{name="graph.stacks.render"} 1'
+        )
+        expect(prometheus).to_contain(
+            'infra_graph_events_total{name="cache.gather_stacks.cache.hit"} 1'
+        )
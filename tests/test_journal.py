@@ -0,0 +1,108 @@
+# Third party
+import pytest
+from pyexpect import expect
+from botocore.exceptions import ClientError
+
+# First party
+from aws_infra_graph.journal import CheckpointJournal
+from aws_infra_graph.data_extractor import DataExtractor
+
+# Local
+from .synthetic import FakeCloudFormationClient, generate_account
+
+
+class ThrottledClient(FakeCloudFormationClient):
+    """Fails with a throttling error on the n-th call of an operation"""
+
+    def __init__(self, account, operation: str, fail_at: int) -> None:
+        super().__init__(account)
+        self.operation = operation
+        self.fail_at = fail_at
+
+    def _call(self, operation: str) -> None:
+        super()._call(operation)
+        if operation == self.operation and self.calls[operation] == self.fail_at:
+            raise ClientError(
+                {"Error": {"Code": "Throttling", "Message": "Rate exceeded"}},
+                operation,
+            )
+
+
+def extractor_for(client, checkpoint_folder):
+    return DataExtractor(
+        client.account.stack_prefix,
+        service_tags=["Service"],
+        component_tags=["Component"],
+        cfn_client=client,
+        throttle_delay=0,
+        checkpoint_folder=checkpoint_folder,
+    )
+
+
+def extract(extractor):
+    stacks = DataExtractor.gather_stacks.__wrapped__(extractor)
+    exports = DataExtractor.gather_and_filter_exports.__wrapped__(extractor, stacks)
+    return stacks, exports
+
+
+class TestJournal:
+    def test_load_appended_records(self, tmp_path):
+        """Journal :: records are loaded again, also across batches"""
+        # GIVEN
+        path = tmp_path / "test.journal"
+        with CheckpointJournal(path, batch_size=2) as journal:
+            journal.append("a", 1)
+            journal.append("b", None)
+            journal.append("c", [1, 2])
+
+        # THEN
+        expect(CheckpointJournal(path).load()).to_equal(
+            {"a": 1, "b": None, "c": [1, 2]}
+        )
+
+    def test_truncated_frame_is_dropped(self, tmp_path):
+        """Journal :: a frame cut off by a crash is dropped and later appends work"""
+        # GIVEN a journal whose last frame was only partially written
+        path = tmp_path / "test.journal"
+        with CheckpointJournal(path, batch_size=1) as journal:
+            journal.append("a", 1)
+            journal.append("b", "x" * 100)
+        path.write_bytes(path.read_bytes()[:-20])
+
+        # WHEN
+        journal = CheckpointJournal(path)
+        records = journal.load()
+        journal.append("c", 3)
+        journal.close()
+
+        # THEN
+        expect(records).to_equal({"a": 1})
+        expect(CheckpointJournal(path).load()).to_equal({"a": 1, "c": 3})
+
+    @pytest.mark.parametrize(
+        "operation", ["describe_stacks", "describe_stack_resources", "list_imports"]
+    )
+    def test_interrupted_extraction_resumes(self, tmp_path, operation):
+        """Journal :: an interrupted extraction skips the finished records"""
+        # GIVEN an extraction that failed halfway
+        account = generate_account(30, seed=9)
+        total_calls = FakeCloudFormationClient(account)
+        expected_stacks, expected_exports = extract(extractor_for(total_calls, None))
+        fail_at = total_calls.calls[operation] // 2
+        with pytest.raises(ClientError):
+            extract(
+                extractor_for(ThrottledClient(account, operation, fail_at), tmp_path)
+            )
+
+        # WHEN it is run again
+        client = FakeCloudFormationClient(account)
+        stacks, exports = extract(extractor_for(client, tmp_path))
+
+        # THEN the result is complete while the finished calls were not repeated
+        expect(stacks).to_equal(expected_stacks)
+        expect(exports).to_equal(expected_exports)
+        expect(client.calls[operation]).to_equal(
+            total_calls.calls[operation] - fail_at + 1
+        )
+        # AND the journals are gone after the successful run
+        expect(list(tmp_path.iterdir())).to_equal([])
@@ -0,0 +1,149 @@
+# Core Library
+import io
+import json
+import shutil
+
+# Third party
+import pytest
+from pyexpect import expect
+from click.testing import CliRunner
+
+# First party
+from aws_infra_graph.cli import main
+from aws_infra_graph.graph_exporter import InfraGraphExporter
+from aws_infra_graph.offline_extractor import (
+    OfflineDataExtractor,
+    iter_top_level_arrays,
+)
+
+# Local
+from .synthetic import generate_account
+
+
+def offline_exporter(output_folder) -> InfraGraphExporter:
+    return InfraGraphExporter(
+        env="dev",
+        project_name="testTeam",
+        config_path="tests/test_config.hocon",
+        output_folder=str(output_folder),
+        data_extractor=OfflineDataExtractor(str(output_folder)),
+    )
+
+
+class TestOfflineExtractor:
+    def test_iter_top_level_arrays(self):
+        """Offline :: array elements are decoded one by one across chunk borders"""
+        # GIVEN
+        document = json.dumps(
+            {
+                "stacks": [{"name": 'a"b', "count": 12345}, 67890, True, None],
+                "resource_statistics": {"stacks": [1, 2]},
+                "empty": [],
+                "stack_exports": [[1.5e10, "x"]],
+            },
+            indent=2,
+        )
+
+        # WHEN
+        items = list(
+            iter_top_level_arrays(
+                io.StringIO(document), {"stacks", "empty", "stack_exports"}, 7
+            )
+        )
+
+        # THEN
+        expect(items).to_equal(
+            [
+                ("stacks", {"name": 'a"b', "count": 12345}),
+                ("stacks", 67890),
+                ("stacks", True),
+                ("stacks", None),
+                ("stack_exports", [1.5e10, "x"]),
+            ]
+        )
+
+    def test_iter_top_level_arrays_malformed(self):
+        """Offline :: truncated documents are rejected"""
+        with pytest.raises(ValueError):
+            list(iter_top_level_arrays(io.StringIO('{"stacks": [1, 2'), {"stacks"}))
+
+    def test_export_json(self, tmp_path):
+        """Offline :: stacks and exports are read back from an export.json"""
+        # GIVEN
+        account = generate_account(30, seed=5)
+        stack_infos, exports = account.stack_infos(), account.stack_exports()
+        exporter = offline_exporter(tmp_path)
+        exporter._create_data_export(
+            stack_infos, exporter._get_statictics(stack_infos), exports
+        )
+
+        # WHEN
+        extractor = OfflineDataExtractor(str(tmp_path / "export.json"))
+
+        # THEN
+        expect(extractor.gather_stacks()).to_equal(stack_infos)
+        expect(extractor.gather_and_filter_exports(stack_infos)).to_equal(exports)
+
+    def test_sharded_output(self, tmp_path):
+        """Offline :: the shards of a sharded export are merged again"""
+        # GIVEN
+        account = generate_account(30, seed=5)
+        stack_infos, exports = account.stack_infos(), account.stack_exports()
+        offline_exporter(tmp_path)._export_shards(
+            stack_infos, exports, False, renderer="html"
+        )
+
+        # WHEN
+        extractor = OfflineDataExtractor(str(tmp_path))
+
+        # THEN
+        by_name = {stack.stack_name: stack for stack in extractor.gather_stacks()}
+        expect(by_name).to_equal({stack.stack_name: stack for stack in stack_infos})
+        merged = {
+            export.export_name: export
+            for export in extractor.gather_and_filter_exports([])
+        }
+        expect(set(merged)).to_equal({export.export_name for export in exports})
+        for export in exports:
+            expect(set(merged[export.export_name].importing_stacks)).to_equal(
+                set(export.importing_stacks)
+            )
+            expect(sorted(merged[export.export_name].importing_services)).to_equal(
+                sorted(export.importing_services)
+            )
+
+    def test_cli_filters_project(self, tmp_path, monkeypatch):
+        """Offline :: the export command only loads the stacks of its project"""
+        # GIVEN an export.json with the stacks of two projects
+        account = generate_account(20, seed=5, other_stack_count=10)
+        stack_infos, exports = account.stack_infos(), account.stack_exports()
+        exporter = offline_exporter(tmp_path / "snapshot")
+        (tmp_path / "snapshot").mkdir()
+        exporter._create_data_export(
+            stack_infos, exporter._get_statictics(stack_infos), exports
+        )
+        shutil.copy("tests/test_config.hocon", tmp_path / "config.hocon")
+        (tmp_path / "output").mkdir()
+        monkeypatch.chdir(tmp_path)
+
+        # WHEN
+        result = CliRunner(mix_stderr=False).invoke(
+            main,
+            [
+                "export",
+                "--from-snapshot",
+                "snapshot/export.json",
+                "-o",
+                "output",
+                "--renderer",
+                "html",
+            ],
+        )
+
+        # THEN
+        expect(result.exit_code).to_equal(0)
+        exported = json.loads((tmp_path / "output" / "export.json").read_text())
+        expect(len(exported["stacks"])).to_equal(20)
+        expect(
+            {stack["stack_name"].split("-")[0] for stack in exported["stacks"]}
+        ).to_equal({"testTeam"})
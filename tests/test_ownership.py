@@ -0,0 +1,269 @@
+# Core Library
+import os
+import json
+import time
+
+# Third party
+from pyexpect import expect
+from click.testing import CliRunner
+
+# First party
+from aws_infra_graph import utils, graph_exporter
+from aws_infra_graph.cli import main
+from aws_infra_graph.model import StackInfo, StackResource
+from aws_infra_graph.ownership import (
+    EXACT,
+    PREFIX,
+    COMPONENT,
+    OwnershipIndex,
+    query_keys,
+)
+from aws_infra_graph.data_extractor import DataExtractor
+from aws_infra_graph.graph_exporter import InfraGraphExporter
+from aws_infra_graph.snapshot_store import SnapshotStore
+
+# Local
+from .synthetic import FakeCloudFormationClient, generate_account
+from .test_graph import FakeDataExtractor
+
+ACCOUNT = "123456789012"
+
+
+def stack(name: str, service: str, *resources) -> StackInfo:
+    return StackInfo(
+        stack_name=name,
+        service_name=service,
+        component_name="service",
+        resources=[
+            StackResource(
+                logical_id=logical_id,
+                resource_type=resource_type,
+                physical_id=physical_id,
+            )
+            for logical_id, resource_type, physical_id in resources
+        ],
+        parameters=[],
+    )
+
+
+stack_infos = [
+    stack(
+        "teamName-dev-api",
+        "api",
+        ("Role", "IAM::Role", f"arn:aws:iam::{ACCOUNT}:role/teamName-dev-api-Role"),
+        ("Function", "Lambda::Function", "teamName-dev-api-Function"),
+        ("Bucket", "S3::Bucket", "teamname-dev-api-bucket"),
+    ),
+    stack(
+        "teamName-dev-etl",
+        "etl",
+        (
+            "Queue",
+            "SQS::Queue",
+            f"https://sqs.eu-west-1.amazonaws.com/{ACCOUNT}/teamName-dev-etl-Queue",
+        ),
+        (
+            "Topic",
+            "SNS::Topic",
+            f"arn:aws:sns:eu-west-1:{ACCOUNT}:teamName-dev-etl-Topic",
+        ),
+    ),
+]
+
+
+def count_index_builds(monkeypatch):
+    builds = []
+    from_stack_infos = OwnershipIndex.from_stack_infos.__func__
+
+    def counted(cls, stack_infos):
+        builds.append(len(stack_infos))
+        return from_stack_infos(cls, stack_infos)
+
+    monkeypatch.setattr(OwnershipIndex, "from_stack_infos", classmethod(counted))
+    return builds
+
+
+def owners(matches):
+    return [
+        (match.owner.stack_name, match.owner.logical_id, match.match)
+        for match in matches
+    ]
+
+
+class TestOwnership:
+    def test_query_keys(self):
+        """Ownership :: queries are split into the runs of their ARN components"""
+        expect(query_keys("arn:aws:lambda:eu-west-1:1:function:name:3")).to_equal(
+            [
+                "arn:aws:lambda:eu-west-1:1:function:name:3",
+                "function:name:3",
+                "function:name",
+                "function",
+                "name:3",
+                "name",
+                "3",
+            ]
+        )
+        expect(query_keys("plain-name")).to_equal(["plain-name"])
+
+    def test_lookup(self):
+        """Ownership :: physical ids are found exactly, by ARN component and prefix"""
+        # GIVEN
+        index = OwnershipIndex.from_stack_infos(stack_infos)
+
+        # THEN
+        expect(owners(index.lookup("teamName-dev-api-Function"))).to_equal(
+            [("teamName-dev-api", "Function", EXACT)]
+        )
+        # the ARN of a published lambda version and of an object in a bucket
+        expect(
+            owners(
+                index.lookup(
+                    f"arn:aws:lambda:eu-west-1:{ACCOUNT}:function:teamName-dev-api-Function:3"
+                )
+            )
+        ).to_equal([("teamName-dev-api", "Function", COMPONENT)])
+        expect(
+            owners(index.lookup("arn:aws:s3:::teamname-dev-api-bucket/some/key.json"))
+        ).to_equal([("teamName-dev-api", "Bucket", COMPONENT)])
+        # the name of a queue or role without its URL or ARN
+        expect(owners(index.lookup("teamName-dev-etl-Queue"))).to_equal(
+            [("teamName-dev-etl", "Queue", COMPONENT)]
+        )
+        expect(owners(index.lookup("role/teamName-dev-api-Role"))).to_equal(
+            [("teamName-dev-api", "Role", COMPONENT)]
+        )
+        expect(owners(index.lookup("teamName-dev-etl-"))).to_equal(
+            [
+                ("teamName-dev-etl", "Queue", PREFIX),
+                ("teamName-dev-etl", "Topic", PREFIX),
+            ]
+        )
+        expect(index.lookup("unknown")).to_equal([])
+
+    def test_snapshot_store_matches_index(self, tmp_path):
+        """Ownership :: the snapshot store answers like the in-memory index"""
+        # GIVEN
+        account = generate_account(50, seed=5)
+        account_stacks = account.stack_infos()
+        index = OwnershipIndex.from_stack_infos(account_stacks)
+        store = SnapshotStore(tmp_path / "snapshots.sqlite")
+        store.save(account.stack_prefix, account_stacks, [])
+        queries = (
+            [resource.physical_id for resource in account_stacks[3].resources]
+            + [
+                resource.physical_id.rsplit("/", 1)[-1].rsplit(":", 1)[-1]
+                for resource in account_stacks[7].resources
+            ]
+            + [account_stacks[11].stack_name[:-1], "unknown"]
+        )
+
+        # THEN
+        for query in queries:
+            expect(sorted(owners(store.whois(query)))).to_equal(
+                sorted(owners(index.lookup(query)))
+            )
+
+    def test_lookup_is_fast(self):
+        """Ownership :: lookups stay below a millisecond for many resources"""
+        # GIVEN
+        index = OwnershipIndex.from_stack_infos(
+            generate_account(2000, seed=3).stack_infos()
+        )
+        queries = [owner.physical_id for owner in index.owners[::97]]
+
+        # WHEN
+        start = time.perf_counter()
+        for query in queries:
+            index.lookup(query)
+        per_lookup = (time.perf_counter() - start) / len(queries)
+
+        # THEN
+        expect(per_lookup).is_less_than(0.001)
+
+    def test_whois_command(self, tmp_path):
+        """Ownership :: whois prints the owners from a snapshot store"""
+        # GIVEN
+        with SnapshotStore(tmp_path / "snapshots.sqlite") as store:
+            store.save("teamName-dev", stack_infos, [])
+
+        # WHEN
+        runner = CliRunner(mix_stderr=False)
+        arguments = ["whois", "--snapshot-db", str(tmp_path / "snapshots.sqlite")]
+        text_result = runner.invoke(main, arguments + ["teamName-dev-etl-Topic"])
+        json_result = runner.invoke(
+            main, arguments + ["--json", "teamName-dev-etl-Topic"]
+        )
+        missing_result = runner.invoke(main, arguments + ["unknown"])
+
+        # THEN
+        expect(text_result.exit_code).to_equal(0)
+        expect(text_result.output.strip()).to_equal(
+            "teamName-dev-etl  Topic  SNS::Topic  service=etl  component=service  "
+            "(component: teamName-dev-etl-Topic)"
+        )
+        expect(json.loads(json_result.output)[0]["owner"]["service_name"]).to_equal(
+            "etl"
+        )
+        expect(missing_result.exit_code).to_equal(1)
+
+    def test_whois_uses_index_of_export(self, tmp_path, monkeypatch):
+        """Ownership :: whois loads the index saved next to export.json"""
+        # GIVEN
+        InfraGraphExporter(
+            env="dev",
+            project_name="teamName",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=FakeDataExtractor(stack_infos, []),
+        ).export(refresh=False, cluster_stack_graph=False, renderer="html")
+        builds = count_index_builds(monkeypatch)
+        arguments = [
+            "whois",
+            "--from-snapshot",
+            str(tmp_path),
+            "teamName-dev-etl-Queue",
+        ]
+
+        # WHEN
+        saved_result = CliRunner(mix_stderr=False).invoke(main, arguments)
+        later = time.time() + 10
+        os.utime(tmp_path / "export.json", (later, later))
+        changed_result = CliRunner(mix_stderr=False).invoke(main, arguments)
+
+        # THEN the index is only built again after export.json changed
+        expect(saved_result.output).to_contain("teamName-dev-etl  Queue")
+        expect(changed_result.output).to_equal(saved_result.output)
+        expect(builds).to_equal([2])
+
+    def test_whois_uses_index_of_disc_cache(self, tmp_path, monkeypatch):
+        """Ownership :: whois loads the index saved with the disc cache"""
+        # GIVEN an export from AWS
+        monkeypatch.setattr(utils, "SYSTEM_CACHE_ROOT", tmp_path / "cache")
+        monkeypatch.setattr(graph_exporter, "SYSTEM_CACHE_ROOT", tmp_path / "cache")
+        account = generate_account(20, seed=3)
+        InfraGraphExporter(
+            env="dev",
+            project_name="testTeam",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=DataExtractor(
+                account.stack_prefix,
+                service_tags=["Service"],
+                component_tags=["Component"],
+                cfn_client=FakeCloudFormationClient(account),
+                throttle_delay=0,
+            ),
+        ).export(refresh=False, cluster_stack_graph=False, renderer="html")
+        builds = count_index_builds(monkeypatch)
+        owner = account.stack_infos()[0]
+
+        # WHEN
+        result = CliRunner(mix_stderr=False).invoke(
+            main, ["whois", owner.resources[0].physical_id]
+        )
+
+        # THEN
+        expect(result.exit_code).to_equal(0)
+        expect(result.output).to_contain(owner.stack_name)
+        expect(builds).to_equal([])
@@ -0,0 +1,50 @@
+# Core Library
+import json
+import time
+
+# Third party
+import pytest
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.profiling import profiled
+from aws_infra_graph.instrumentation import instrumentation
+
+
+def fake_pipeline():
+    with instrumentation.stage("extraction"):
+        data = [str(number) * 10 for number in range(10000)]
+        time.sleep(0.05)
+    with instrumentation.stage("analysis"):
+        sorted(data)
+
+
+class TestProfiling:
+    def test_profiled_all_modes(self, tmp_path):
+        """Profiling :: all modes write their results into the output folder"""
+        # WHEN
+        with profiled(["cprofile", "sampling", "memory"], str(tmp_path), 0.001):
+            fake_pipeline()
+
+        # THEN
+        resulting_files = {file.name for file in tmp_path.iterdir()}
+        expect(resulting_files).to_equal(
+            {"profile.pstats", "profile.txt", "profile.folded", "memory.json"}
+        )
+        # AND the memory results map onto the stages
+        memory = json.loads((tmp_path / "memory.json").read_text())
+        expect(set(memory)).to_equal({"extraction", "analysis"})
+        expect(memory["extraction"]["peak_bytes_above_stage_start"]).is_greater_than(
+            100000
+        )
+        # AND the samples are rooted at the stage they were taken in
+        folded = (tmp_path / "profile.folded").read_text()
+        expect(folded).to_contain("extraction;")
+        # AND the listeners are unregistered again
+        expect(instrumentation.stage_listeners).to_equal([])
+
+    def test_profiled_unknown_mode(self, tmp_path):
+        """Profiling :: unknown modes are rejected"""
+        with pytest.raises(ValueError):
+            with profiled(["perf"], str(tmp_path)):
+                pass
@@ -0,0 +1,165 @@
+# Core Library
+import json
+import math
+
+# Third party
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.filters import StackFilter
+from aws_infra_graph.projects import (
+    AllProjectsExporter,
+    AllProjectsDataExtractor,
+    partition_by_project,
+)
+from aws_infra_graph.data_extractor import DataExtractor
+
+# Local
+from .synthetic import EXPORTS_PAGE_SIZE, FakeCloudFormationClient, generate_account
+
+PROJECTS_CONFIG = """
+infraGraph {
+    defaultProject = testTeam
+    serviceTags = ["Service"]
+    componentTags = ["Component"]
+    projects {
+        testTeam {}
+        otherTeam {}
+    }
+}
+"""
+STACK_PREFIXES = {"testTeam": "testTeam-dev", "otherTeam": "otherTeam-dev"}
+
+
+def two_project_account():
+    """An account with a second project importing some exports of the first"""
+    account = generate_account(30, seed=11, other_stack_count=10)
+    other_stacks = [
+        stack.name for stack in account.stacks if stack.name.startswith("otherTeam-dev")
+    ]
+    exported = [
+        export_name
+        for stack in account.stacks
+        if stack.name.startswith("testTeam-dev")
+        for export_name, _ in stack.exports
+    ]
+    for index, export_name in enumerate(exported[:5]):
+        account.imports.setdefault(export_name, []).append(
+            other_stacks[index % len(other_stacks)]
+        )
+    return account
+
+
+def all_projects_extractor(client):
+    return AllProjectsDataExtractor(
+        [StackFilter(prefix) for prefix in STACK_PREFIXES.values()],
+        service_tags=["Service"],
+        component_tags=["Component"],
+        cfn_client=client,
+        throttle_delay=0,
+    )
+
+
+def extract_all(extractor):
+    stacks = AllProjectsDataExtractor.gather_stacks.__wrapped__(extractor)
+    exports = AllProjectsDataExtractor.gather_and_filter_exports.__wrapped__(
+        extractor, stacks
+    )
+    return stacks, exports
+
+
+class CachedExtraction:
+    def __init__(self, stack_infos, stack_exports):
+        self.stack_infos = stack_infos
+        self.stack_exports = stack_exports
+
+    def gather_and_filter_exports(self, stacks):
+        return self.stack_exports
+
+    def gather_stacks(self):
+        return self.stack_infos
+
+
+class TestProjects:
+    def test_single_scan_matches_project_runs(self):
+        """Projects :: one scan of all projects equals the single project runs"""
+        # GIVEN
+        account = two_project_account()
+        client = FakeCloudFormationClient(account)
+
+        # WHEN
+        partitions = partition_by_project(
+            *extract_all(all_projects_extractor(client)), STACK_PREFIXES
+        )
+
+        # THEN every stack and export was listed once
+        expect(client.calls["list_exports"]).to_equal(
+            math.ceil(account.export_count / EXPORTS_PAGE_SIZE)
+        )
+        expect(client.calls["describe_stacks"]).to_equal(len(account.stacks))
+        expect(client.calls["list_imports"]).to_equal(account.export_count)
+
+        # AND every partition equals the result of a single project run
+        for partition in partitions:
+            single_client = FakeCloudFormationClient(account)
+            extractor = DataExtractor(
+                partition.stack_prefix,
+                service_tags=["Service"],
+                component_tags=["Component"],
+                cfn_client=single_client,
+                throttle_delay=0,
+            )
+            stacks = DataExtractor.gather_stacks.__wrapped__(extractor)
+            exports = DataExtractor.gather_and_filter_exports.__wrapped__(
+                extractor, stacks
+            )
+            expect(partition.stack_infos).to_equal(stacks)
+            expect(partition.exports).to_equal(exports)
+
+    def test_export_all_projects(self, tmp_path):
+        """Projects :: each project gets its graphs, all share a cross-project graph"""
+        # GIVEN
+        config_path = tmp_path / "config.hocon"
+        config_path.write_text(PROJECTS_CONFIG)
+        output_folder = tmp_path / "output"
+        output_folder.mkdir()
+        stacks, exports = extract_all(
+            all_projects_extractor(FakeCloudFormationClient(two_project_account()))
+        )
+        exporter = AllProjectsExporter(
+            env="dev",
+            output_folder=str(output_folder),
+            config_path=str(config_path),
+            data_extractor=CachedExtraction(stacks, exports),
+        )
+
+        # WHEN
+        exporter.export(refresh=False, cluster_stack_graph=False, renderer="html")
+
+        # THEN
+        resulting_files = {file.name for file in output_folder.iterdir()}
+        expect(resulting_files).to_contain("testTeam")
+        expect(resulting_files).to_contain("otherTeam")
+        expect(resulting_files).to_contain("projects.json")
+        expect(resulting_files).to_contain("export-projects.html")
+        for project_name in STACK_PREFIXES:
+            project_files = {
+                file.name for file in (output_folder / project_name).iterdir()
+            }
+            expect(project_files).to_contain("export.json")
+            expect(project_files).to_contain("export-services.html")
+
+        projects = json.loads((output_folder / "projects.json").read_text())
+        expect(
+            {
+                project["project_name"]: project["stacks"]
+                for project in projects["projects"]
+            }
+        ).to_equal({"testTeam": 30, "otherTeam": 10})
+        cross_project = [
+            dependency
+            for dependency in projects["service_dependencies"]
+            if dependency["exporting_service"].startswith("testTeam/")
+            and dependency["importing_service"].startswith("otherTeam/")
+        ]
+        expect(len(cross_project)).is_greater_than(0)
@@ -0,0 +1,188 @@
+# Core Library
+from concurrent.futures import ThreadPoolExecutor
+
+# Third party
+from graphviz import Digraph
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.model import StackInfo, StackExport
+from aws_infra_graph.render_cache import RenderCache, _link_or_copy
+from aws_infra_graph.graph_exporter import InfraGraphExporter
+
+# Local
+from .test_graph import FakeDataExtractor
+
+
+def fake_dot(monkeypatch):
+    """Count the renders and write the DOT source as the rendered file"""
+    renders = []
+
+    def render(graph, filename=None, format=None, **kwargs):
+        path = graph.save(filename)
+        with open(f"{path}.{format}", "w") as rendered:
+            rendered.write(graph.source)
+        renders.append(path)
+        return f"{path}.{format}"
+
+    monkeypatch.setattr(Digraph, "render", render)
+    return renders
+
+
+def graph(*edges):
+    digraph = Digraph("Graph")
+    for edge in edges:
+        digraph.edge(*edge)
+    return digraph
+
+
+class TestRenderCache:
+    def test_reuses_identical_render(self, tmp_path, monkeypatch):
+        """Render cache :: an unchanged graph is linked instead of rendered"""
+        # GIVEN
+        renders = fake_dot(monkeypatch)
+        cache = RenderCache(tmp_path / "cache")
+        for folder in ("first", "second", "third"):
+            (tmp_path / folder).mkdir()
+
+        # WHEN
+        cache.render(graph(("a", "b")), f"{tmp_path}/first/export.gv")
+        cache.render(graph(("a", "b")), f"{tmp_path}/second/export.gv")
+        cache.render(graph(("a", "c")), f"{tmp_path}/third/export.gv")
+
+        # THEN only the changed graph is rendered again
+        expect(len(renders)).to_equal(2)
+        second = tmp_path / "second" / "export.gv.png"
+        expect(second.read_text()).to_contain("a -> b")
+        expect((tmp_path / "second" / "export.gv").exists()).to_equal(True)
+        expect(len(list((tmp_path / "cache").iterdir()))).to_equal(2)
+
+    def test_render_does_not_overwrite_cached(self, tmp_path, monkeypatch):
+        """Render cache :: rendering over a linked output keeps the cached file"""
+        # GIVEN an output linked to the cached render of a -> b
+        fake_dot(monkeypatch)
+        cache = RenderCache(tmp_path / "cache")
+        filename = f"{tmp_path}/export.gv"
+        cache.render(graph(("a", "b")), filename)
+        cache.render(graph(("a", "b")), filename)
+
+        # WHEN the graph changes
+        cache.render(graph(("a", "c")), filename)
+
+        # THEN
+        expect((tmp_path / "export.gv.png").read_text()).to_contain("a -> c")
+        cache.render(graph(("a", "b")), filename)
+        expect((tmp_path / "export.gv.png").read_text()).to_contain("a -> b")
+
+    def test_prunes_least_recently_used(self, tmp_path, monkeypatch):
+        """Render cache :: only the most recent renders of earlier runs are kept"""
+        # GIVEN
+        renders = fake_dot(monkeypatch)
+
+        # WHEN every render is a run of its own
+        for target in ("b", "c", "d"):
+            cache = RenderCache(tmp_path / "cache", max_entries=2)
+            cache.render(graph(("a", target)), f"{tmp_path}/export.gv")
+
+        # THEN
+        expect(len(list((tmp_path / "cache").iterdir()))).to_equal(2)
+        expect(len(renders)).to_equal(3)
+
+    def test_keeps_renders_of_the_run(self, tmp_path, monkeypatch):
+        """Render cache :: a run with more renders than the limit keeps them all"""
+        # GIVEN
+        renders = fake_dot(monkeypatch)
+        targets = [f"node{index}" for index in range(5)]
+
+        def run():
+            cache = RenderCache(tmp_path / "cache", max_entries=2)
+            for target in targets:
+                cache.render(graph(("a", target)), f"{tmp_path}/{target}.gv")
+
+        # WHEN
+        run()
+        run()
+
+        # THEN the second run renders nothing
+        expect(len(renders)).to_equal(5)
+        expect(len(list((tmp_path / "cache").iterdir()))).to_equal(5)
+
+    def test_parallel_renders(self, tmp_path, monkeypatch):
+        """Render cache :: threads sharing a cache do not trip over pruned entries"""
+        # GIVEN more graphs than cache entries, each rendered twice
+        fake_dot(monkeypatch)
+        for index in range(40):
+            RenderCache(tmp_path / "cache", max_entries=200).render(
+                graph(("old", f"node{index}")), f"{tmp_path}/old.gv"
+            )
+        cache = RenderCache(tmp_path / "cache", max_entries=8)
+
+        def render(index):
+            folder = tmp_path / f"shard{index % 20}"
+            folder.mkdir(exist_ok=True)
+            cache.render(graph(("a", f"node{index % 20}")), f"{folder}/export.gv")
+
+        # WHEN
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(render, range(40)))
+
+        # THEN the old renders are pruned and the ones of this run kept
+        expect(len(list((tmp_path / "cache").iterdir()))).to_equal(20)
+        expect((tmp_path / "shard3" / "export.gv.png").read_text()).to_contain("node3")
+
+    def test_link_to_same_file(self, tmp_path):
+        """Render cache :: linking a file to a link of itself leaves no temporary"""
+        # GIVEN
+        (tmp_path / "rendered.png").write_text("png")
+        _link_or_copy(tmp_path / "rendered.png", tmp_path / "cached.png")
+
+        # WHEN
+        _link_or_copy(tmp_path / "rendered.png", tmp_path / "cached.png")
+
+        # THEN
+        expect(sorted(path.name for path in tmp_path.iterdir())).to_equal(
+            ["cached.png", "rendered.png"]
+        )
+
+    def test_export_skips_dot(self, tmp_path, monkeypatch):
+        """Render cache :: a second export of the same infra renders nothing"""
+        # GIVEN
+        renders = fake_dot(monkeypatch)
+        stack_infos = [
+            StackInfo(
+                stack_name=f"teamName-dev-{name}",
+                service_name=name,
+                component_name="service",
+                resources=[],
+            )
+            for name in ("api", "etl", "db")
+        ]
+        stack_exports = [
+            StackExport(
+                export_name=f"{exporting}-{importing}",
+                export_value="fake",
+                exporting_stack_name=f"teamName-dev-{exporting}",
+                importing_stacks=[f"teamName-dev-{importing}"],
+                importing_services=[importing],
+                export_service=exporting,
+            )
+            for exporting, importing in [("db", "etl"), ("etl", "api"), ("db", "api")]
+        ]
+
+        def export():
+            InfraGraphExporter(
+                env="dev",
+                project_name="teamName",
+                config_path="tests/test_config.hocon",
+                output_folder=str(tmp_path / "output"),
+                data_extractor=FakeDataExtractor(stack_infos, stack_exports),
+                render_cache=RenderCache(tmp_path / "cache"),
+            ).export(refresh=False, cluster_stack_graph=True)
+
+        # WHEN
+        export()
+        export()
+
+        # THEN the stack and service graph were rendered once
+        expect(len(renders)).to_equal(2)
+        expect((tmp_path / "output" / "export-stacks.gv.png").exists()).to_equal(True)
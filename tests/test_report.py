@@ -0,0 +1,66 @@
+# Core Library
+import logging
+from collections import Counter
+
+# Third party
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.model import StackInfo, StackExport, StackParameter
+from aws_infra_graph.report import log_summary, write_report
+
+stack_infos = [
+    StackInfo(
+        stack_name="dev-teamName-api",
+        service_name="api",
+        component_name="service",
+        resources=[],
+    ),
+    StackInfo(
+        stack_name="dev-teamName-etl",
+        service_name=None,
+        component_name="task",
+        parameters=[StackParameter(name="datawarehouseHost", value="fake")],
+        resources=[],
+    ),
+]
+exports = [
+    StackExport(
+        export_name="etl-data-path",
+        export_value="fake",
+        exporting_stack_name="dev-teamName-etl",
+        importing_stacks=["dev-teamName-api"],
+        importing_services=["api"],
+    )
+]
+
+
+class TestReport:
+    def test_log_summary(self, caplog):
+        """Report :: only a summary is logged by default"""
+        # WHEN
+        with caplog.at_level(logging.INFO):
+            log_summary(stack_infos, exports, Counter({"IAM::Role": 3}))
+
+        # THEN
+        expect(caplog.text).to_contain("2 stacks in 1 services (1 without service")
+        expect(caplog.text).to_contain("1 imported exports with 1 imports")
+        expect(caplog.text).not_to_contain("datawarehouseHost")
+
+    def test_write_report(self, tmp_path):
+        """Report :: the detailed report contains parameters and exports"""
+        # WHEN
+        write_report(
+            str(tmp_path / "report.txt"),
+            stack_infos,
+            exports,
+            Counter({"IAM::Role": 3}),
+        )
+
+        # THEN
+        report = (tmp_path / "report.txt").read_text()
+        expect(report).to_contain("\t\tdatawarehouseHost: fake")
+        expect(report).to_contain("\tIAM::Role: 3 resources")
+        expect(report).to_contain(
+            "etl-data-path:fake [Stack: dev-teamName-etl]\n\tdev-teamName-api"
+        )
@@ -0,0 +1,200 @@
+# Core Library
+import shutil
+from typing import List
+from datetime import datetime, timezone
+
+# Third party
+from pyexpect import expect
+from click.testing import CliRunner
+
+# First party
+from aws_infra_graph.cli import main
+from aws_infra_graph.model import StackInfo, StackExport
+from aws_infra_graph.graph_exporter import InfraGraphExporter
+from aws_infra_graph.snapshot_store import SnapshotStore
+
+# Local
+from .synthetic import generate_account
+from .test_offline_extractor import offline_exporter
+
+
+def by_name(stack_infos: List[StackInfo]) -> List[StackInfo]:
+    return sorted(stack_infos, key=lambda stack: stack.stack_name)
+
+
+def by_export_name(exports: List[StackExport]) -> List[StackExport]:
+    return sorted(exports, key=lambda export: export.export_name)
+
+
+def table_size(store: SnapshotStore, table: str) -> int:
+    return store.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class CountingDataExtractor:
+    def __init__(self, stack_infos: List[StackInfo], stack_exports: List[StackExport]):
+        self.stack_infos = stack_infos
+        self.stack_exports = stack_exports
+        self.calls = 0
+
+    def gather_and_filter_exports(self, stacks: List[StackInfo]) -> List[StackExport]:
+        return self.stack_exports
+
+    def gather_stacks(self) -> List[StackInfo]:
+        self.calls += 1
+        return self.stack_infos
+
+
+class TestSnapshotStore:
+    def test_save_and_load(self, tmp_path):
+        """Snapshot store :: a saved snapshot loads back unchanged"""
+        # GIVEN
+        account = generate_account(30, seed=7)
+        stack_infos, exports = account.stack_infos(), account.stack_exports()
+
+        # WHEN
+        with SnapshotStore(tmp_path / "snapshots.sqlite") as store:
+            snapshot_id = store.save(account.stack_prefix, stack_infos, exports)
+        with SnapshotStore(tmp_path / "snapshots.sqlite") as store:
+            loaded_stacks, loaded_exports = store.load(snapshot_id)
+
+        # THEN
+        expect(loaded_stacks).to_equal(by_name(stack_infos))
+        expect(loaded_exports).to_equal(by_export_name(exports))
+
+    def test_unchanged_rows_are_not_duplicated(self, tmp_path):
+        """Snapshot store :: unchanged stacks and exports are shared by snapshots"""
+        # GIVEN
+        account = generate_account(30, seed=7)
+        stack_infos, exports = account.stack_infos(), account.stack_exports()
+        store = SnapshotStore(tmp_path / "snapshots.sqlite")
+        first_id = store.save(account.stack_prefix, stack_infos, exports)
+        resource_rows = table_size(store, "resources")
+
+        # WHEN the same data and then one changed stack are saved
+        second_id = store.save(account.stack_prefix, stack_infos, exports)
+        stack_infos[0].resources.pop()
+        third_id = store.save(account.stack_prefix, stack_infos, exports)
+
+        # THEN only the changed stack got a new version
+        expect(table_size(store, "stacks")).to_equal(len(stack_infos) + 1)
+        expect(table_size(store, "exports")).to_equal(len(exports))
+        expect(table_size(store, "resources")).to_equal(
+            resource_rows + len(stack_infos[0].resources)
+        )
+        # AND every snapshot still loads its own state
+        expect(store.load(third_id)[0]).to_equal(by_name(stack_infos))
+        expect(store.load(second_id)).to_equal(store.load(first_id))
+        expect(store.load(second_id)[0]).not_to_equal(store.load(third_id)[0])
+
+    def test_service_dependency_history(self, tmp_path):
+        """Snapshot store :: it is known since when a service imports from another"""
+        # GIVEN three daily snapshots, api starts importing from etl on day 2
+        stack_infos = [
+            StackInfo(
+                stack_name=f"teamName-dev-{service}",
+                service_name=service,
+                component_name=None,
+                resources=[],
+            )
+            for service in ["api", "etl"]
+        ]
+
+        def etl_exports(importing_stacks: List[str]) -> List[StackExport]:
+            return [
+                StackExport(
+                    export_name="etl-data-path",
+                    export_value="fake",
+                    exporting_stack_name="teamName-dev-etl",
+                    importing_stacks=importing_stacks,
+                    export_service="etl",
+                    importing_services=["api"] if importing_stacks else [],
+                )
+            ]
+
+        store = SnapshotStore(tmp_path / "snapshots.sqlite")
+        for day, importing_stacks in [
+            (1, []),
+            (2, ["teamName-dev-api"]),
+            (3, ["teamName-dev-api"]),
+        ]:
+            store.save(
+                "teamName-dev",
+                stack_infos,
+                etl_exports(importing_stacks),
+                taken_at=datetime(2020, 6, day, tzinfo=timezone.utc),
+            )
+
+        # WHEN
+        periods = store.service_dependency_history("etl", "api")
+
+        # THEN
+        expect(len(periods)).to_equal(1)
+        expect(periods[0].first_seen).to_equal("2020-06-02T00:00:00+00:00")
+        expect(periods[0].last_seen).to_equal("2020-06-03T00:00:00+00:00")
+        expect(store.service_dependency_history("api", "etl")).to_equal([])
+
+    def test_export_uses_store_as_cache(self, tmp_path):
+        """Snapshot store :: the export reads the latest snapshot unless refreshed"""
+        # GIVEN
+        account = generate_account(10, seed=7, stack_prefix="testTeam-dev")
+        extractor = CountingDataExtractor(
+            account.stack_infos(), account.stack_exports()
+        )
+        store = SnapshotStore(tmp_path / "snapshots.sqlite")
+        graph_exporter = InfraGraphExporter(
+            env="dev",
+            project_name="testTeam",
+            config_path="tests/test_config.hocon",
+            output_folder=str(tmp_path),
+            data_extractor=extractor,
+            snapshot_store=store,
+        )
+
+        # WHEN
+        for refresh in [False, False, True]:
+            graph_exporter.export(
+                refresh=refresh, cluster_stack_graph=False, renderer="html"
+            )
+
+        # THEN the extractor ran for the first and the refreshed export
+        expect(extractor.calls).to_equal(2)
+        expect(len(store.snapshots("testTeam-dev"))).to_equal(2)
+
+    def test_export_command_closes_store(self, tmp_path, monkeypatch):
+        """Snapshot store :: the export command closes the store it opened"""
+        # GIVEN
+        account = generate_account(10, seed=7, stack_prefix="testTeam-dev")
+        stack_infos = account.stack_infos()
+        exporter = offline_exporter(tmp_path / "snapshot")
+        (tmp_path / "snapshot").mkdir()
+        exporter._create_data_export(
+            stack_infos, exporter._get_statictics(stack_infos), account.stack_exports()
+        )
+        shutil.copy("tests/test_config.hocon", tmp_path / "config.hocon")
+        (tmp_path / "output").mkdir()
+        monkeypatch.chdir(tmp_path)
+        closed = []
+        close = SnapshotStore.close
+        monkeypatch.setattr(
+            SnapshotStore, "close", lambda store: closed.append(close(store))
+        )
+
+        # WHEN
+        result = CliRunner(mix_stderr=False).invoke(
+            main,
+            [
+                "export",
+                "--from-snapshot",
+                "snapshot/export.json",
+                "--snapshot-db",
+                "snapshots.sqlite",
+                "-o",
+                "output",
+                "--renderer",
+                "html",
+            ],
+        )
+
+        # THEN
+        expect(result.exit_code).to_equal(0)
+        expect(len(closed)).to_equal(1)
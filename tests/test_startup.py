@@ -0,0 +1,91 @@
+# Core Library
+import os
+import sys
+import subprocess
+from typing import Set, List, Tuple
+from pathlib import Path
+
+# Third party
+import pytest
+from pyexpect import expect
+
+REPO_ROOT = Path(__file__).parent.parent
+
+# Budgets for the summed cumulative import time in microseconds, about three
+# times what a laptop needs (--help ~90 ms, init ~140 ms) so slow CI machines
+# pass. The module checks below catch the actual regressions (eager imports of
+# the heavy dependencies, directly or through other modules).
+HELP_IMPORT_BUDGET_US = 250_000
+INIT_IMPORT_BUDGET_US = 400_000
+
+HEAVY_MODULES = ["boto3", "botocore", "graphviz", "pydantic", "pyhocon", "jmespath"]
+
+
+def run_with_importtime(
+    args: List[str], home: Path, preamble: str = ""
+) -> Tuple[Set[str], int]:
+    """
+    Run the CLI with `-X importtime` and return the names of all imported
+    modules, nested ones included, and the summed time of the top level imports
+    """
+    env = dict(os.environ, HOME=str(home))
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"{preamble}\nfrom aws_infra_graph.cli import main; main()",
+            *args,
+        ],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+    modules: Set[str] = set()
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):  # nested imports are indented by two spaces
+            total_us += int(cumulative)
+    return modules, total_us
+
+
+def is_heavy(module: str) -> bool:
+    return any(
+        module == heavy or module.startswith(f"{heavy}.") for heavy in HEAVY_MODULES
+    )
+
+
+class TestStartup:
+    @pytest.mark.parametrize(
+        "args,budget",
+        [(["--help"], HELP_IMPORT_BUDGET_US), (["init"], INIT_IMPORT_BUDGET_US)],
+    )
+    def test_startup_import_budget(self, tmp_path, args, budget):
+        """Startup :: light subcommands stay within their import budget"""
+        # WHEN the command is executed
+        modules, total_us = run_with_importtime(args, tmp_path)
+
+        # THEN none of the heavy dependencies should be loaded, not even indirectly
+        expect(sorted(module for module in modules if is_heavy(module))).to_equal([])
+        # AND the total import time should stay within the budget
+        expect(total_us).is_less_than(budget)
+
+    def test_heavy_imports_are_detected(self, tmp_path):
+        """Startup :: dependencies imported by other modules are found as well"""
+        # WHEN a module importing pydantic is loaded before the CLI
+        modules, _ = run_with_importtime(
+            ["--help"], tmp_path, "import aws_infra_graph.config"
+        )
+
+        # THEN
+        expect(modules).to_contain("aws_infra_graph.config")
+        expect(any(is_heavy(module) for module in modules)).is_true()
@@ -0,0 +1,111 @@
+# Core Library
+import json
+
+# Third party
+from pyexpect import expect
+from click.testing import CliRunner
+
+# First party
+from aws_infra_graph.cli import main
+from aws_infra_graph.model import StackInfo, DataExport, StackResource
+from aws_infra_graph.statistics import compute_resource_statistics
+
+
+def resources(*resource_types: str):
+    return [
+        StackResource(
+            logical_id=f"Resource{index}",
+            resource_type=resource_type,
+            physical_id=None,
+        )
+        for index, resource_type in enumerate(resource_types)
+    ]
+
+
+stack_infos = [
+    StackInfo(
+        stack_name="teamName-dev-api",
+        service_name="api",
+        component_name="service",
+        resources=resources("AWS::IAM::Role", "AWS::IAM::Role", "AWS::ECS::Service"),
+    ),
+    StackInfo(
+        stack_name="teamName-dev-api-monitoring",
+        service_name="api",
+        component_name="monitoring",
+        resources=resources("AWS::CloudWatch::Alarm"),
+    ),
+    StackInfo(
+        stack_name="teamName-dev-etl",
+        service_name=None,
+        component_name="service",
+        resources=resources("AWS::ECS::Service", "Custom::Migration"),
+    ),
+]
+
+
+class TestStatistics:
+    def test_dimensions(self):
+        """Statistics :: resource types are counted per service, component and stack"""
+        # WHEN
+        statistics = compute_resource_statistics(stack_infos)
+
+        # THEN
+        expect(dict(statistics.totals)).to_equal(
+            {
+                "IAM::Role": 2,
+                "ECS::Service": 2,
+                "CloudWatch::Alarm": 1,
+                "Custom::Migration": 1,
+            }
+        )
+        expect(dict(statistics.by_dimension["service"]["api"])).to_equal(
+            {"IAM::Role": 2, "ECS::Service": 1, "CloudWatch::Alarm": 1}
+        )
+        expect(dict(statistics.by_dimension["service"]["Unknown"])).to_equal(
+            {"ECS::Service": 1, "Custom::Migration": 1}
+        )
+        expect(dict(statistics.by_dimension["component"]["service"])).to_equal(
+            {"IAM::Role": 2, "ECS::Service": 2, "Custom::Migration": 1}
+        )
+        expect(len(statistics.by_dimension["stack"])).to_equal(3)
+
+    def test_top(self):
+        """Statistics :: top groups and types are ordered by count"""
+        # WHEN
+        statistics = compute_resource_statistics(stack_infos)
+
+        # THEN
+        expect(statistics.top_groups("service", 1)).to_equal([("api", 4)])
+        expect(statistics.top_groups("component", 5)).to_equal(
+            [("service", 5), ("monitoring", 1)]
+        )
+        expect(statistics.top_types(1, "stack", "teamName-dev-api")).to_equal(
+            [("IAM::Role", 2)]
+        )
+
+    def test_stats_command(self, tmp_path):
+        """Statistics :: the stats command works on a snapshot without extraction"""
+        # GIVEN
+        export = DataExport(
+            stacks=stack_infos, stack_exports=[], resource_statistics={}
+        )
+        (tmp_path / "export.json").write_text(export.json())
+
+        # WHEN
+        runner = CliRunner(mix_stderr=False)
+        text_result = runner.invoke(
+            main, ["stats", "--by", "component", "--from-snapshot", str(tmp_path)]
+        )
+        json_result = runner.invoke(
+            main, ["stats", "--json", "--from-snapshot", str(tmp_path)]
+        )
+
+        # THEN
+        expect(text_result.exit_code).to_equal(0)
+        expect(text_result.output.splitlines()[0]).to_equal(
+            "       5  service  (IAM::Role 2, ECS::Service 2, Custom::Migration 1)"
+        )
+        expect(json.loads(json_result.output)["service"]["api"]["IAM::Role"]).to_equal(
+            2
+        )
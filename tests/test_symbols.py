@@ -0,0 +1,89 @@
+# Core Library
+import pickle
+
+# Third party
+from pyexpect import expect
+
+# First party
+from aws_infra_graph.symbols import Symbols, SymbolTable
+from aws_infra_graph.data_extractor import DataExtractor
+
+# Local
+from .synthetic import FakeCloudFormationClient, generate_account
+
+
+class TestSymbols:
+    def test_short_name(self):
+        """Symbols :: short names only strip a leading prefix"""
+        # GIVEN
+        table = SymbolTable("teamName-dev-")
+        table.intern("teamName-dev-etl")
+
+        # THEN
+        expect(table.short_name("teamName-dev-etl")).to_equal("etl")
+        expect(table.short_name("teamName-dev-api")).to_equal("api")
+        expect(table.short_name("otherTeam-dev-etl")).to_equal("otherTeam-dev-etl")
+        expect(table.short_name("old-teamName-dev-etl")).to_equal(
+            "old-teamName-dev-etl"
+        )
+        # AND lookups do not intern names
+        expect(len(table)).to_equal(1)
+        expect("teamName-dev-api" in table).is_false()
+
+    def test_empty_stack_prefix(self):
+        """Symbols :: without a stack prefix stack names are kept as they are"""
+        # GIVEN
+        symbols = Symbols.for_stack_prefix("")
+
+        # THEN
+        expect(symbols.stacks.short_name("teamName-dev-etl")).to_equal(
+            "teamName-dev-etl"
+        )
+
+    def test_intern(self):
+        """Symbols :: equal names are stored as one shared string"""
+        # GIVEN two equal but distinct string objects
+        table = SymbolTable()
+        name = "".join(["teamName-dev-", "api"])
+        same_name = "".join(["teamName-dev-", "api"])
+        expect(name is same_name).is_false()
+
+        # THEN
+        expect(table.intern(name) is table.intern(same_name)).is_true()
+
+    def test_extraction_shares_names(self):
+        """Symbols :: extracted stacks and exports share their name strings"""
+        # GIVEN
+        account = generate_account(20, seed=3)
+        extractor = DataExtractor(
+            account.stack_prefix,
+            service_tags=["Service"],
+            component_tags=["Component"],
+            cfn_client=FakeCloudFormationClient(account),
+            throttle_delay=0,
+        )
+
+        # WHEN
+        stacks = DataExtractor.gather_stacks.__wrapped__(extractor)
+        exports = DataExtractor.gather_and_filter_exports.__wrapped__(extractor, stacks)
+
+        # THEN every stack name is the interned one
+        stack_names = extractor.symbols.stacks
+        for export in exports:
+            expect(
+                export.exporting_stack_name
+                is stack_names.intern(export.exporting_stack_name)
+            ).is_true()
+            for importing_stack in export.importing_stacks:
+                expect(importing_stack is stack_names.intern(importing_stack)).is_true()
+        resource_types = {
+            id(resource.resource_type)
+            for stack in stacks
+            for resource in stack.resources
+        }
+        expect(len(resource_types)).to_equal(len(extractor.symbols.resource_types))
+        # AND pickled caches store every name only once
+        pickled = pickle.dumps((stacks, exports))
+        stack_name = stacks[0].stack_name.encode()
+        short_unicode_opcode = b"\x8c" + bytes([len(stack_name)])
+        expect(pickled.count(short_unicode_opcode + stack_name)).to_equal(1)